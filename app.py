@@ -44,6 +44,7 @@ from routes.reports import reports_bp
 from routes.billing import billing_bp
 from routes.capacity import capacity_bp
 from routes.attendance import attendance_bp
+from routes.system import system_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(clients_bp)
@@ -58,6 +59,7 @@ app.register_blueprint(reports_bp)
 app.register_blueprint(billing_bp)
 app.register_blueprint(capacity_bp)
 app.register_blueprint(attendance_bp)
+app.register_blueprint(system_bp)
 
 # Register page-rendering blueprint
 from routes.dashboard import dashboard_bp
@@ -65,7 +67,8 @@ app.register_blueprint(dashboard_bp)
 
 # Activity tracking middleware — log API calls from authenticated users
 CAIRO_TZ = timezone(timedelta(hours=2))
-_SKIP_PREFIXES = ('/static/', '/uploads/', '/dashboard/')
+# /api/jobs/ is background job progress polling, not user activity
+_SKIP_PREFIXES = ('/static/', '/uploads/', '/dashboard/', '/api/jobs/')
 _SKIP_ENDPOINTS = ('/api/attendance/my-pings', '/api/attendance/ping-response',
                    '/api/attendance/ping-missed')
 
@@ -124,8 +127,93 @@ def scheduled_job():
         print(f"[Scheduler] Reminder error: {e}")
 
 
+# Refresh post insights that are due according to the age-tiered planner
+def insights_refresh_job():
+    from services.insight_refresh import refresh_due_insights
+    try:
+        summary = refresh_due_insights()
+        if summary['due']:
+            print(f"[Insights] Refreshed {summary['fetched']} of {summary['due']} due, "
+                  f"{summary['failed']} failed, {summary['retired']} retired")
+    except Exception as e:
+        print(f"[Insights] Refresh error: {e}")
+
+
+# Capture story metrics on their deadline-aware plan before they expire
+def story_insights_job():
+    from services.insight_refresh import refresh_due_stories
+    try:
+        summary = refresh_due_stories()
+        if summary['due']:
+            print(f"[Insights] Captured {summary['fetched']} of {summary['due']} due stories, "
+                  f"{summary['failed']} failed")
+    except Exception as e:
+        print(f"[Insights] Story capture error: {e}")
+
+
+# Keep the optional columnar analytics store current
+def analytics_store_job():
+    from services.analytics_store import sync
+    try:
+        summary = sync()
+        if summary.get('full_export') or summary.get('changed') or summary.get('appended'):
+            print(f"[Analytics] Store synced: {summary['changed']} changed, {summary['appended']} appended"
+                  f"{' (full export)' if summary['full_export'] else ''} in {summary['seconds']}s")
+    except Exception as e:
+        print(f"[Analytics] Store sync error: {e}")
+
+
+# Downsample old insight snapshots once a day
+def snapshot_compaction_job():
+    from services.insight_snapshots import compact
+    try:
+        removed = compact()
+        print(f"[Insights] Compacted snapshots: {removed['hourly']} to hourly, {removed['daily']} to daily")
+    except Exception as e:
+        print(f"[Insights] Compaction error: {e}")
+
+
+# Collect account-level follower / reach metrics once a day
+def account_metrics_job():
+    from services.account_metrics import collect_account_metrics
+    try:
+        summary = collect_account_metrics()
+        print(f"[Accounts] Collected daily metrics for {summary['collected']} of {summary['accounts']} accounts")
+    except Exception as e:
+        print(f"[Accounts] Metrics collection error: {e}")
+
+
+# Re-check account tokens whose cached health has expired
+def account_health_job():
+    from services.account_health import refresh_stale
+    try:
+        summary = refresh_stale()
+        if summary['checked']:
+            print(f"[Accounts] Health checked {summary['checked']} accounts, {summary['problems']} with problems")
+    except Exception as e:
+        print(f"[Accounts] Health check error: {e}")
+
+
+# Recompute the analytics rollups of days changed since the last run
+def analytics_rollups_job():
+    from services.analytics_rollups import refresh
+    try:
+        days = refresh()
+        if days:
+            print(f"[Analytics] Refreshed rollups for {days} days")
+    except Exception as e:
+        print(f"[Analytics] Rollup refresh error: {e}")
+
+
 scheduler = BackgroundScheduler()
 scheduler.add_job(scheduled_job, 'interval', seconds=60)
+scheduler.add_job(insights_refresh_job, 'interval', minutes=10)
+scheduler.add_job(story_insights_job, 'interval', minutes=5)
+scheduler.add_job(analytics_store_job, 'interval', minutes=5)
+scheduler.add_job(snapshot_compaction_job, 'cron', hour=3, minute=30)
+scheduler.add_job(account_metrics_job, 'cron', hour=4, minute=0)
+scheduler.add_job(account_health_job, 'interval', minutes=15)
+scheduler.add_job(analytics_rollups_job, 'interval', seconds=60)
 scheduler.start()
 
 
@@ -3,6 +3,10 @@
 Extends the existing SQLite schema with new tables and columns for
 the agency workflow management features.
 """
+import ast
+import hashlib
+import json
+import zlib
 from models import get_db
 from werkzeug.security import generate_password_hash
 
@@ -262,6 +266,126 @@ def run_migrations():
         _migration_30_work_summary(db)
         set_schema_version(db, 30)
 
+    if version < 31:
+        print("Running migration 31: Create background_jobs table...")
+        _migration_31_background_jobs(db)
+        set_schema_version(db, 31)
+
+    if version < 32:
+        print("Running migration 32: Create insight_refresh_schedule table...")
+        _migration_32_insight_refresh_schedule(db)
+        set_schema_version(db, 32)
+
+    if version < 33:
+        print("Running migration 33: Create post_insight_snapshots table...")
+        _migration_33_post_insight_snapshots(db)
+        set_schema_version(db, 33)
+
+    if version < 34:
+        print("Running migration 34: Structured post_logs responses...")
+        _migration_34_structured_post_logs(db)
+        set_schema_version(db, 34)
+
+    if version < 35:
+        print("Running migration 35: Move raw insight payloads to compressed side table...")
+        _migration_35_insight_payloads(db)
+        set_schema_version(db, 35)
+
+    if version < 36:
+        print("Running migration 36: Create account_daily_metrics table...")
+        _migration_36_account_daily_metrics(db)
+        set_schema_version(db, 36)
+
+    if version < 37:
+        print("Running migration 37: Track stories in insight_refresh_schedule...")
+        _migration_37_story_refresh(db)
+        set_schema_version(db, 37)
+
+    if version < 38:
+        print("Running migration 38: Create analytics rollup tables...")
+        _migration_38_analytics_rollups(db)
+        set_schema_version(db, 38)
+
+    if version < 39:
+        print("Running migration 39: Create table_versions for response caching...")
+        _migration_39_table_versions(db)
+        set_schema_version(db, 39)
+
+    if version < 40:
+        print("Running migration 40: Index post and workflow history creation times...")
+        _migration_40_created_at_indexes(db)
+        set_schema_version(db, 40)
+
+    if version < 41:
+        print("Running migration 41: Create engagement_slot_stats...")
+        _migration_41_engagement_slot_stats(db)
+        set_schema_version(db, 41)
+
+    if version < 42:
+        print("Running migration 42: Track changes for the analytics store export...")
+        _migration_42_analytics_export(db)
+        set_schema_version(db, 42)
+
+    if version < 43:
+        print("Running migration 43: Version posting rules and clients...")
+        _migration_43_version_rules_and_clients(db)
+        set_schema_version(db, 43)
+
+    if version < 44:
+        print("Running migration 44: Create client_content_requirements...")
+        _migration_44_client_content_requirements(db)
+        set_schema_version(db, 44)
+
+    if version < 45:
+        print("Running migration 45: Index posts and accounts for the clients overview...")
+        _migration_45_overview_indexes(db)
+        set_schema_version(db, 45)
+
+    if version < 46:
+        print("Running migration 46: Create client_week_coverage...")
+        _migration_46_client_week_coverage(db)
+        set_schema_version(db, 46)
+
+    if version < 47:
+        print("Running migration 47: Create account_health...")
+        _migration_47_account_health(db)
+        set_schema_version(db, 47)
+
+    if version < 48:
+        print("Running migration 48: Create client_logo_state...")
+        _migration_48_client_logo_state(db)
+        set_schema_version(db, 48)
+
+    if version < 49:
+        print("Running migration 49: Index posts for keyset pagination...")
+        _migration_49_post_listing_indexes(db)
+        set_schema_version(db, 49)
+
+    if version < 50:
+        print("Running migration 50: Index open posts for the pipeline board...")
+        _migration_50_pipeline_board_index(db)
+        set_schema_version(db, 50)
+
+    if version < 51:
+        print("Running migration 51: Index posts by assignee and workflow status...")
+        _migration_51_assignee_status_indexes(db)
+        set_schema_version(db, 51)
+
+    if version < 52:
+        print("Running migration 52: Version users...")
+        _migration_52_version_users(db)
+        set_schema_version(db, 52)
+
+    if version < 53:
+        print("Running migration 53: Create account_metrics_state...")
+        _migration_53_account_metrics_state(db)
+        set_schema_version(db, 53)
+
+    if version < 54:
+        print("Running migration 54: Rebuild client_week_coverage on local dates...")
+        _migration_54_coverage_local_dates(db)
+        set_schema_version(db, 54)
+
     final_version = get_schema_version(db)
     print(f"Migrations complete. Schema version: {final_version}")
     db.close()
@@ -739,5 +863,793 @@ def _migration_30_work_summary(db):
     db.commit()
 
 
+def _migration_31_background_jobs(db):
+    """Create background_jobs table so long-running work reports progress to any worker."""
+    if not table_exists(db, 'background_jobs'):
+        db.execute("""
+            CREATE TABLE background_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL,
+                status TEXT DEFAULT 'queued',
+                total INTEGER DEFAULT 0,
+                completed INTEGER DEFAULT 0,
+                succeeded INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                result TEXT DEFAULT '',
+                error TEXT DEFAULT '',
+                created_by_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS idx_background_jobs_type_status ON background_jobs(job_type, status)")
+    db.commit()
+
+
+def _migration_32_insight_refresh_schedule(db):
+    """Create insight_refresh_schedule with one row per published (post, platform).
+
+    Recently published posts are backfilled as due now so the planner picks
+    them up on its first run.
+    """
+    if not table_exists(db, 'insight_refresh_schedule'):
+        db.execute("""
+            CREATE TABLE insight_refresh_schedule (
+                post_id INTEGER NOT NULL REFERENCES scheduled_posts(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                published_at TIMESTAMP NOT NULL,
+                next_fetch_at TIMESTAMP,
+                last_fetched_at TIMESTAMP,
+                last_engagement INTEGER DEFAULT 0,
+                interval_minutes INTEGER DEFAULT 60,
+                failures INTEGER DEFAULT 0,
+                PRIMARY KEY (post_id, platform)
+            )
+        """)
+        db.execute("""CREATE INDEX IF NOT EXISTS idx_insight_refresh_due
+                      ON insight_refresh_schedule(next_fetch_at) WHERE next_fetch_at IS NOT NULL""")
+        db.execute("""
+            INSERT OR IGNORE INTO insight_refresh_schedule (post_id, platform, published_at, next_fetch_at)
+            SELECT pl.post_id, TRIM(pl.platform), MIN(pl.posted_at), datetime('now')
+            FROM post_logs pl
+            JOIN scheduled_posts sp ON sp.id = pl.post_id
+            WHERE pl.status = 'success' AND pl.posted_at >= datetime('now', '-30 days')
+            GROUP BY pl.post_id, TRIM(pl.platform)
+        """)
+    db.commit()
+
+
+def _migration_33_post_insight_snapshots(db):
+    """Create append-only post_insight_snapshots so metrics keep their history.
+
+    engagement_bp is the engagement rate in basis points (1/100 of a percent)
+    so every metric column is an integer. resolution_minutes is 0 for raw
+    snapshots and 60 / 1440 once compaction has downsampled them. Existing
+    post_insights rows are copied in as the first snapshot of each post.
+    """
+    if not table_exists(db, 'post_insight_snapshots'):
+        db.execute("""
+            CREATE TABLE post_insight_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                post_id INTEGER NOT NULL REFERENCES scheduled_posts(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                captured_at TIMESTAMP NOT NULL,
+                age_minutes INTEGER NOT NULL,
+                resolution_minutes INTEGER DEFAULT 0,
+                impressions INTEGER DEFAULT 0,
+                reach INTEGER DEFAULT 0,
+                likes INTEGER DEFAULT 0,
+                comments INTEGER DEFAULT 0,
+                shares INTEGER DEFAULT 0,
+                saves INTEGER DEFAULT 0,
+                clicks INTEGER DEFAULT 0,
+                video_views INTEGER DEFAULT 0,
+                engagement_bp INTEGER DEFAULT 0
+            )
+        """)
+        db.execute("""CREATE INDEX IF NOT EXISTS idx_snapshots_post_age
+                      ON post_insight_snapshots(post_id, platform, age_minutes)""")
+        db.execute("""CREATE INDEX IF NOT EXISTS idx_snapshots_age
+                      ON post_insight_snapshots(age_minutes, platform, post_id)""")
+        db.execute("""CREATE INDEX IF NOT EXISTS idx_snapshots_compaction
+                      ON post_insight_snapshots(resolution_minutes, captured_at)""")
+        db.execute("""
+            INSERT INTO post_insight_snapshots (post_id, platform, captured_at, age_minutes,
+                impressions, reach, likes, comments, shares, saves, clicks, video_views, engagement_bp)
+            SELECT pi.post_id, pi.platform, pi.fetched_at,
+                   MAX(0, CAST((julianday(pi.fetched_at) - julianday(COALESCE(
+                       (SELECT MIN(pl.posted_at) FROM post_logs pl
+                        WHERE pl.post_id = pi.post_id AND pl.status = 'success'),
+                       pi.fetched_at))) * 1440 AS INTEGER)),
+                   pi.impressions, pi.reach, pi.likes, pi.comments, pi.shares, pi.saves,
+                   pi.clicks, pi.video_views, CAST(ROUND(pi.engagement_rate * 100) AS INTEGER)
+            FROM post_insights pi
+        """)
+    db.commit()
+
+
+def _migration_34_structured_post_logs(db):
+    """Store post_logs.response as JSON with error_code, error_message and duration_ms columns.
+
+    Older rows hold a Python repr of the publish result; they are parsed with
+    ast.literal_eval (never eval) and rewritten as JSON, filling
+    external_post_id and error_message from the parsed result.
+    """
+    for column, ddl in (('error_code', "TEXT DEFAULT ''"), ('error_message', "TEXT DEFAULT ''"),
+                        ('duration_ms', 'INTEGER')):
+        if not column_exists(db, 'post_logs', column):
+            db.execute(f"ALTER TABLE post_logs ADD COLUMN {column} {ddl}")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_post_logs_lookup ON post_logs(post_id, platform, status)")
+
+    last_id = 0
+    while True:
+        rows = db.execute(
+            "SELECT id, status, response, external_post_id FROM post_logs WHERE id > ? ORDER BY id LIMIT 1000",
+            (last_id,)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            last_id = row['id']
+            raw = row['response'] or ''
+            try:
+                json.loads(raw)
+                continue  # already JSON
+            except ValueError:
+                pass
+            try:
+                parsed = ast.literal_eval(raw) if raw.startswith('{') else None
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                parsed = None
+            if not isinstance(parsed, dict):
+                parsed = {'success': row['status'] == 'success', 'error': raw} if raw else {}
+            error = parsed.get('error') or ''
+            if not isinstance(error, str):
+                error = json.dumps(error, default=str)
+            external_id = row['external_post_id'] or str(parsed.get('post_id') or parsed.get('id') or '')
+            updates.append((json.dumps(parsed, default=str), error, external_id, row['id']))
+        db.executemany(
+            "UPDATE post_logs SET response=?, error_message=?, external_post_id=? WHERE id=?", updates
+        )
+        db.commit()
+    db.commit()
+
+
+def _migration_35_insight_payloads(db):
+    """Create post_insight_payloads holding zlib-compressed raw API responses.
+
+    Existing post_insights.raw_data values are compressed into the side table
+    and blanked in the hot table.
+    """
+    if not table_exists(db, 'post_insight_payloads'):
+        db.execute("""
+            CREATE TABLE post_insight_payloads (
+                post_id INTEGER NOT NULL REFERENCES scheduled_posts(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                raw_size INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (post_id, platform)
+            )
+        """)
+    rows = db.execute(
+        "SELECT post_id, platform, raw_data FROM post_insights WHERE raw_data IS NOT NULL AND raw_data NOT IN ('', '{}')"
+    ).fetchall()
+    db.executemany(
+        """INSERT OR REPLACE INTO post_insight_payloads (post_id, platform, content_hash, payload, raw_size)
+           VALUES (?,?,?,?,?)""",
+        [(r['post_id'], r['platform'], hashlib.sha1(r['raw_data'].encode()).hexdigest(),
+          zlib.compress(r['raw_data'].encode(), 6), len(r['raw_data'])) for r in rows]
+    )
+    db.execute("UPDATE post_insights SET raw_data='' WHERE raw_data != ''")
+    db.commit()
+
+
+def _migration_36_account_daily_metrics(db):
+    """Create account_daily_metrics with one row per account per day.
+
+    followers is the total at collection time (only known for days the
+    collector ran); the other columns are the platform's daily values.
+    """
+    if not table_exists(db, 'account_daily_metrics'):
+        db.execute("""
+            CREATE TABLE account_daily_metrics (
+                account_id INTEGER NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+                date TEXT NOT NULL,
+                followers INTEGER,
+                followers_gained INTEGER,
+                reach INTEGER,
+                impressions INTEGER,
+                profile_views INTEGER,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (account_id, date)
+            ) WITHOUT ROWID
+        """)
+    db.commit()
+
+
+def _migration_37_story_refresh(db):
+    """Flag story rows in insight_refresh_schedule and index them by publish time.
+
+    Stories published in the last 24 hours (including *_story platforms,
+    which were not scheduled before) are added as due now.
+    """
+    if not column_exists(db, 'insight_refresh_schedule', 'is_story'):
+        db.execute("ALTER TABLE insight_refresh_schedule ADD COLUMN is_story INTEGER DEFAULT 0")
+    db.execute("""CREATE INDEX IF NOT EXISTS idx_insight_refresh_stories
+                  ON insight_refresh_schedule(published_at) WHERE is_story = 1""")
+    db.execute("""
+        UPDATE insight_refresh_schedule SET is_story = 1
+        WHERE substr(platform, -6) = '_story'
+           OR post_id IN (SELECT id FROM scheduled_posts WHERE post_type = 'story')
+    """)
+    db.execute("""
+        INSERT OR IGNORE INTO insight_refresh_schedule (post_id, platform, published_at, next_fetch_at, is_story)
+        SELECT pl.post_id, TRIM(pl.platform), MIN(pl.posted_at), datetime('now'), 1
+        FROM post_logs pl
+        JOIN scheduled_posts sp ON sp.id = pl.post_id
+        WHERE pl.status = 'success' AND pl.posted_at >= datetime('now', '-1 day')
+          AND (substr(TRIM(pl.platform), -6) = '_story' OR sp.post_type = 'story')
+        GROUP BY pl.post_id, TRIM(pl.platform)
+    """)
+    db.commit()
+
+
+def _migration_38_analytics_rollups(db):
+    """Daily analytics rollups kept current through dirty-day triggers.
+
+    Any change to a post's bucketing columns or to its insights marks the
+    post's day in analytics_rollup_dirty, and the scheduler's
+    analytics_rollups_job (app.py) recomputes dirty days every minute
+    through services/analytics_rollups.py; /api/analytics only reads the
+    stored rollups. All existing days start dirty, so the rollups are
+    built by the first job run after deploying and /api/analytics returns
+    empty figures until then.
+    """
+    day = "IFNULL(DATE(COALESCE({0}scheduled_at, {0}created_at)), '')"
+    metrics = """impressions INTEGER DEFAULT 0,
+                reach INTEGER DEFAULT 0,
+                likes INTEGER DEFAULT 0,
+                comments INTEGER DEFAULT 0,
+                shares INTEGER DEFAULT 0,
+                saves INTEGER DEFAULT 0,
+                clicks INTEGER DEFAULT 0,
+                video_views INTEGER DEFAULT 0,
+                engagement_rate_sum REAL DEFAULT 0"""
+    if not table_exists(db, 'analytics_post_rollup'):
+        db.execute(f"""
+            CREATE TABLE analytics_post_rollup (
+                day TEXT NOT NULL,
+                client_id INTEGER,
+                hour INTEGER,
+                platforms TEXT,
+                post_type TEXT,
+                status TEXT,
+                workflow_status TEXT,
+                posts INTEGER DEFAULT 0,
+                posts_with_insights INTEGER DEFAULT 0,
+                joined_rows INTEGER DEFAULT 0,
+                insight_rows INTEGER DEFAULT 0,
+                {metrics}
+            )
+        """)
+    if not table_exists(db, 'analytics_platform_rollup'):
+        db.execute(f"""
+            CREATE TABLE analytics_platform_rollup (
+                day TEXT NOT NULL,
+                client_id INTEGER,
+                hour INTEGER,
+                platform TEXT,
+                post_type TEXT,
+                insight_rows INTEGER DEFAULT 0,
+                {metrics}
+            )
+        """)
+    if not table_exists(db, 'analytics_rollup_dirty'):
+        db.execute("CREATE TABLE analytics_rollup_dirty (day TEXT PRIMARY KEY) WITHOUT ROWID")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_post_rollup_day ON analytics_post_rollup(day, client_id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_platform_rollup_day ON analytics_platform_rollup(day, client_id)")
+    # Lets a rollup refresh find the posts of a dirty day without a table scan
+    db.execute(f"CREATE INDEX IF NOT EXISTS idx_posts_rollup_day ON scheduled_posts({day.format('')})")
+
+    # Upserts rather than OR IGNORE: inside a trigger an OR clause is
+    # overridden by the firing statement's own conflict policy, which made
+    # insights upserts fail on days already marked dirty
+    db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_post_insert AFTER INSERT ON scheduled_posts
+        BEGIN
+            INSERT INTO analytics_rollup_dirty (day) VALUES ({day.format('NEW.')}) ON CONFLICT(day) DO NOTHING;
+        END
+    """)
+    db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_post_update
+        AFTER UPDATE OF client_id, platforms, post_type, status, workflow_status, scheduled_at, created_at
+        ON scheduled_posts
+        BEGIN
+            INSERT INTO analytics_rollup_dirty (day) VALUES ({day.format('OLD.')}) ON CONFLICT(day) DO NOTHING;
+            INSERT INTO analytics_rollup_dirty (day) VALUES ({day.format('NEW.')}) ON CONFLICT(day) DO NOTHING;
+        END
+    """)
+    db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_post_delete AFTER DELETE ON scheduled_posts
+        BEGIN
+            INSERT INTO analytics_rollup_dirty (day) VALUES ({day.format('OLD.')}) ON CONFLICT(day) DO NOTHING;
+        END
+    """)
+    for event, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_insights_{event.lower()} AFTER {event} ON post_insights
+            BEGIN
+                INSERT INTO analytics_rollup_dirty (day)
+                SELECT {day.format('')} FROM scheduled_posts WHERE id = {ref}.post_id
+                ON CONFLICT(day) DO NOTHING;
+            END
+        """)
+
+    db.execute(f"INSERT OR IGNORE INTO analytics_rollup_dirty (day) SELECT DISTINCT {day.format('')} FROM scheduled_posts")
+    db.commit()
+
+
+def _migration_39_table_versions(db):
+    """Per-table change counters used to invalidate cached responses.
+
+    Every row written to a tracked table bumps its counter, so a cached
+    response tagged with older counters is known to be stale.
+    """
+    if not table_exists(db, 'table_versions'):
+        db.execute("""
+            CREATE TABLE table_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+    for table in ('scheduled_posts', 'post_insights', 'workflow_history'):
+        db.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+    db.commit()
+
+
+def _migration_40_created_at_indexes(db):
+    """Index created_at so monthly team stats read only the current month."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_at ON scheduled_posts(created_at)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_workflow_history_created_at ON workflow_history(created_at)")
+    db.commit()
+
+
+def _migration_41_engagement_slot_stats(db):
+    """Engagement sums and counts per (client, platform, weekday, hour) for best-time ranking.
+
+    Weekday is Monday=0 like Python's datetime.weekday(); the slot is taken
+    from the post's scheduled_at (falling back to created_at) and the
+    platform is the base platform (_story/_reel stripped). Triggers keep the
+    sums current as insights are written and as posts move slots.
+    """
+    if not table_exists(db, 'engagement_slot_stats'):
+        db.execute("""
+            CREATE TABLE engagement_slot_stats (
+                client_id INTEGER NOT NULL,
+                platform TEXT NOT NULL,
+                weekday INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                posts INTEGER NOT NULL DEFAULT 0,
+                engagement_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (client_id, platform, weekday, hour)
+            ) WITHOUT ROWID
+        """)
+
+    def weekday(p):
+        return f"(CAST(strftime('%w', COALESCE({p}.scheduled_at, {p}.created_at)) AS INTEGER) + 6) % 7"
+
+    def hour(p):
+        return f"CAST(strftime('%H', COALESCE({p}.scheduled_at, {p}.created_at)) AS INTEGER)"
+
+    def base(col):
+        return f"REPLACE(REPLACE({col}, '_story', ''), '_reel', '')"
+
+    upsert = """ON CONFLICT(client_id, platform, weekday, hour) DO UPDATE SET
+                    posts = posts + excluded.posts, engagement_sum = engagement_sum + excluded.engagement_sum"""
+
+    def add_post(p):
+        """Add every insights row of post p to its slot."""
+        return f"""
+            INSERT INTO engagement_slot_stats (client_id, platform, weekday, hour, posts, engagement_sum)
+            SELECT {p}.client_id, {base('pi.platform')}, {weekday(p)}, {hour(p)},
+                   COUNT(*), IFNULL(SUM(pi.engagement_rate), 0)
+            FROM post_insights pi
+            WHERE pi.post_id = {p}.id AND {p}.client_id IS NOT NULL AND {weekday(p)} IS NOT NULL
+            GROUP BY {base('pi.platform')}
+            {upsert};"""
+
+    def remove_post(p):
+        """Take every insights row of post p out of its slot."""
+        match = f"pi.post_id = {p}.id AND {base('pi.platform')} = engagement_slot_stats.platform"
+        return f"""
+            UPDATE engagement_slot_stats SET
+                posts = posts - (SELECT COUNT(*) FROM post_insights pi WHERE {match}),
+                engagement_sum = engagement_sum
+                    - (SELECT IFNULL(SUM(pi.engagement_rate), 0) FROM post_insights pi WHERE {match})
+            WHERE client_id = {p}.client_id AND weekday = {weekday(p)} AND hour = {hour(p)}
+              AND platform IN (SELECT {base('platform')} FROM post_insights WHERE post_id = {p}.id);"""
+
+    def add_insight(row):
+        return f"""
+            INSERT INTO engagement_slot_stats (client_id, platform, weekday, hour, posts, engagement_sum)
+            SELECT sp.client_id, {base(row + '.platform')}, {weekday('sp')}, {hour('sp')},
+                   1, IFNULL({row}.engagement_rate, 0)
+            FROM scheduled_posts sp
+            WHERE sp.id = {row}.post_id AND sp.client_id IS NOT NULL AND {weekday('sp')} IS NOT NULL
+            {upsert};"""
+
+    def remove_insight(row):
+        return f"""
+            UPDATE engagement_slot_stats SET
+                posts = posts - 1, engagement_sum = engagement_sum - IFNULL({row}.engagement_rate, 0)
+            WHERE platform = {base(row + '.platform')}
+              AND (client_id, weekday, hour) = (
+                  SELECT sp.client_id, {weekday('sp')}, {hour('sp')} FROM scheduled_posts sp WHERE sp.id = {row}.post_id
+              );"""
+
+    triggers = {
+        'trg_slot_insights_insert': ('AFTER INSERT ON post_insights', add_insight('NEW')),
+        'trg_slot_insights_update': ('AFTER UPDATE OF platform, engagement_rate, post_id ON post_insights',
+                                     remove_insight('OLD') + add_insight('NEW')),
+        'trg_slot_insights_delete': ('AFTER DELETE ON post_insights', remove_insight('OLD')),
+        'trg_slot_post_update': ('AFTER UPDATE OF client_id, scheduled_at, created_at ON scheduled_posts',
+                                 remove_post('OLD') + add_post('NEW')),
+        # Before the delete: cascaded insights deletes can no longer find the post
+        'trg_slot_post_delete': ('BEFORE DELETE ON scheduled_posts', remove_post('OLD')),
+    }
+    for name, (event, body) in triggers.items():
+        db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    db.execute("DELETE FROM engagement_slot_stats")
+    db.execute(f"""
+        INSERT INTO engagement_slot_stats (client_id, platform, weekday, hour, posts, engagement_sum)
+        SELECT sp.client_id, {base('pi.platform')}, {weekday('sp')}, {hour('sp')},
+               COUNT(*), IFNULL(SUM(pi.engagement_rate), 0)
+        FROM post_insights pi
+        JOIN scheduled_posts sp ON sp.id = pi.post_id
+        WHERE sp.client_id IS NOT NULL AND {weekday('sp')} IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+    db.commit()
+
+
+def _migration_42_analytics_export(db):
+    """Change log feeding the optional columnar analytics store (services/analytics_store.py).
+
+    While analytics_export_state has tracking = '1', triggers record the id
+    of every written scheduled_posts and post_insights row. workflow_history
+    and user_activity are append-only and are exported by id watermark.
+    """
+    if not table_exists(db, 'analytics_export_state'):
+        db.execute("""
+            CREATE TABLE analytics_export_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            ) WITHOUT ROWID
+        """)
+    if not table_exists(db, 'analytics_export_changes'):
+        db.execute("""
+            CREATE TABLE analytics_export_changes (
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                PRIMARY KEY (table_name, row_id)
+            ) WITHOUT ROWID
+        """)
+    db.execute("INSERT OR IGNORE INTO analytics_export_state (key, value) VALUES ('tracking', '0')")
+    tracking = "(SELECT value FROM analytics_export_state WHERE key = 'tracking') = '1'"
+    for table in ('scheduled_posts', 'post_insights'):
+        for event, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_export_{table}_{event.lower()} AFTER {event} ON {table}
+                WHEN {tracking}
+                BEGIN
+                    INSERT INTO analytics_export_changes (table_name, row_id) VALUES ('{table}', {ref}.id)
+                    ON CONFLICT(table_name, row_id) DO NOTHING;
+                END
+            """)
+    db.commit()
+
+
+def _migration_43_version_rules_and_clients(db):
+    """Change counters for client_posting_rules and clients (see migration 39).
+
+    The capacity forecast is derived from posting rules and client
+    assignments, so its cached results must go stale when either changes.
+    """
+    for table in ('client_posting_rules', 'clients'):
+        db.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+    db.commit()
+
+
+def _migration_44_client_content_requirements(db):
+    """One row per client content requirement, backfilled from the clients.content_requirements JSON.
+
+    The JSON column is only read. The parser is a frozen copy of how the
+    requirements were read when this migration was written, so later
+    changes to services/content_requirements.py do not change the backfill.
+    """
+    def parse(value):
+        try:
+            reqs = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return []
+        rows = []
+        for r in reqs if isinstance(reqs, list) else []:
+            if not isinstance(r, dict) or not r.get('type'):
+                continue
+            try:
+                count = int(r.get('count') or 0)
+            except (TypeError, ValueError):
+                continue
+            if count <= 0:
+                continue
+            platforms = r.get('platforms') or ([r['platform']] if r.get('platform') else [])
+            if isinstance(platforms, str):
+                platforms = [p.strip() for p in platforms.split(',') if p.strip()]
+            rows.append((str(r['type']), ','.join(str(p) for p in platforms), count))
+        return rows
+
+    if not table_exists(db, 'client_content_requirements'):
+        db.execute("""
+            CREATE TABLE client_content_requirements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL DEFAULT 0,
+                content_type TEXT NOT NULL,
+                platforms TEXT DEFAULT '',
+                monthly_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_content_requirements_client "
+               "ON client_content_requirements(client_id, content_type, monthly_count)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_content_requirements_type "
+               "ON client_content_requirements(content_type, client_id, monthly_count)")
+    for row in db.execute(
+        "SELECT id, content_requirements FROM clients "
+        "WHERE content_requirements IS NOT NULL AND content_requirements != '' "
+        "AND id NOT IN (SELECT client_id FROM client_content_requirements)"
+    ).fetchall():
+        db.executemany(
+            "INSERT INTO client_content_requirements (client_id, position, content_type, platforms, monthly_count) "
+            "VALUES (?,?,?,?,?)",
+            [(row['id'], i, *req) for i, req in enumerate(parse(row['content_requirements']))]
+        )
+    db.commit()
+
+
+def _migration_45_overview_indexes(db):
+    """Indexes behind the grouped clients overview queries (services/client_overview.py)."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_scheduled_client ON scheduled_posts(scheduled_at, client_id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_client_status ON scheduled_posts(client_id, workflow_status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_accounts_client ON accounts(client_id)")
+    db.commit()
+
+
+def _migration_46_client_week_coverage(db):
+    """Scheduled posts per client and ISO week, with a 7-bit mask of the days covered.
+
+    week_start is the Monday of the week; d0 (Monday) to d6 (Sunday) count
+    the posts scheduled on each day and mask sets bit n when dn > 0. The
+    day is the date part of scheduled_at as written, since DATE() would
+    move a time with a UTC offset to its UTC day. Posts without a readable
+    scheduled_at are not counted. Triggers keep the counts current as posts
+    are created, rescheduled, moved or deleted.
+    """
+    days = range(7)
+    if not table_exists(db, 'client_week_coverage'):
+        mask = ' | '.join(f'((d{n} > 0) << {n})' for n in days)
+        db.execute(f"""
+            CREATE TABLE client_week_coverage (
+                client_id INTEGER NOT NULL,
+                week_start TEXT NOT NULL,
+                posts INTEGER NOT NULL DEFAULT 0,
+                {' '.join(f'd{n} INTEGER NOT NULL DEFAULT 0,' for n in days)}
+                mask INTEGER GENERATED ALWAYS AS ({mask}) STORED,
+                PRIMARY KEY (client_id, week_start)
+            ) WITHOUT ROWID
+        """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_client_week_coverage_week ON client_week_coverage(week_start)")
+
+    def day(p):
+        return f"DATE(SUBSTR({p}.scheduled_at, 1, 10))"
+
+    def weekday(p):
+        return f"((CAST(strftime('%w', {day(p)}) AS INTEGER) + 6) % 7)"
+
+    def week_start(p):
+        return f"DATE({day(p)}, '-' || {weekday(p)} || ' days')"
+
+    def add_post(p):
+        return f"""
+            INSERT INTO client_week_coverage (client_id, week_start, posts, {', '.join(f'd{n}' for n in days)})
+            SELECT {p}.client_id, {week_start(p)}, 1, {', '.join(f'{weekday(p)} = {n}' for n in days)}
+            WHERE {p}.client_id IS NOT NULL AND {day(p)} IS NOT NULL
+            ON CONFLICT(client_id, week_start) DO UPDATE SET
+                posts = posts + 1, {', '.join(f'd{n} = d{n} + excluded.d{n}' for n in days)};"""
+
+    def remove_post(p):
+        return f"""
+            UPDATE client_week_coverage SET
+                posts = posts - 1, {', '.join(f'd{n} = d{n} - ({weekday(p)} = {n})' for n in days)}
+            WHERE client_id = {p}.client_id AND week_start = {week_start(p)};"""
+
+    triggers = {
+        'trg_coverage_post_insert': ('AFTER INSERT ON scheduled_posts', add_post('NEW')),
+        'trg_coverage_post_update': ('AFTER UPDATE OF client_id, scheduled_at ON scheduled_posts',
+                                     remove_post('OLD') + add_post('NEW')),
+        'trg_coverage_post_delete': ('AFTER DELETE ON scheduled_posts', remove_post('OLD')),
+    }
+    for name, (event, body) in triggers.items():
+        db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    db.execute("DELETE FROM client_week_coverage")
+    db.execute(f"""
+        INSERT INTO client_week_coverage (client_id, week_start, posts, {', '.join(f'd{n}' for n in days)})
+        SELECT sp.client_id, {week_start('sp')}, COUNT(*), {', '.join(f'SUM({weekday("sp")} = {n})' for n in days)}
+        FROM scheduled_posts sp
+        WHERE sp.client_id IS NOT NULL AND {day('sp')} IS NOT NULL
+        GROUP BY sp.client_id, {week_start('sp')}
+    """)
+    db.commit()
+
+
+def _migration_47_account_health(db):
+    """Last token check per account, reused until expires_at (services/account_health.py)."""
+    if not table_exists(db, 'account_health'):
+        db.execute("""
+            CREATE TABLE account_health (
+                account_id INTEGER PRIMARY KEY REFERENCES accounts(id) ON DELETE CASCADE,
+                status TEXT NOT NULL,
+                message TEXT DEFAULT '',
+                code INTEGER,
+                needs_reauth INTEGER DEFAULT 0,
+                remote_name TEXT DEFAULT '',
+                checked_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+        """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_account_health_expires ON account_health(expires_at)")
+    # A new token or account id invalidates the stored result
+    db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_account_health_reset AFTER UPDATE OF access_token, account_id, platform ON accounts
+        BEGIN
+            DELETE FROM account_health WHERE account_id = NEW.id;
+        END
+    """)
+    db.commit()
+
+
+def _migration_48_client_logo_state(db):
+    """Validators and content hash of each client's last logo fetch (services/logo_fetch.py)."""
+    if not table_exists(db, 'client_logo_state'):
+        db.execute("""
+            CREATE TABLE client_logo_state (
+                client_id INTEGER PRIMARY KEY REFERENCES clients(id) ON DELETE CASCADE,
+                website TEXT NOT NULL,
+                page_etag TEXT DEFAULT '',
+                page_last_modified TEXT DEFAULT '',
+                logo_src TEXT DEFAULT '',
+                image_etag TEXT DEFAULT '',
+                image_last_modified TEXT DEFAULT '',
+                content_hash TEXT DEFAULT '',
+                logo_url TEXT DEFAULT '',
+                fetched_at TEXT NOT NULL
+            )
+        """)
+    db.commit()
+
+
+def _migration_49_post_listing_indexes(db):
+    """Keyset pages of /api/all-posts (services/post_listing.py).
+
+    Both indexes end in the implicit rowid, so (scheduled_at, id) order
+    needs no sort step.
+    """
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_scheduled_at ON scheduled_posts(scheduled_at)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_status_scheduled ON scheduled_posts(status, scheduled_at)")
+    db.commit()
+
+
+def _migration_50_pipeline_board_index(db):
+    """Open posts by board column in card order (services/pipeline_board.py).
+
+    The column and priority expressions and the WHERE must stay identical
+    to the ones the board queries use, or SQLite will not pick the index.
+    """
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_posts_pipeline_board ON scheduled_posts(
+            (CASE WHEN workflow_status IN ('pending_review', 'in_design', 'approved', 'scheduled')
+                  THEN workflow_status ELSE 'draft' END),
+            (CASE priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END),
+            created_at DESC, id DESC
+        )
+        WHERE workflow_status IS NOT NULL AND workflow_status NOT IN ('', 'posted')
+    """)
+    db.commit()
+
+
+def _migration_51_assignee_status_indexes(db):
+    """One (assignee, workflow_status) index per role column for the my-work inboxes (services/my_work.py)."""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_writer_status ON scheduled_posts(assigned_writer_id, workflow_status)")
+    # created_at serves the admin inbox's newest unassigned drafts
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_designer_status "
+               "ON scheduled_posts(assigned_designer_id, workflow_status, created_at)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_motion_status ON scheduled_posts(assigned_motion_id, workflow_status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_manager_status ON scheduled_posts(assigned_manager_id, workflow_status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_sm_status ON scheduled_posts(assigned_sm_id, workflow_status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_posts_creator_status ON scheduled_posts(created_by_id, workflow_status)")
+    db.commit()
+
+
+def _migration_52_version_users(db):
+    """Change counter for users (see migration 39).
+
+    The capacity forecast only charges active users, so its cached results
+    must go stale when a user is added, deactivated or changes role.
+    """
+    db.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES ('users', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_version_users_{event.lower()} AFTER {event} ON users
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+            END
+        """)
+    db.commit()
+
+
+def _migration_53_account_metrics_state(db):
+    """Last day each account's daily metrics were collected through (services/account_metrics.py).
+
+    Seeded from the last complete day already stored per account.
+    """
+    if not table_exists(db, 'account_metrics_state'):
+        db.execute("""
+            CREATE TABLE account_metrics_state (
+                account_id INTEGER PRIMARY KEY REFERENCES accounts(id) ON DELETE CASCADE,
+                collected_through TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+    db.execute("""
+        INSERT OR IGNORE INTO account_metrics_state (account_id, collected_through, updated_at)
+        SELECT m.account_id, MAX(m.date), datetime('now') FROM account_daily_metrics m
+        JOIN accounts a ON a.id = m.account_id
+        WHERE m.date < DATE('now') AND COALESCE(m.reach, m.impressions, m.profile_views, m.followers_gained) IS NOT NULL
+        GROUP BY m.account_id
+    """)
+    db.commit()
+
+
+def _migration_54_coverage_local_dates(db):
+    """Rebuild client_week_coverage and its triggers with the day taken as written (see migration 46).
+
+    Databases migrated before that fix counted posts with a UTC offset on
+    their UTC day.
+    """
+    for name in ('trg_coverage_post_insert', 'trg_coverage_post_update', 'trg_coverage_post_delete'):
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    _migration_46_client_week_coverage(db)
+
+
 if __name__ == '__main__':
     run_migrations()
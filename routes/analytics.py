@@ -1,8 +1,8 @@
-import json
 from datetime import datetime
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, session
 from models import get_db, dict_from_row, dicts_from_rows
 from routes.auth import require_login
+from services import analytics_store, best_time, content_requirements, response_cache
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -31,12 +31,33 @@ def get_stats():
     })
 
 
+# Tables whose writes invalidate cached analytics responses
+CACHED_TABLES = ('scheduled_posts', 'post_insights', 'workflow_history')
+
+# /api/analytics reads the rollups, which the scheduler refreshes after the writes
+ROLLUP_TABLES = CACHED_TABLES + ('analytics_rollups',)
+
+
+def _cached_json(endpoint, params, compute, tables=CACHED_TABLES):
+    """JSON response for compute(), served from the versioned response cache.
+
+    The UTC date is part of the key because date windows move with it.
+    """
+    key = (endpoint, params, datetime.utcnow().date().isoformat())
+    body = response_cache.cache.get_or_compute(key, tables, lambda: current_app.json.dumps(compute()))
+    return current_app.response_class(body, mimetype='application/json')
+
+
 @analytics_bp.route('/api/analytics', methods=['GET'])
 def get_analytics():
     """Comprehensive analytics with real engagement data, date range, and client filtering."""
-    db = get_db()
     client_id = request.args.get('client_id', '')
     period = request.args.get('period', '30')  # days: 7, 30, 90, all
+    return _cached_json('analytics', (client_id, period), lambda: _analytics(client_id, period), ROLLUP_TABLES)
+
+
+def _analytics(client_id, period):
+    db = get_db()
 
     # Build date filter
     if period == 'all':
@@ -55,163 +76,182 @@ def get_analytics():
 
     params = client_params
 
-    # === CONTENT METRICS ===
-    total = db.execute(f"SELECT COUNT(*) as c FROM scheduled_posts sp WHERE 1=1 {date_filter} {client_filter}", params).fetchone()['c']
-    posted = db.execute(f"SELECT COUNT(*) as c FROM scheduled_posts sp WHERE sp.status='posted' {date_filter} {client_filter}", params).fetchone()['c']
-    failed = db.execute(f"SELECT COUNT(*) as c FROM scheduled_posts sp WHERE sp.status='failed' {date_filter} {client_filter}", params).fetchone()['c']
-    in_progress = db.execute(f"SELECT COUNT(*) as c FROM scheduled_posts sp WHERE sp.workflow_status NOT IN ('posted','draft') {date_filter} {client_filter}", params).fetchone()['c']
+    # Aggregates come from the daily rollups (services/analytics_rollups.py),
+    # kept current by the scheduler; a read never recomputes them
+    rollup_date_filter = ''
+    rollup_date_params = []
+    if period != 'all':
+        rollup_date_filter = "AND r.day >= DATE('now', ?)"
+        rollup_date_params = [f'-{int(period)} days']
+    rollup_filters = rollup_date_filter
+    rollup_params = list(rollup_date_params)
+    if client_id:
+        rollup_filters += ' AND r.client_id = ?'
+        rollup_params.append(int(client_id))
+
+    # === CONTENT + ENGAGEMENT METRICS ===
+    totals = dict_from_row(db.execute(f"""
+        SELECT COALESCE(SUM(r.posts), 0) as total,
+               COALESCE(SUM(CASE WHEN r.status = 'posted' THEN r.posts END), 0) as posted,
+               COALESCE(SUM(CASE WHEN r.status = 'failed' THEN r.posts END), 0) as failed,
+               COALESCE(SUM(CASE WHEN r.workflow_status NOT IN ('posted','draft') THEN r.posts END), 0) as in_progress,
+               COALESCE(SUM(r.impressions), 0) as total_impressions,
+               COALESCE(SUM(r.reach), 0) as total_reach,
+               COALESCE(SUM(r.likes), 0) as total_likes,
+               COALESCE(SUM(r.comments), 0) as total_comments,
+               COALESCE(SUM(r.shares), 0) as total_shares,
+               COALESCE(SUM(r.saves), 0) as total_saves,
+               COALESCE(SUM(r.clicks), 0) as total_clicks,
+               COALESCE(SUM(r.video_views), 0) as total_video_views,
+               COALESCE(SUM(r.engagement_rate_sum) / NULLIF(SUM(r.insight_rows), 0), 0) as avg_engagement_rate,
+               COALESCE(SUM(r.posts_with_insights), 0) as posts_with_insights
+        FROM analytics_post_rollup r
+        WHERE 1=1 {rollup_filters}
+    """, rollup_params).fetchone())
+    total = totals['total']
+    posted = totals['posted']
+    failed = totals['failed']
+    in_progress = totals['in_progress']
     success_rate = round((posted / total * 100) if total > 0 else 0, 1)
-
-    # === ENGAGEMENT METRICS (from post_insights) ===
-    engagement_query = f"""
-        SELECT
-            COALESCE(SUM(pi.impressions), 0) as total_impressions,
-            COALESCE(SUM(pi.reach), 0) as total_reach,
-            COALESCE(SUM(pi.likes), 0) as total_likes,
-            COALESCE(SUM(pi.comments), 0) as total_comments,
-            COALESCE(SUM(pi.shares), 0) as total_shares,
-            COALESCE(SUM(pi.saves), 0) as total_saves,
-            COALESCE(SUM(pi.clicks), 0) as total_clicks,
-            COALESCE(SUM(pi.video_views), 0) as total_video_views,
-            COALESCE(AVG(pi.engagement_rate), 0) as avg_engagement_rate,
-            COUNT(DISTINCT pi.post_id) as posts_with_insights
-        FROM post_insights pi
-        JOIN scheduled_posts sp ON pi.post_id = sp.id
-        WHERE 1=1 {date_filter} {client_filter}
-    """
-    eng = dict_from_row(db.execute(engagement_query, params).fetchone()) or {}
+    eng = totals
 
     # === POSTS PER DAY ===
     posts_per_day = dicts_from_rows(db.execute(f"""
-        SELECT DATE(COALESCE(sp.scheduled_at, sp.created_at)) as date, COUNT(*) as count
-        FROM scheduled_posts sp
-        WHERE 1=1 {date_filter} {client_filter}
-        GROUP BY date ORDER BY date
-    """, params).fetchall())
+        SELECT NULLIF(r.day, '') as date, SUM(r.posts) as count
+        FROM analytics_post_rollup r
+        WHERE 1=1 {rollup_filters}
+        GROUP BY r.day ORDER BY r.day
+    """, rollup_params).fetchall())
 
     # === ENGAGEMENT PER DAY ===
     engagement_per_day = dicts_from_rows(db.execute(f"""
-        SELECT DATE(COALESCE(sp.scheduled_at, sp.created_at)) as date,
-               SUM(pi.impressions) as impressions,
-               SUM(pi.reach) as reach,
-               SUM(pi.likes) as likes,
-               SUM(pi.comments) as comments
-        FROM post_insights pi
-        JOIN scheduled_posts sp ON pi.post_id = sp.id
-        WHERE 1=1 {date_filter} {client_filter}
-        GROUP BY date ORDER BY date
-    """, params).fetchall())
+        SELECT NULLIF(r.day, '') as date,
+               SUM(r.impressions) as impressions,
+               SUM(r.reach) as reach,
+               SUM(r.likes) as likes,
+               SUM(r.comments) as comments
+        FROM analytics_post_rollup r
+        WHERE 1=1 {rollup_filters}
+        GROUP BY r.day HAVING SUM(r.insight_rows) > 0 ORDER BY r.day
+    """, rollup_params).fetchall())
 
     # === PLATFORM DISTRIBUTION ===
     platform_distribution = dicts_from_rows(db.execute(f"""
-        SELECT sp.platforms as platform, COUNT(*) as count
-        FROM scheduled_posts sp
-        WHERE 1=1 {date_filter} {client_filter}
-        GROUP BY sp.platforms ORDER BY count DESC
-    """, params).fetchall())
+        SELECT r.platforms as platform, SUM(r.posts) as count
+        FROM analytics_post_rollup r
+        WHERE 1=1 {rollup_filters}
+        GROUP BY r.platforms ORDER BY count DESC
+    """, rollup_params).fetchall())
 
     # === PLATFORM ENGAGEMENT ===
     platform_engagement = dicts_from_rows(db.execute(f"""
-        SELECT pi.platform,
-               SUM(pi.impressions) as impressions,
-               SUM(pi.reach) as reach,
-               SUM(pi.likes) as likes,
-               SUM(pi.comments) as comments,
-               SUM(pi.shares) as shares,
-               AVG(pi.engagement_rate) as avg_engagement_rate,
-               COUNT(*) as posts
-        FROM post_insights pi
-        JOIN scheduled_posts sp ON pi.post_id = sp.id
-        WHERE 1=1 {date_filter} {client_filter}
-        GROUP BY pi.platform ORDER BY impressions DESC
-    """, params).fetchall())
+        SELECT r.platform,
+               SUM(r.impressions) as impressions,
+               SUM(r.reach) as reach,
+               SUM(r.likes) as likes,
+               SUM(r.comments) as comments,
+               SUM(r.shares) as shares,
+               SUM(r.engagement_rate_sum) / SUM(r.insight_rows) as avg_engagement_rate,
+               SUM(r.insight_rows) as posts
+        FROM analytics_platform_rollup r
+        WHERE 1=1 {rollup_filters}
+        GROUP BY r.platform ORDER BY impressions DESC
+    """, rollup_params).fetchall())
 
     # === CONTENT TYPE PERFORMANCE ===
+    # joined_rows counts a post once per insights row (at least once), as the
+    # post / insights join these figures were first defined on did
     content_type_stats = dicts_from_rows(db.execute(f"""
-        SELECT sp.post_type as type, COUNT(*) as count,
-               COALESCE(AVG(pi.engagement_rate), 0) as avg_engagement,
-               COALESCE(SUM(pi.impressions), 0) as impressions,
-               COALESCE(SUM(pi.likes), 0) as likes
-        FROM scheduled_posts sp
-        LEFT JOIN post_insights pi ON sp.id = pi.post_id
-        WHERE sp.post_type IS NOT NULL {date_filter} {client_filter}
-        GROUP BY sp.post_type ORDER BY count DESC
-    """, params).fetchall())
+        SELECT r.post_type as type, SUM(r.joined_rows) as count,
+               COALESCE(SUM(r.engagement_rate_sum) / NULLIF(SUM(r.insight_rows), 0), 0) as avg_engagement,
+               COALESCE(SUM(r.impressions), 0) as impressions,
+               COALESCE(SUM(r.likes), 0) as likes
+        FROM analytics_post_rollup r
+        WHERE r.post_type IS NOT NULL {rollup_filters}
+        GROUP BY r.post_type ORDER BY count DESC
+    """, rollup_params).fetchall())
 
     # === BEST POSTING HOURS ===
     hourly_distribution = dicts_from_rows(db.execute(f"""
-        SELECT CAST(strftime('%H', COALESCE(sp.scheduled_at, sp.created_at)) AS INTEGER) as hour,
-               COUNT(*) as count,
-               COALESCE(AVG(pi.engagement_rate), 0) as avg_engagement
-        FROM scheduled_posts sp
-        LEFT JOIN post_insights pi ON sp.id = pi.post_id
-        WHERE 1=1 {date_filter} {client_filter}
-        GROUP BY hour ORDER BY hour
-    """, params).fetchall())
+        SELECT r.hour, SUM(r.joined_rows) as count,
+               COALESCE(SUM(r.engagement_rate_sum) / NULLIF(SUM(r.insight_rows), 0), 0) as avg_engagement
+        FROM analytics_post_rollup r
+        WHERE 1=1 {rollup_filters}
+        GROUP BY r.hour ORDER BY r.hour
+    """, rollup_params).fetchall())
 
     # === TOP CLIENTS BY ENGAGEMENT ===
     top_clients = dicts_from_rows(db.execute(f"""
-        SELECT c.id, c.name, c.color, COUNT(sp.id) as posts,
-               COALESCE(SUM(pi.impressions), 0) as impressions,
-               COALESCE(SUM(pi.reach), 0) as reach,
-               COALESCE(SUM(pi.likes), 0) as likes,
-               COALESCE(SUM(pi.comments), 0) as comments,
-               COALESCE(AVG(pi.engagement_rate), 0) as avg_engagement_rate
-        FROM scheduled_posts sp
-        JOIN clients c ON sp.client_id = c.id
-        LEFT JOIN post_insights pi ON sp.id = pi.post_id
-        WHERE 1=1 {date_filter}
-        GROUP BY sp.client_id ORDER BY impressions DESC, posts DESC
-        LIMIT 10
-    """).fetchall())
-
-    # === TOP PERFORMING POSTS ===
-    top_posts = dicts_from_rows(db.execute(f"""
-        SELECT sp.id, sp.topic, sp.caption, sp.post_type, sp.platforms,
-               sp.scheduled_at, sp.design_output_urls, c.name as client_name,
-               pi.impressions, pi.reach, pi.likes, pi.comments, pi.shares,
-               pi.saves, pi.engagement_rate, pi.video_views
-        FROM post_insights pi
-        JOIN scheduled_posts sp ON pi.post_id = sp.id
-        LEFT JOIN clients c ON sp.client_id = c.id
-        WHERE 1=1 {date_filter} {client_filter}
-        ORDER BY pi.engagement_rate DESC, pi.impressions DESC
+        SELECT c.id, c.name, c.color, SUM(r.joined_rows) as posts,
+               COALESCE(SUM(r.impressions), 0) as impressions,
+               COALESCE(SUM(r.reach), 0) as reach,
+               COALESCE(SUM(r.likes), 0) as likes,
+               COALESCE(SUM(r.comments), 0) as comments,
+               COALESCE(SUM(r.engagement_rate_sum) / NULLIF(SUM(r.insight_rows), 0), 0) as avg_engagement_rate
+        FROM analytics_post_rollup r
+        JOIN clients c ON r.client_id = c.id
+        WHERE 1=1 {rollup_date_filter}
+        GROUP BY r.client_id ORDER BY impressions DESC, posts DESC
         LIMIT 10
-    """, params).fetchall())
+    """, rollup_date_params).fetchall())
 
     # === WORKFLOW STATS ===
     workflow_breakdown = dicts_from_rows(db.execute(f"""
-        SELECT sp.workflow_status as status, COUNT(*) as count
-        FROM scheduled_posts sp
-        WHERE 1=1 {date_filter} {client_filter}
-        GROUP BY sp.workflow_status ORDER BY count DESC
-    """, params).fetchall())
-
-    # === TEAM PERFORMANCE ===
-    team_performance = dicts_from_rows(db.execute(f"""
-        SELECT u.username, u.role,
-               COUNT(DISTINCT wh.post_id) as actions,
-               COUNT(DISTINCT CASE WHEN wh.to_status = 'approved' THEN wh.post_id END) as approvals,
-               COUNT(DISTINCT CASE WHEN wh.to_status = 'posted' THEN wh.post_id END) as published
-        FROM workflow_history wh
-        JOIN users u ON wh.user_id = u.id
-        WHERE 1=1 {date_filter.replace('sp.scheduled_at', 'wh.created_at').replace('sp.created_at', 'wh.created_at')}
-        GROUP BY wh.user_id ORDER BY actions DESC
-    """).fetchall())
-
-    # === AVG TURNAROUND TIME (draft to posted) ===
-    turnaround = dict_from_row(db.execute(f"""
-        SELECT AVG(
-            JULIANDAY(wh_posted.created_at) - JULIANDAY(sp.created_at)
-        ) as avg_days
-        FROM scheduled_posts sp
-        JOIN workflow_history wh_posted ON sp.id = wh_posted.post_id AND wh_posted.to_status = 'posted'
-        WHERE sp.status = 'posted' {date_filter} {client_filter}
-    """, params).fetchone())
+        SELECT r.workflow_status as status, SUM(r.posts) as count
+        FROM analytics_post_rollup r
+        WHERE 1=1 {rollup_filters}
+        GROUP BY r.workflow_status ORDER BY count DESC
+    """, rollup_params).fetchall())
+
+    # Long ranges read post and workflow history from the columnar store
+    # when it is configured and fresh (services/analytics_store.py)
+    history = None
+    if period == 'all' or int(period) >= analytics_store.LONG_RANGE_DAYS:
+        history = analytics_store.history_tables(client_id, None if period == 'all' else int(period))
+    if history:
+        top_posts = history['top_posts']
+        team_performance = history['team_performance']
+        turnaround = {'avg_days': history['avg_turnaround_days']}
+    else:
+        # === TOP PERFORMING POSTS ===
+        top_posts = dicts_from_rows(db.execute(f"""
+            SELECT sp.id, sp.topic, sp.caption, sp.post_type, sp.platforms,
+                   sp.scheduled_at, sp.design_output_urls, c.name as client_name,
+                   pi.impressions, pi.reach, pi.likes, pi.comments, pi.shares,
+                   pi.saves, pi.engagement_rate, pi.video_views
+            FROM post_insights pi
+            JOIN scheduled_posts sp ON pi.post_id = sp.id
+            LEFT JOIN clients c ON sp.client_id = c.id
+            WHERE 1=1 {date_filter} {client_filter}
+            ORDER BY pi.engagement_rate DESC, pi.impressions DESC
+            LIMIT 10
+        """, params).fetchall())
+
+        # === TEAM PERFORMANCE ===
+        team_performance = dicts_from_rows(db.execute(f"""
+            SELECT u.username, u.role,
+                   COUNT(DISTINCT wh.post_id) as actions,
+                   COUNT(DISTINCT CASE WHEN wh.to_status = 'approved' THEN wh.post_id END) as approvals,
+                   COUNT(DISTINCT CASE WHEN wh.to_status = 'posted' THEN wh.post_id END) as published
+            FROM workflow_history wh
+            JOIN users u ON wh.user_id = u.id
+            WHERE 1=1 {date_filter.replace('sp.scheduled_at', 'wh.created_at').replace('sp.created_at', 'wh.created_at')}
+            GROUP BY wh.user_id ORDER BY actions DESC
+        """).fetchall())
+
+        # === AVG TURNAROUND TIME (draft to posted) ===
+        turnaround = dict_from_row(db.execute(f"""
+            SELECT AVG(
+                JULIANDAY(wh_posted.created_at) - JULIANDAY(sp.created_at)
+            ) as avg_days
+            FROM scheduled_posts sp
+            JOIN workflow_history wh_posted ON sp.id = wh_posted.post_id AND wh_posted.to_status = 'posted'
+            WHERE sp.status = 'posted' {date_filter} {client_filter}
+        """, params).fetchone())
 
     db.close()
 
-    return jsonify({
+    return {
         # Content metrics
         'total_posts': total,
         'posted': posted,
@@ -238,13 +278,14 @@ def get_analytics():
         'platform_engagement': platform_engagement,
         'content_type_stats': content_type_stats,
         'hourly_distribution': hourly_distribution,
+        'weekday_hour_scores': best_time.heatmap(int(client_id) if client_id else None),
         # Tables
         'top_clients': top_clients,
         'top_posts': top_posts,
         'workflow_breakdown': workflow_breakdown,
         'team_performance': team_performance,
         'avg_turnaround_days': round(turnaround.get('avg_days', 0) or 0, 1),
-    })
+    }
 
 
 # === INSIGHTS SYNC ===
@@ -252,23 +293,37 @@ def get_analytics():
 @analytics_bp.route('/api/insights/sync', methods=['POST'])
 @require_login
 def sync_insights():
-    """Trigger a sync of engagement metrics from platform APIs."""
+    """Start a background sync of engagement metrics from platform APIs.
+
+    Returns a job id; poll /api/jobs/<id> for progress and the result.
+    """
     from services.insights import sync_all_recent_insights
+    from services.jobs import start_job
     try:
-        result = sync_all_recent_insights()
-        return jsonify({'success': True, **result})
+        job_id = start_job('insights_sync', sync_all_recent_insights, user_id=session.get('user_id'))
+        return jsonify({'success': True, 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 
 @analytics_bp.route('/api/posts/<int:post_id>/insights', methods=['GET'])
 def get_post_insights(post_id):
-    """Get stored insights for a specific post."""
+    """Get stored insights for a specific post.
+
+    The raw platform responses are only loaded with ?include_raw=1.
+    """
     db = get_db()
     insights = dicts_from_rows(db.execute(
-        "SELECT * FROM post_insights WHERE post_id=?", (post_id,)
+        """SELECT id, post_id, platform, external_post_id, impressions, reach, likes, comments,
+                  shares, saves, clicks, engagement_rate, video_views, followers_gained, fetched_at
+           FROM post_insights WHERE post_id=?""", (post_id,)
     ).fetchall())
     db.close()
+    if request.args.get('include_raw') in ('1', 'true'):
+        from services.insight_payloads import load
+        payloads = load(post_id)
+        for row in insights:
+            row['raw_data'] = payloads.get(row['platform'])
     return jsonify(insights)
 
 
@@ -284,6 +339,36 @@ def sync_single_post_insights(post_id):
         return jsonify({'success': False, 'error': str(e)})
 
 
+@analytics_bp.route('/api/insights/cohorts', methods=['GET'])
+@require_login
+def insight_cohorts():
+    """Distribution of a metric across posts at fixed post ages (e.g. reach at 24h).
+
+    Query params: metric (default reach), ages (hours, comma-separated),
+    platform, client_id.
+    """
+    from services.insight_snapshots import cohort_curve, METRICS
+    metric = request.args.get('metric', 'reach')
+    if metric not in METRICS:
+        return jsonify({'error': f'metric must be one of {", ".join(METRICS)}'}), 400
+    try:
+        ages = [float(a) for a in request.args.get('ages', '1,6,24,72,168').split(',') if a.strip()]
+    except ValueError:
+        return jsonify({'error': 'ages must be numbers of hours'}), 400
+    curve = cohort_curve(metric, ages, request.args.get('platform') or None,
+                         request.args.get('client_id', type=int))
+    return jsonify({'metric': metric, 'curve': curve})
+
+
+@analytics_bp.route('/api/analytics/account-growth', methods=['GET'])
+@require_login
+def account_growth():
+    """Daily follower / reach series per account from stored snapshots."""
+    from services.account_metrics import account_growth as load_growth
+    days = min(request.args.get('days', 90, type=int), 365)
+    return jsonify(load_growth(request.args.get('client_id', type=int), days))
+
+
 # === USER STATS ===
 
 @analytics_bp.route('/api/users/stats', methods=['GET'])
@@ -297,94 +382,93 @@ def user_stats():
         "SELECT id, username, role FROM users WHERE is_active=1"
     ).fetchall())
 
-    clients = dicts_from_rows(db.execute(
-        "SELECT id, content_requirements, assigned_designer_id, assigned_motion_id, assigned_sm_id, assigned_writer_id FROM clients"
-    ).fetchall())
+    # Monthly requirements per assignee, in one aggregate
+    required = content_requirements.totals_by_user(db, {
+        'sm': (('assigned_sm_id', 'assigned_writer_id'), None),
+        'design': (('assigned_designer_id',), ('post', 'story')),
+        'motion': (('assigned_motion_id',), ('video', 'reel')),
+    })
+    sm_required, design_required, motion_required = required['sm'], required['design'], required['motion']
+
+    # This month's posts, grouped once and tallied per creator / assignee
+    created, designs, motion = {}, {}, {}
+    total_posts = approved_posts = 0
+    for row in db.execute("""
+        SELECT created_by_id, assigned_designer_id, assigned_motion_id, post_type,
+               design_output_urls IS NOT NULL AND design_output_urls != '' as designed,
+               workflow_status IN ('approved', 'scheduled', 'posted') as approved,
+               COUNT(*) as c
+        FROM scheduled_posts
+        WHERE created_at >= ?
+        GROUP BY created_by_id, assigned_designer_id, assigned_motion_id, post_type, designed, approved
+    """, (month_start,)).fetchall():
+        total_posts += row['c']
+        if row['approved']:
+            approved_posts += row['c']
+        created[row['created_by_id']] = created.get(row['created_by_id'], 0) + row['c']
+        if row['designed'] and row['post_type'] in ('post', 'story'):
+            designs[row['assigned_designer_id']] = designs.get(row['assigned_designer_id'], 0) + row['c']
+        if row['designed'] and row['post_type'] in ('video', 'reel'):
+            motion[row['assigned_motion_id']] = motion.get(row['assigned_motion_id'], 0) + row['c']
+
+    # This month's workflow transitions per user
+    transitions = {row['user_id']: row for row in db.execute("""
+        SELECT user_id,
+               SUM(from_status = 'in_design' AND to_status = 'approved') as design_approvals,
+               SUM(to_status IN ('approved', 'scheduled')) as approvals
+        FROM workflow_history
+        WHERE created_at >= ?
+        GROUP BY user_id
+    """, (month_start,)).fetchall()}
 
-    result = {}
+    db.close()
 
+    result = {}
     for user in users:
         uid = user['id']
         role = user['role']
         stats = {'completed': 0, 'required': 0, 'label': ''}
+        moves = transitions.get(uid)
 
         if role == 'sm_specialist':
-            row = db.execute(
-                "SELECT COUNT(*) as c FROM scheduled_posts WHERE created_by_id=? AND created_at >= ?",
-                (uid, month_start)).fetchone()
-            stats['completed'] = row['c']
-            for c in clients:
-                if c.get('assigned_sm_id') == uid or c.get('assigned_writer_id') == uid:
-                    reqs = _parse_reqs(c.get('content_requirements'))
-                    stats['required'] += sum(r.get('count', 0) for r in reqs)
+            stats['completed'] = created.get(uid, 0)
+            stats['required'] = sm_required.get(uid, 0)
             stats['label'] = 'posts created'
 
         elif role == 'designer':
-            row = db.execute("""
-                SELECT COUNT(*) as c FROM workflow_history
-                WHERE user_id=? AND from_status='in_design' AND to_status='approved' AND created_at >= ?
-            """, (uid, month_start)).fetchone()
-            stats['completed'] = row['c']
-            row2 = db.execute("""
-                SELECT COUNT(*) as c FROM scheduled_posts
-                WHERE assigned_designer_id=? AND design_output_urls IS NOT NULL AND design_output_urls != ''
-                AND post_type IN ('post', 'story') AND created_at >= ?
-            """, (uid, month_start)).fetchone()
-            stats['completed'] = max(stats['completed'], row2['c'])
-            for c in clients:
-                if c.get('assigned_designer_id') == uid:
-                    reqs = _parse_reqs(c.get('content_requirements'))
-                    stats['required'] += sum(r.get('count', 0) for r in reqs if r.get('type') in ('post', 'story'))
+            stats['completed'] = max(moves['design_approvals'] if moves else 0, designs.get(uid, 0))
+            stats['required'] = design_required.get(uid, 0)
             stats['label'] = 'designs uploaded'
 
         elif role == 'motion_designer':
-            row = db.execute("""
-                SELECT COUNT(*) as c FROM workflow_history
-                WHERE user_id=? AND from_status='in_design' AND to_status='approved' AND created_at >= ?
-            """, (uid, month_start)).fetchone()
-            stats['completed'] = row['c']
-            row2 = db.execute("""
-                SELECT COUNT(*) as c FROM scheduled_posts
-                WHERE assigned_motion_id=? AND design_output_urls IS NOT NULL AND design_output_urls != ''
-                AND post_type IN ('video', 'reel') AND created_at >= ?
-            """, (uid, month_start)).fetchone()
-            stats['completed'] = max(stats['completed'], row2['c'])
-            for c in clients:
-                if c.get('assigned_motion_id') == uid:
-                    reqs = _parse_reqs(c.get('content_requirements'))
-                    stats['required'] += sum(r.get('count', 0) for r in reqs if r.get('type') in ('video', 'reel'))
+            stats['completed'] = max(moves['design_approvals'] if moves else 0, motion.get(uid, 0))
+            stats['required'] = motion_required.get(uid, 0)
             stats['label'] = 'motion designs'
 
         elif role == 'moderator':
-            row = db.execute("""
-                SELECT COUNT(*) as c FROM workflow_history
-                WHERE user_id=? AND to_status IN ('approved', 'scheduled') AND created_at >= ?
-            """, (uid, month_start)).fetchone()
-            stats['completed'] = row['c']
-            row2 = db.execute("""
-                SELECT COUNT(*) as c FROM scheduled_posts
-                WHERE workflow_status IN ('approved', 'scheduled', 'posted') AND created_at >= ?
-            """, (month_start,)).fetchone()
-            stats['required'] = row2['c']
+            stats['completed'] = moves['approvals'] if moves else 0
+            stats['required'] = approved_posts
             stats['label'] = 'posts approved'
 
         elif role == 'admin':
-            row = db.execute("SELECT COUNT(*) as c FROM scheduled_posts WHERE created_at >= ?", (month_start,)).fetchone()
-            stats['completed'] = row['c']
+            stats['completed'] = total_posts
             stats['required'] = 0
             stats['label'] = 'total posts'
 
         result[str(uid)] = stats
 
-    db.close()
     return jsonify(result)
 
 
 @analytics_bp.route('/api/suggestions', methods=['GET'])
 def get_suggestions():
     """Compute data-driven content recommendations from historical engagement data."""
-    db = get_db()
     client_id = request.args.get('client_id', '')
+    return _cached_json('suggestions', (client_id,), lambda: _suggestions(client_id))
+
+
+def _suggestions(client_id):
+    db = get_db()
     client_filter = ''
     client_params = []
     if client_id:
@@ -476,7 +560,13 @@ def get_suggestions():
             platform_best_times[plat] = {'hour': row['hour'], 'avg_engagement': row['avg_engagement'], 'post_count': row['post_count']}
 
     db.close()
-    return jsonify({
+
+    # Weekday x hour ranking, overall and per platform
+    cid = int(client_id) if client_id else None
+    best_slots = best_time.best_slots(cid, limit=5)
+    platform_best_slots = {plat: best_time.best_slots(cid, plat, limit=3) for plat in best_time.platforms(cid)}
+
+    return {
         'best_hours': best_hours,
         'best_content_types': best_content_types,
         'best_platforms': best_platforms,
@@ -487,14 +577,8 @@ def get_suggestions():
             'optimal_per_day': max(1, round(total_posted / max(active_days, 1), 1))
         },
         'content_mix': content_mix,
-        'platform_best_times': platform_best_times
-    })
+        'platform_best_times': platform_best_times,
+        'best_slots': best_slots,
+        'platform_best_slots': platform_best_slots,
+    }
 
-
-def _parse_reqs(json_str):
-    if not json_str:
-        return []
-    try:
-        return json.loads(json_str)
-    except (json.JSONDecodeError, TypeError):
-        return []
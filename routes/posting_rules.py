@@ -3,12 +3,13 @@ import calendar as cal_mod
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 from models import get_db, dict_from_row, dicts_from_rows
+from services import best_time
+from services.posting_schedule import matches_day_code
 
 posting_rules_bp = Blueprint('posting_rules', __name__)
 
-DAY_MAP = {
-    'sun': 6, 'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5
-}
+# Days ahead suggest_schedule looks for open slots
+LOOKAHEAD_DAYS = 60
 
 DAY_NAMES_AR = {
     'sun': 'الأحد', 'mon': 'الاثنين', 'tue': 'الثلاثاء',
@@ -16,36 +17,6 @@ DAY_NAMES_AR = {
 }
 
 
-def matches_day_code(day_code, weekday, day_of_month, days_in_month):
-    """Check if a day matches a posting day code.
-    Supports: 'fri' (every), 'fri_1' (1st), 'fri_2' (2nd), 'fri_3' (3rd), 'fri_4' (4th), 'fri_last' (last).
-    """
-    if '_' in day_code:
-        parts = day_code.split('_')
-        base_day = parts[0]
-        week_spec = parts[1]
-    else:
-        base_day = day_code
-        week_spec = None
-
-    if DAY_MAP.get(base_day) != weekday:
-        return False
-
-    if week_spec is None:
-        return True  # every occurrence
-
-    # Calculate which occurrence of this weekday in the month
-    week_num = (day_of_month - 1) // 7 + 1  # 1-based week number
-
-    if week_spec == 'last':
-        # Check if this is the last occurrence of this weekday
-        return day_of_month + 7 > days_in_month
-    elif week_spec.isdigit():
-        return week_num == int(week_spec)
-
-    return False
-
-
 @posting_rules_bp.route('/api/clients/<int:client_id>/posting-rules', methods=['GET'])
 def get_posting_rules(client_id):
     db = get_db()
@@ -299,8 +270,14 @@ def validate_schedule(client_id):
 
 @posting_rules_bp.route('/api/clients/<int:client_id>/suggest-schedule', methods=['GET'])
 def suggest_schedule(client_id):
-    """Auto-suggest next available scheduling slots based on posting rules."""
+    """Auto-suggest next available scheduling slots based on posting rules.
+
+    Each slot carries its best-time score (services/best_time.py). With
+    ?order=best the open slots of the next LOOKAHEAD_DAYS are ranked by that
+    score instead of returned in date order.
+    """
     count = int(request.args.get('count', 10))
+    by_score = request.args.get('order') == 'best'
     db = get_db()
 
     # Get active rules
@@ -323,9 +300,10 @@ def suggest_schedule(client_id):
             existing_slots.add(post['scheduled_at'][:16])  # YYYY-MM-DDTHH:MM
 
     suggestions = []
+    matrices = {}
     today = datetime.now()
 
-    for day_offset in range(60):  # Look ahead 60 days
+    for day_offset in range(LOOKAHEAD_DAYS):
         check_date = today + timedelta(days=day_offset)
         weekday = check_date.weekday()
         day_of_month = check_date.day
@@ -352,15 +330,20 @@ def suggest_schedule(client_id):
 
                         slot_key = slot_dt.strftime('%Y-%m-%dT%H:%M')
                         if slot_key not in existing_slots:
+                            if rule['platform'] not in matrices:
+                                matrices[rule['platform']] = best_time.engagement_matrix(client_id, rule['platform'])
                             suggestions.append({
                                 'date': slot_dt.strftime('%Y-%m-%d'),
                                 'day': day_code,
                                 'day_name': DAY_NAMES_AR.get(base_day, day_code),
                                 'time': hour_str,
                                 'datetime': slot_key,
-                                'platform': rule['platform']
+                                'platform': rule['platform'],
+                                'score': best_time.slot_score(matrices[rule['platform']], slot_dt)
                             })
-                            if len(suggestions) >= count:
+                            if len(suggestions) >= count and not by_score:
                                 return jsonify({'suggested_slots': suggestions})
 
-    return jsonify({'suggested_slots': suggestions})
+    if by_score:
+        suggestions.sort(key=lambda slot: (-slot['score'], slot['datetime']))
+    return jsonify({'suggested_slots': suggestions[:count]})
@@ -1,8 +1,10 @@
 import re
 import threading
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session
 from models import get_db, dict_from_row, dicts_from_rows
+from services import pipeline_board, post_listing
+from services.my_work import inbox as my_work_inbox
 from services.scheduler import publish_post, run_scheduler, force_publish_all, get_account_for_client, _get_env_account
 from services.cloudinary_service import upload_image
 from routes.auth import require_role, require_login, require_super_admin
@@ -24,34 +26,35 @@ VALID_TRANSITIONS = {
 
 @posts_bp.route('/api/all-posts', methods=['GET'])
 def all_posts():
-    db = get_db()
-    status = request.args.get('status')
-    platform = request.args.get('platform')
-    client_id = request.args.get('client_id')
+    """Posts, newest scheduled first, filtered by status, platform and client_id.
 
-    query = """
-        SELECT sp.*, c.name as client_name
-        FROM scheduled_posts sp
-        LEFT JOIN clients c ON sp.client_id = c.id
-        WHERE 1=1
+    With limit and/or cursor, returns one page as {'posts', 'next_cursor'};
+    pass next_cursor back as cursor for the following page (null after the
+    last). fields=topic,status,... selects columns (id, scheduled_at and
+    client_name are available too) and count=1 returns only {'total'}.
+    Without limit or cursor the whole list is streamed as a JSON array.
     """
-    params = []
-
-    if status:
-        query += " AND sp.status=?"
-        params.append(status)
-    if platform:
-        query += " AND sp.platforms LIKE ?"
-        params.append(f'%{platform}%')
-    if client_id:
-        query += " AND sp.client_id=?"
-        params.append(client_id)
-
-    query += " ORDER BY sp.scheduled_at DESC, sp.created_at DESC"
+    db = get_db()
+    where, params = post_listing.filters(request.args.get('status'), request.args.get('platform'),
+                                         request.args.get('client_id'))
+    if request.args.get('count') in ('1', 'true'):
+        total = post_listing.count(db, where, params)
+        db.close()
+        return jsonify({'total': total})
 
-    posts = dicts_from_rows(db.execute(query, params).fetchall())
+    try:
+        columns = post_listing.select_list(db, request.args.get('fields'))
+        cursor = request.args.get('cursor')
+        if cursor is None and 'limit' not in request.args:
+            return Response(post_listing.stream_json(db, where, params, columns), mimetype='application/json')
+        limit = max(1, min(request.args.get('limit', post_listing.DEFAULT_PAGE_SIZE, type=int),
+                           post_listing.MAX_PAGE_SIZE))
+        posts, next_cursor = post_listing.page(db, where, params, columns, limit, cursor)
+    except ValueError as e:
+        db.close()
+        return jsonify({'error': str(e)}), 400
     db.close()
-    return jsonify(posts)
+    return jsonify({'posts': posts, 'next_cursor': next_cursor})
 
 
 # ============ SINGLE POST DETAIL ============
@@ -387,58 +390,28 @@ def remove_design_slide(post_id):
 
 @posts_bp.route('/api/pipeline', methods=['GET'])
 def pipeline():
-    db = get_db()
-    client_id = request.args.get('client_id')
-    assigned_to = request.args.get('assigned_to')
+    """The pipeline board, filtered by client_id and assigned_to.
 
-    query = """
-        SELECT sp.*,
-               c.name as client_name,
-               u_designer.username as assigned_designer_name,
-               u_sm.username as assigned_sm_name,
-               u_writer.username as assigned_writer_name,
-               u_created.username as created_by_name
-        FROM scheduled_posts sp
-        LEFT JOIN clients c ON sp.client_id = c.id
-        LEFT JOIN users u_designer ON sp.assigned_designer_id = u_designer.id
-        LEFT JOIN users u_sm ON sp.assigned_sm_id = u_sm.id
-        LEFT JOIN users u_writer ON sp.assigned_writer_id = u_writer.id
-        LEFT JOIN users u_created ON sp.created_by_id = u_created.id
-        WHERE sp.workflow_status IS NOT NULL AND sp.workflow_status != ''
+    Returns {column: {'count', 'cards', 'next_cursor'}} with the first
+    limit cards of each column. With column and cursor, returns the next
+    cards of that one column as {'column', 'cards', 'next_cursor'}.
     """
-    params = []
-
-    if client_id:
-        query += " AND sp.client_id=?"
-        params.append(client_id)
-    if assigned_to:
-        query += " AND (sp.assigned_designer_id=? OR sp.assigned_sm_id=? OR sp.assigned_motion_id=? OR sp.assigned_writer_id=? OR sp.created_by_id=?)"
-        params.extend([assigned_to, assigned_to, assigned_to, assigned_to, assigned_to])
-
-    query += " ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END, sp.created_at DESC"
-
-    posts = dicts_from_rows(db.execute(query, params).fetchall())
+    where, params = pipeline_board.filters(request.args.get('client_id'), request.args.get('assigned_to'))
+    limit = max(1, min(request.args.get('limit', pipeline_board.DEFAULT_PAGE_SIZE, type=int),
+                       pipeline_board.MAX_PAGE_SIZE))
+    column = request.args.get('column')
+    db = get_db()
+    if not column:
+        board = pipeline_board.board(db, where, params, limit)
+        db.close()
+        return jsonify(board)
+    try:
+        cards, next_cursor = pipeline_board.column_page(db, column, where, params, request.args.get('cursor'), limit)
+    except ValueError as e:
+        db.close()
+        return jsonify({'error': str(e)}), 400
     db.close()
-
-    board = {
-        'draft': [],
-        'pending_review': [],
-        'in_design': [],
-        'approved': [],
-        'scheduled': []
-    }
-    for post in posts:
-        s = post.get('workflow_status', 'draft') or 'draft'
-        if s == 'needs_caption':
-            s = 'draft'  # Migrate old needs_caption posts to draft
-        if s in board:
-            board[s].append(post)
-        elif s == 'posted':
-            pass  # Skip posted
-        else:
-            board['draft'].append(post)
-
-    return jsonify(board)
+    return jsonify({'column': column, 'cards': cards, 'next_cursor': next_cursor})
 
 
 # ============ POST COMMENTS ============
@@ -599,164 +572,7 @@ def my_work():
     role = request.args.get('role', 'user')
 
     db = get_db()
-    items = []
-
-    if role == 'copywriter':
-        # Posts assigned to this copywriter in draft status (need writing)
-        rows = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_writer_id=? AND sp.workflow_status='draft'
-            ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END
-        """, (user_id,)).fetchall())
-        for r in rows:
-            r['action'] = 'needs_writing'
-            r['action_label'] = 'Needs Writing'
-        items.extend(rows)
-
-        # Posts returned from review back to draft
-        returned = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_writer_id=? AND sp.workflow_status='draft' AND sp.revision_count > 0
-            ORDER BY sp.updated_at DESC
-        """, (user_id,)).fetchall())
-        for r in returned:
-            r['action'] = 'returned_for_edits'
-            r['action_label'] = 'Returned for Edits'
-        existing_ids = {i['id'] for i in items}
-        items.extend([r for r in returned if r['id'] not in existing_ids])
-
-    elif role == 'designer':
-        # Static/image designer — exclude motion content types
-        rows = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_designer_id=? AND sp.workflow_status='in_design'
-                  AND (sp.post_type NOT IN ('reel', 'video') OR sp.post_type IS NULL)
-            ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END
-        """, (user_id,)).fetchall())
-        for r in rows:
-            r['action'] = 'needs_design'
-            r['action_label'] = 'يحتاج تصميم'
-        items.extend(rows)
-
-        returned = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_designer_id=? AND sp.workflow_status='in_design' AND sp.revision_count > 0
-                  AND (sp.post_type NOT IN ('reel', 'video') OR sp.post_type IS NULL)
-            ORDER BY sp.updated_at DESC
-        """, (user_id,)).fetchall())
-        for r in returned:
-            r['action'] = 'returned_for_edits'
-            r['action_label'] = 'مرتجع للتعديل'
-        existing_ids = {i['id'] for i in items}
-        items.extend([r for r in returned if r['id'] not in existing_ids])
-
-    elif role == 'motion_designer':
-        # Motion designer — only video/reel content, use assigned_motion_id
-        rows = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_motion_id=? AND sp.workflow_status='in_design'
-                  AND sp.post_type IN ('reel', 'video')
-            ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END
-        """, (user_id,)).fetchall())
-        for r in rows:
-            r['action'] = 'needs_design'
-            r['action_label'] = 'يحتاج موشن'
-        items.extend(rows)
-
-        returned = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_motion_id=? AND sp.workflow_status='in_design' AND sp.revision_count > 0
-                  AND sp.post_type IN ('reel', 'video')
-            ORDER BY sp.updated_at DESC
-        """, (user_id,)).fetchall())
-        for r in returned:
-            r['action'] = 'returned_for_edits'
-            r['action_label'] = 'مرتجع للتعديل'
-        existing_ids = {i['id'] for i in items}
-        items.extend([r for r in returned if r['id'] not in existing_ids])
-
-    elif role == 'manager':
-        # Manager reviews posts assigned to them in pending_review
-        pending = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.assigned_manager_id=? AND sp.workflow_status='pending_review'
-            ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END
-        """, (user_id,)).fetchall())
-        for r in pending:
-            r['action'] = 'pending_review'
-            r['action_label'] = 'Pending Review'
-        items.extend(pending)
-
-    elif role == 'sm_specialist':
-        # SM Specialist: approved posts assigned to them or that they created
-        approved = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE (sp.assigned_sm_id=? OR sp.created_by_id=?) AND sp.workflow_status='approved'
-              AND (sp.scheduled_at IS NULL OR sp.scheduled_at='')
-            ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END
-        """, (user_id, user_id)).fetchall())
-        for r in approved:
-            r['action'] = 'ready_to_schedule'
-            r['action_label'] = 'Ready to Schedule'
-        items.extend(approved)
-
-        # Scheduled posts they own
-        scheduled = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE (sp.assigned_sm_id=? OR sp.created_by_id=?) AND sp.workflow_status='scheduled'
-            ORDER BY sp.scheduled_at ASC LIMIT 10
-        """, (user_id, user_id)).fetchall())
-        for r in scheduled:
-            r['action'] = 'scheduled'
-            r['action_label'] = 'Scheduled'
-        existing_ids = {i['id'] for i in items}
-        items.extend([r for r in scheduled if r['id'] not in existing_ids])
-
-    elif role == 'admin':
-        # All posts needing attention: unassigned drafts, overdue, etc.
-        unassigned = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.workflow_status='draft' AND sp.assigned_designer_id IS NULL
-            ORDER BY sp.created_at DESC LIMIT 20
-        """).fetchall())
-        for r in unassigned:
-            r['action'] = 'unassigned'
-            r['action_label'] = 'غير معين'
-        items.extend(unassigned)
-
-        # Overdue scheduled posts
-        overdue = dicts_from_rows(db.execute("""
-            SELECT sp.*, c.name as client_name
-            FROM scheduled_posts sp
-            LEFT JOIN clients c ON sp.client_id = c.id
-            WHERE sp.status='pending' AND sp.scheduled_at < datetime('now') AND sp.scheduled_at != ''
-            ORDER BY sp.scheduled_at ASC LIMIT 20
-        """).fetchall())
-        for r in overdue:
-            r['action'] = 'overdue'
-            r['action_label'] = 'متأخر'
-        items.extend(overdue)
-
+    items = my_work_inbox(db, user_id, role)
     db.close()
     return jsonify(items)
 
@@ -1142,7 +958,7 @@ def get_publish_status(post_id):
         db.close()
         return jsonify({'error': 'Not found'}), 404
     logs = dicts_from_rows(db.execute(
-        "SELECT platform, status, response FROM post_logs WHERE post_id=?", (post_id,)
+        "SELECT platform, status, error_code, error_message AS error FROM post_logs WHERE post_id=?", (post_id,)
     ).fetchall())
     db.close()
     return jsonify({'status': post['status'], 'logs': logs})
@@ -1360,7 +1176,7 @@ def designer_reminders():
 def force_publish():
     try:
         result = force_publish_all()
-        msg = f"Published: {result['published']}, Failed: {result['failed']}, Total: {result['total']}"
+        msg = f"Published: {result['published']}, Failed: {result['failed']}, Deferred: {result['deferred']}, Total: {result['total']}"
         return jsonify({'success': True, 'message': msg, **result})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
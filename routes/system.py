@@ -0,0 +1,59 @@
+from flask import Blueprint, jsonify, session
+from routes.auth import require_admin, require_login
+
+system_bp = Blueprint('system', __name__)
+
+
+@system_bp.route('/api/admin/rate-limits', methods=['GET'])
+@require_admin
+def rate_limits():
+    """Current platform API budget usage per app and per account (this worker)."""
+    from services.rate_limiter import limiter, USAGE_CEILING
+    return jsonify({'ceilings': USAGE_CEILING, 'buckets': limiter.snapshot()})
+
+
+@system_bp.route('/api/admin/response-cache', methods=['GET'])
+@require_admin
+def response_cache_stats():
+    """Hit ratio and size of the analytics response cache (this worker)."""
+    from services.response_cache import cache
+    return jsonify(cache.snapshot())
+
+
+@system_bp.route('/api/admin/circuit-breakers', methods=['GET'])
+@require_admin
+def circuit_breakers():
+    """State and recent transitions of each platform API circuit breaker (this worker)."""
+    from services import circuit_breaker
+    return jsonify(circuit_breaker.snapshot())
+
+
+@system_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+@require_login
+def get_job(job_id):
+    """Status, progress and result of a background job."""
+    from services.jobs import get_job as load_job
+    job = load_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@system_bp.route('/api/admin/account-metrics/collect', methods=['POST'])
+@require_admin
+def collect_account_metrics():
+    """Start the account-level metrics collector now (incremental backfill)."""
+    from services.account_metrics import collect_account_metrics as collect
+    from services.jobs import start_job
+    job_id = start_job('account_metrics', collect, user_id=session.get('user_id'))
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+
+@system_bp.route('/api/admin/analytics-rollups/rebuild', methods=['POST'])
+@require_admin
+def rebuild_analytics_rollups():
+    """Recompute all analytics rollups from scratch (repairs after manual data fixes)."""
+    from services.analytics_rollups import rebuild
+    from services.jobs import start_job
+    job_id = start_job('analytics_rollups_rebuild', rebuild, user_id=session.get('user_id'))
+    return jsonify({'success': True, 'job_id': job_id}), 202
@@ -0,0 +1,225 @@
+"""Account token health, checked concurrently and cached in account_health.
+
+Each check is one live Graph or LinkedIn call. Results are stored with an
+expiry (HEALTHY_TTL_MINUTES for working tokens, UNHEALTHY_TTL_MINUTES for
+anything else, so problems are re-checked sooner), and pages read the
+stored status instead of calling the platforms. A scheduled job re-checks
+expired entries in the background; changing an account's token or id
+drops its entry (trigger from migration 47) so the next read checks it
+again.
+
+A check that never reached the platform (our own rate limiter had no
+budget, or the platform's circuit breaker is open) says nothing about the
+token: it is not stored, and the previous status is served marked stale
+until a later check gets through.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from models import get_db, dicts_from_rows
+from services import platform_http
+from services.circuit_breaker import CircuitOpenError
+from services.platform_http import GRAPH_API_BASE, LINKEDIN_API_BASE
+from services.rate_limiter import PRIORITY_BACKGROUND, RateLimitExceeded
+
+HEALTHY_TTL_MINUTES = int(os.getenv('ACCOUNT_HEALTH_TTL_MINUTES', 360))
+UNHEALTHY_TTL_MINUTES = int(os.getenv('ACCOUNT_HEALTH_RETRY_MINUTES', 30))
+CHECK_WORKERS = int(os.getenv('ACCOUNT_HEALTH_WORKERS', 6))
+CHECK_TIMEOUT = 10
+
+REFRESH_JOB = 'account_health_refresh'
+
+
+def check_account(account):
+    """Live token check for one account row; returns the status dict the API serves.
+
+    The dict has deferred=True when the call was not made (rate limit or
+    open circuit) and the status is unknown.
+    """
+    platform = account.get('platform', '')
+    token = account.get('access_token', '')
+    acct_id = account.get('account_id', '')
+
+    if not token:
+        return {'status': 'no_token', 'message': 'No access token configured'}
+
+    try:
+        if platform in ('instagram', 'facebook'):
+            resp = platform_http.get(
+                f"{GRAPH_API_BASE}/{acct_id or 'me'}", account=acct_id or platform_http.token_key(token),
+                priority=PRIORITY_BACKGROUND, params={'access_token': token, 'fields': 'id,name'},
+                timeout=CHECK_TIMEOUT
+            )
+            data = resp.json()
+            if 'error' in data:
+                err = data['error']
+                return {
+                    'status': 'error',
+                    'message': err.get('message', 'Token invalid'),
+                    'code': err.get('code'),
+                    'needs_reauth': err.get('code') in (190, 102)
+                }
+            return {
+                'status': 'active',
+                'message': f'Connected as {data.get("name", acct_id)}',
+                'account_name': data.get('name', '')
+            }
+
+        elif platform == 'linkedin':
+            resp = platform_http.get(
+                f"{LINKEDIN_API_BASE}/userinfo", account=platform_http.token_key(token),
+                priority=PRIORITY_BACKGROUND, headers={'Authorization': f'Bearer {token}'},
+                timeout=CHECK_TIMEOUT
+            )
+            if resp.status_code == 200:
+                data = resp.json()
+                return {'status': 'active', 'message': f'Connected as {data.get("name", "LinkedIn User")}'}
+            return {'status': 'error', 'message': 'Token expired or invalid', 'needs_reauth': True}
+
+        return {'status': 'unknown', 'message': f'Status check not supported for {platform}'}
+
+    except RateLimitExceeded as e:
+        return {'status': 'unknown', 'deferred': True, 'message': f'Check deferred: {e}'}
+    except CircuitOpenError as e:
+        return {'status': 'unknown', 'deferred': True, 'message': f'Check deferred: {e}'}
+    except Exception as e:
+        return {'status': 'error', 'message': f'Connection failed: {str(e)}'}
+
+
+def _store(db, account_id, result):
+    ttl = HEALTHY_TTL_MINUTES if result['status'] in ('active', 'no_token') else UNHEALTHY_TTL_MINUTES
+    db.execute("""
+        INSERT INTO account_health (account_id, status, message, code, needs_reauth, remote_name,
+                                    checked_at, expires_at)
+        VALUES (?,?,?,?,?,?, datetime('now'), datetime('now', ?))
+        ON CONFLICT(account_id) DO UPDATE SET
+            status=excluded.status, message=excluded.message, code=excluded.code,
+            needs_reauth=excluded.needs_reauth, remote_name=excluded.remote_name,
+            checked_at=excluded.checked_at, expires_at=excluded.expires_at
+    """, (account_id, result['status'], result.get('message', ''), result.get('code'),
+          1 if result.get('needs_reauth') else 0, result.get('account_name', ''), f'+{ttl} minutes'))
+
+
+def check_accounts(accounts, progress=None):
+    """Check account rows concurrently and store the results; returns {account id: status dict}.
+
+    Deferred checks are not stored; such an account's previous status is
+    returned instead, with stale=True, when it has one.
+    """
+    if progress:
+        progress.set_total(len(accounts))
+    results = {}
+    with ThreadPoolExecutor(max_workers=CHECK_WORKERS) as pool:
+        futures = [(a, pool.submit(check_account, a)) for a in accounts]
+        db = get_db()
+        for account, future in futures:
+            result = future.result()
+            if result.get('deferred'):
+                previous = db.execute("SELECT * FROM account_health WHERE account_id=?", (account['id'],)).fetchone()
+                if previous:
+                    result = {**_status_from_row(previous), 'stale': True}
+            # An account deleted mid-check has nothing left to attach a status to
+            elif db.execute("SELECT 1 FROM accounts WHERE id=?", (account['id'],)).fetchone():
+                _store(db, account['id'], result)
+                db.commit()
+            results[account['id']] = result
+            if progress:
+                if result.get('deferred') or result.get('stale'):
+                    progress.advance(skipped=1)
+                else:
+                    progress.advance(succeeded=1 if result['status'] == 'active' else 0,
+                                     failed=0 if result['status'] == 'active' else 1)
+        db.close()
+    return results
+
+
+def check_now(account_id):
+    """Check one account live and store the result; None if the account does not exist."""
+    db = get_db()
+    account = db.execute("SELECT * FROM accounts WHERE id=?", (account_id,)).fetchone()
+    db.close()
+    if account is None:
+        return None
+    return check_accounts([dict(account)])[account_id]
+
+
+def _due_accounts(where='', params=()):
+    db = get_db()
+    accounts = dicts_from_rows(db.execute(f"""
+        SELECT a.* FROM accounts a
+        LEFT JOIN account_health h ON h.account_id = a.id
+        WHERE (h.account_id IS NULL OR h.expires_at <= datetime('now')){where}
+    """, params).fetchall())
+    db.close()
+    return accounts
+
+
+def refresh_stale(progress=None):
+    """Re-check every account whose stored status is missing or expired.
+
+    Runs from the scheduler, or as a background job (see services/jobs.py).
+    """
+    accounts = _due_accounts()
+    results = check_accounts(accounts, progress)
+    checked = [r for r in results.values() if not r.get('deferred') and not r.get('stale')]
+    return {
+        'checked': len(checked),
+        'active': sum(1 for r in checked if r['status'] == 'active'),
+        'problems': sum(1 for r in checked if r['status'] != 'active'),
+        'deferred': len(results) - len(checked),
+    }
+
+
+def _status_from_row(row):
+    status = {'status': row['status'], 'message': row['message']}
+    if row['code'] is not None:
+        status['code'] = row['code']
+    if row['needs_reauth']:
+        status['needs_reauth'] = True
+    if row['remote_name']:
+        status['account_name'] = row['remote_name']
+    return status
+
+
+def client_health(client_id):
+    """Stored status of every account of a client, without calling the platforms.
+
+    Accounts never checked before are checked now (concurrently). Returns
+    (results, stale) where stale is True when some stored status has
+    expired and should be refreshed in the background.
+    """
+    unchecked = _due_accounts(" AND a.client_id = ? AND h.account_id IS NULL", (client_id,))
+    if unchecked:
+        check_accounts(unchecked)
+
+    db = get_db()
+    rows = db.execute("""
+        SELECT a.id, a.platform, a.account_name, a.account_id, h.status, h.message, h.code, h.needs_reauth,
+               h.remote_name, h.checked_at, h.expires_at <= datetime('now') AS expired
+        FROM accounts a
+        LEFT JOIN account_health h ON h.account_id = a.id
+        WHERE a.client_id = ?
+        ORDER BY a.id
+    """, (client_id,)).fetchall()
+    db.close()
+
+    results = []
+    stale = False
+    for row in rows:
+        if row['status'] is None:
+            # Deleted and re-created mid-request, or its check was deferred; report it unchecked
+            status = {'status': 'unknown', 'message': 'Not checked yet'}
+        else:
+            status = _status_from_row(row)
+        expired = row['status'] is None or bool(row['expired'])
+        stale = stale or expired
+        results.append({
+            'account_id': row['id'],
+            'platform': row['platform'],
+            'account_name': row['account_name'] or '',
+            'account_api_id': row['account_id'] or '',
+            **status,
+            'checked_at': row['checked_at'],
+            'stale': expired,
+        })
+    return results, stale
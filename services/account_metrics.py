@@ -0,0 +1,202 @@
+"""Daily account-level metrics (followers, reach, impressions) for every active account.
+
+The collector runs once a day. For each Instagram account and Facebook page
+it asks the Graph API for daily values over the whole range since the day
+it was last collected through in one insights call per 30-day window, plus
+one call for the current follower total, and upserts the results into
+account_daily_metrics. account_metrics_state (migration 53) records the
+day each account was collected through, including ranges the API returned
+nothing for, so those are not asked for again. Meta fills in daily
+values late, so the last SETTLE_DAYS before today are fetched again on
+every run whatever the stored date says; the upsert keeps refetched rows
+consistent. A fresh account is backfilled for up to BACKFILL_DAYS. Calls go through the
+shared rate limiter at background priority.
+
+LinkedIn member tokens have no account-level analytics API, so LinkedIn
+accounts are skipped.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from models import get_db, dicts_from_rows
+from services import platform_http
+from services.platform_http import GRAPH_API_BASE
+from services.rate_limiter import PRIORITY_BACKGROUND
+
+BACKFILL_DAYS = int(os.getenv('ACCOUNT_METRICS_BACKFILL_DAYS', 90))
+# Trailing days refetched on every run because their values may still be incomplete
+SETTLE_DAYS = int(os.getenv('ACCOUNT_METRICS_SETTLE_DAYS', 3))
+# Longest since/until range the insights edge accepts for period=day
+WINDOW_DAYS = 30
+COLLECT_WORKERS = int(os.getenv('ACCOUNT_METRICS_WORKERS', 4))
+
+# Platform metric name -> account_daily_metrics column
+DAILY_METRICS = {
+    'instagram': {'reach': 'reach', 'impressions': 'impressions', 'profile_views': 'profile_views',
+                  'follower_count': 'followers_gained'},
+    'facebook': {'page_impressions_unique': 'reach', 'page_impressions': 'impressions',
+                 'page_views_total': 'profile_views', 'page_daily_follows_unique': 'followers_gained'},
+}
+FOLLOWER_FIELDS = {'instagram': 'followers_count', 'facebook': 'followers_count'}
+
+COLUMNS = ('followers_gained', 'reach', 'impressions', 'profile_views')
+
+
+def _graph_get(path, account, params):
+    resp = platform_http.get(f"{GRAPH_API_BASE}/{path}", account=account, priority=PRIORITY_BACKGROUND,
+                             params=params, timeout=15)
+    data = resp.json()
+    if 'error' in data:
+        raise RuntimeError(data['error'].get('message', 'API error'))
+    return data
+
+
+def fetch_daily_metrics(platform, account_id, token, since, until):
+    """Daily values between since and until (dates, inclusive) as {date: {column: value}}."""
+    metrics = DAILY_METRICS[platform]
+    days = {}
+    start = since
+    while start <= until:
+        end = min(start + timedelta(days=WINDOW_DAYS - 1), until)
+        data = _graph_get(f"{account_id}/insights", account_id, {
+            'metric': ','.join(metrics),
+            'period': 'day',
+            # end_time of a daily value is midnight after the day it covers
+            'since': int(datetime.combine(start, datetime.min.time(), timezone.utc).timestamp()),
+            'until': int(datetime.combine(end + timedelta(days=1), datetime.min.time(), timezone.utc).timestamp()),
+            'access_token': token,
+        })
+        for metric in data.get('data', []):
+            column = metrics.get(metric.get('name'))
+            if not column:
+                continue
+            for value in metric.get('values', []):
+                end_time = (value.get('end_time') or '')[:10]
+                if not end_time:
+                    continue
+                day = datetime.strptime(end_time, '%Y-%m-%d').date() - timedelta(days=1)
+                if since <= day <= until:
+                    days.setdefault(day.isoformat(), {})[column] = int(value.get('value') or 0)
+        start = end + timedelta(days=1)
+    return days
+
+
+def fetch_follower_total(platform, account_id, token):
+    data = _graph_get(account_id, account_id, {'fields': FOLLOWER_FIELDS[platform], 'access_token': token})
+    return data.get(FOLLOWER_FIELDS[platform])
+
+
+def _collect_account(account, last_date, today):
+    """Fetch everything after last_date for one account; returns (rows, error)."""
+    platform = account['platform']
+    yesterday = today - timedelta(days=1)
+    if last_date:
+        since = datetime.strptime(last_date, '%Y-%m-%d').date() + timedelta(days=1)
+    else:
+        since = today - timedelta(days=BACKFILL_DAYS)
+    since = min(since, today - timedelta(days=SETTLE_DAYS))
+    since = max(since, today - timedelta(days=BACKFILL_DAYS))
+
+    try:
+        days = {}
+        if since <= yesterday:
+            days = fetch_daily_metrics(platform, account['account_id'], account['access_token'], since, yesterday)
+        followers = fetch_follower_total(platform, account['account_id'], account['access_token'])
+    except Exception as e:
+        return [], str(e)
+
+    rows = [(account['id'], day, None, *(values.get(c) for c in COLUMNS)) for day, values in sorted(days.items())]
+    if followers is not None:
+        rows.append((account['id'], today.isoformat(), int(followers), None, None, None, None))
+    return rows, None
+
+
+def collect_account_metrics(progress=None):
+    """Collect daily metrics for all active Instagram and Facebook accounts.
+
+    Incremental: each account only fetches days after the one it was last
+    collected through, plus the last SETTLE_DAYS. Can run as a background job (see services/jobs.py).
+    """
+    today = datetime.utcnow().date()
+    db = get_db()
+    accounts = dicts_from_rows(db.execute("""
+        SELECT id, platform, account_id, access_token FROM accounts
+        WHERE is_active=1 AND platform IN ('instagram', 'facebook')
+          AND account_id IS NOT NULL AND account_id != '' AND access_token IS NOT NULL AND access_token != ''
+    """).fetchall())
+    last_dates = {row['account_id']: row['collected_through'] for row in db.execute(
+        "SELECT account_id, collected_through FROM account_metrics_state"
+    ).fetchall()}
+    db.close()
+
+    if progress:
+        progress.set_total(len(accounts))
+
+    summary = {'accounts': len(accounts), 'collected': 0, 'failed': 0, 'days': 0, 'errors': {}}
+    with ThreadPoolExecutor(max_workers=COLLECT_WORKERS) as pool:
+        futures = [(a, pool.submit(_collect_account, a, last_dates.get(a['id']), today)) for a in accounts]
+        db = get_db()
+        for account, future in futures:
+            rows, error = future.result()
+            if error:
+                summary['failed'] += 1
+                summary['errors'][account['id']] = error
+                if progress:
+                    progress.advance(failed=1)
+                continue
+            # COALESCE keeps values already stored when a row only carries some columns
+            db.executemany("""
+                INSERT INTO account_daily_metrics
+                    (account_id, date, followers, followers_gained, reach, impressions, profile_views, fetched_at)
+                VALUES (?,?,?,?,?,?,?, datetime('now'))
+                ON CONFLICT(account_id, date) DO UPDATE SET
+                    followers=COALESCE(excluded.followers, followers),
+                    followers_gained=COALESCE(excluded.followers_gained, followers_gained),
+                    reach=COALESCE(excluded.reach, reach),
+                    impressions=COALESCE(excluded.impressions, impressions),
+                    profile_views=COALESCE(excluded.profile_views, profile_views),
+                    fetched_at=excluded.fetched_at
+            """, rows)
+            db.execute("""
+                INSERT INTO account_metrics_state (account_id, collected_through, updated_at)
+                SELECT id, ?, datetime('now') FROM accounts WHERE id=?
+                ON CONFLICT(account_id) DO UPDATE SET
+                    collected_through=excluded.collected_through, updated_at=excluded.updated_at
+            """, ((today - timedelta(days=1)).isoformat(), account['id']))
+            db.commit()
+            summary['collected'] += 1
+            summary['days'] += len(rows)
+            if progress:
+                progress.advance(succeeded=1)
+        db.close()
+    return summary
+
+
+def account_growth(client_id=None, days=90):
+    """Stored daily series per account for growth charts; no API calls."""
+    since = (datetime.utcnow().date() - timedelta(days=days)).isoformat()
+    sql = """
+        SELECT m.account_id, a.platform, a.account_name, a.client_id, m.date,
+               m.followers, m.followers_gained, m.reach, m.impressions, m.profile_views
+        FROM account_daily_metrics m
+        JOIN accounts a ON a.id = m.account_id
+        WHERE m.date >= ?"""
+    params = [since]
+    if client_id:
+        sql += " AND a.client_id = ?"
+        params.append(client_id)
+    sql += " ORDER BY m.account_id, m.date"
+    db = get_db()
+    rows = dicts_from_rows(db.execute(sql, params).fetchall())
+    db.close()
+
+    series = {}
+    for row in rows:
+        account = series.setdefault(row['account_id'], {
+            'account_id': row['account_id'], 'platform': row['platform'],
+            'account_name': row['account_name'], 'client_id': row['client_id'], 'days': [],
+        })
+        account['days'].append({k: row[k] for k in ('date', 'followers', 'followers_gained', 'reach',
+                                                     'impressions', 'profile_views')})
+    return list(series.values())
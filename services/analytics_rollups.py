@@ -0,0 +1,120 @@
+"""Daily analytics rollups.
+
+analytics_post_rollup holds post counts and insight sums per
+(day, client, hour, platforms, post_type, status, workflow_status), and
+analytics_platform_rollup holds insight sums per (day, client, hour,
+platform, post_type). The day of a post is the date of its scheduled_at,
+falling back to created_at ('' when neither parses).
+
+Triggers on scheduled_posts and post_insights (migration 38) record every
+day whose rows changed in analytics_rollup_dirty. refresh() recomputes just
+those days, so its cost follows the amount of change rather than the size
+of the history. It runs from the scheduler every minute (app.py); requests
+only read the rollups and never wait on the write lock. Each refresh bumps
+the 'analytics_rollups' table_versions counter so cached responses built on
+older rollups are dropped. rebuild() recomputes everything for repairs:
+
+    python -m services.analytics_rollups
+"""
+from models import get_db
+
+_DAY = "IFNULL(DATE(COALESCE(scheduled_at, created_at)), '')"
+_HOUR = "CAST(strftime('%H', COALESCE(scheduled_at, created_at)) AS INTEGER)"
+
+METRICS = ('impressions', 'reach', 'likes', 'comments', 'shares', 'saves', 'clicks', 'video_views')
+
+# Days recomputed per statement
+REFRESH_CHUNK = 200
+
+# Posts on a chunk of dirty days; the literal IN list lets SQLite search the
+# expression index on the day (a join against the dirty table would scan).
+_DIRTY_POSTS = f"""
+    SELECT id, client_id, platforms, post_type, status, workflow_status,
+           {_DAY} AS day, {_HOUR} AS hour
+    FROM scheduled_posts
+    WHERE {_DAY} IN ({{days}})
+"""
+
+_POST_ROLLUP_SQL = f"""
+    INSERT INTO analytics_post_rollup (day, client_id, hour, platforms, post_type, status, workflow_status,
+        posts, posts_with_insights, joined_rows, insight_rows,
+        {', '.join(METRICS)}, engagement_rate_sum)
+    SELECT day, client_id, hour, platforms, post_type, status, workflow_status,
+           COUNT(*), SUM(n > 0), SUM(MAX(n, 1)), SUM(n),
+           {', '.join(f'SUM({m})' for m in METRICS)}, SUM(engagement_rate_sum)
+    FROM (
+        SELECT sp.*, COUNT(pi.id) AS n,
+               {', '.join(f'IFNULL(SUM(pi.{m}), 0) AS {m}' for m in METRICS)},
+               IFNULL(SUM(pi.engagement_rate), 0) AS engagement_rate_sum
+        FROM ({_DIRTY_POSTS}) sp
+        LEFT JOIN post_insights pi ON pi.post_id = sp.id
+        GROUP BY sp.id
+    )
+    GROUP BY day, client_id, hour, platforms, post_type, status, workflow_status
+"""
+
+_PLATFORM_ROLLUP_SQL = f"""
+    INSERT INTO analytics_platform_rollup (day, client_id, hour, platform, post_type, insight_rows,
+        {', '.join(METRICS)}, engagement_rate_sum)
+    SELECT sp.day, sp.client_id, sp.hour, pi.platform, sp.post_type, COUNT(*),
+           {', '.join(f'IFNULL(SUM(pi.{m}), 0)' for m in METRICS)}, IFNULL(SUM(pi.engagement_rate), 0)
+    FROM ({_DIRTY_POSTS}) sp
+    JOIN post_insights pi ON pi.post_id = sp.id
+    GROUP BY sp.day, sp.client_id, sp.hour, pi.platform, sp.post_type
+"""
+
+
+def _recompute(db):
+    """Replace the rollups of every dirty day. Runs inside the caller's write transaction."""
+    days = [row['day'] for row in db.execute("SELECT day FROM analytics_rollup_dirty").fetchall()]
+    for i in range(0, len(days), REFRESH_CHUNK):
+        chunk = days[i:i + REFRESH_CHUNK]
+        placeholders = ','.join('?' * len(chunk))
+        db.execute(f"DELETE FROM analytics_post_rollup WHERE day IN ({placeholders})", chunk)
+        db.execute(f"DELETE FROM analytics_platform_rollup WHERE day IN ({placeholders})", chunk)
+        db.execute(_POST_ROLLUP_SQL.format(days=placeholders), chunk)
+        db.execute(_PLATFORM_ROLLUP_SQL.format(days=placeholders), chunk)
+    db.execute("DELETE FROM analytics_rollup_dirty")
+    db.execute("""
+        INSERT INTO table_versions (table_name, version) VALUES ('analytics_rollups', 1)
+        ON CONFLICT(table_name) DO UPDATE SET version = version + 1
+    """)
+    return len(days)
+
+
+def refresh(db=None):
+    """Recompute the rollups of every dirty day; returns how many days were refreshed."""
+    own = db is None
+    db = db or get_db()
+    # Cheap check first so clean reads never take the write lock
+    if db.execute("SELECT 1 FROM analytics_rollup_dirty LIMIT 1").fetchone() is None:
+        days = 0
+    else:
+        # Read and clear the dirty set under the write lock so no day marked
+        # by a concurrent writer is lost
+        db.execute("BEGIN IMMEDIATE")
+        days = _recompute(db)
+        db.commit()
+    if own:
+        db.close()
+    return days
+
+
+def rebuild(progress=None):
+    """Drop and recompute all rollups. Can run as a background job (see services/jobs.py)."""
+    db = get_db()
+    db.execute("BEGIN IMMEDIATE")
+    db.execute("DELETE FROM analytics_post_rollup")
+    db.execute("DELETE FROM analytics_platform_rollup")
+    db.execute(f"INSERT OR IGNORE INTO analytics_rollup_dirty (day) SELECT DISTINCT {_DAY} FROM scheduled_posts")
+    days = _recompute(db)
+    db.commit()
+    db.close()
+    if progress:
+        progress.set_total(days)
+        progress.advance(succeeded=days)
+    return {'days': days}
+
+
+if __name__ == '__main__':
+    print(f"Rebuilt analytics rollups for {rebuild()['days']} days")
@@ -0,0 +1,322 @@
+"""Optional columnar copy of the analytics history in a DuckDB file.
+
+Long-range analytics (period=all, year-long team performance) scan the whole
+history. When ANALYTICS_STORE_PATH is set and the duckdb package is
+installed, sync() keeps a DuckDB file current and those queries read it
+instead of the live SQLite database the publisher writes to.
+
+What sync() copies:
+- scheduled_posts and post_insights: only rows whose ids the change log
+  recorded (analytics_export_changes, migration 42).
+- workflow_history and user_activity: append-only, copied past an id
+  watermark kept in the store.
+- users and clients: small, so they are copied whole each time.
+
+The first sync turns change tracking on and exports everything. Without the
+store configured, sync() turns tracking off so the change log stays empty.
+
+DuckDB allows one writing process at a time. A sync that finds the file
+locked by another worker skips that round. A reader that cannot open the
+file, or finds it older than MAX_LAG_SECONDS, returns None and the caller
+falls back to SQLite.
+"""
+import os
+import tempfile
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from models import get_db
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+STORE_PATH = os.getenv('ANALYTICS_STORE_PATH', '')
+# How stale the store may be and still answer queries
+MAX_LAG_SECONDS = int(os.getenv('ANALYTICS_STORE_MAX_LAG', 900))
+# Periods at least this long (in days) read from the store
+LONG_RANGE_DAYS = int(os.getenv('ANALYTICS_STORE_LONG_RANGE_DAYS', 180))
+SYNC_BATCH = 50000
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Exported columns per table; ids are primary keys in both databases
+COLUMNS = {
+    'scheduled_posts': ('id', 'client_id', 'topic', 'caption', 'post_type', 'platforms', 'status',
+                        'workflow_status', 'scheduled_at', 'created_at', 'design_output_urls', 'created_by_id'),
+    'post_insights': ('id', 'post_id', 'platform', 'impressions', 'reach', 'likes', 'comments', 'shares',
+                      'saves', 'clicks', 'video_views', 'engagement_rate', 'fetched_at'),
+    'workflow_history': ('id', 'post_id', 'user_id', 'from_status', 'to_status', 'created_at'),
+    'user_activity': ('id', 'user_id', 'endpoint', 'date', 'created_at'),
+    'users': ('id', 'username', 'role'),
+    'clients': ('id', 'name', 'color'),
+}
+TYPES = {
+    'id': 'BIGINT', 'client_id': 'BIGINT', 'post_id': 'BIGINT', 'user_id': 'BIGINT', 'created_by_id': 'BIGINT',
+    'impressions': 'BIGINT', 'reach': 'BIGINT', 'likes': 'BIGINT', 'comments': 'BIGINT', 'shares': 'BIGINT',
+    'saves': 'BIGINT', 'clicks': 'BIGINT', 'video_views': 'BIGINT', 'engagement_rate': 'DOUBLE',
+}
+CHANGE_TRACKED = ('scheduled_posts', 'post_insights')
+APPEND_ONLY = ('workflow_history', 'user_activity')
+SNAPSHOT = ('users', 'clients')
+
+
+def enabled():
+    return bool(STORE_PATH) and duckdb is not None
+
+
+def _set_tracking(db, on):
+    db.execute("UPDATE analytics_export_state SET value=? WHERE key='tracking'", ('1' if on else '0',))
+    if not on:
+        db.execute("DELETE FROM analytics_export_changes")
+    db.commit()
+
+
+def _create_tables(store):
+    for table, columns in COLUMNS.items():
+        ddl = ', '.join(f"{c} {TYPES.get(c, 'VARCHAR')}" for c in columns)
+        store.execute(f"CREATE TABLE IF NOT EXISTS {table} ({ddl}, PRIMARY KEY (id))")
+    store.execute("CREATE TABLE IF NOT EXISTS store_meta (key VARCHAR PRIMARY KEY, value VARCHAR)")
+
+
+def _meta(store, key):
+    row = store.execute("SELECT value FROM store_meta WHERE key = ?", [key]).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(store, key, value):
+    store.execute("INSERT OR REPLACE INTO store_meta VALUES (?, ?)", [key, str(value)])
+
+
+def _select(table, where='', params=()):
+    return f"SELECT {', '.join(COLUMNS[table])} FROM {table} {where}", list(params)
+
+
+def _csv_field(value):
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _insert(store, table, rows):
+    """Upsert rows into the store.
+
+    Rows are staged through a CSV file: DuckDB binds Python parameters a
+    few thousand rows a second, but reads CSV at millions. Unquoted empty
+    fields are NULL; everything is read as text and cast per column.
+    """
+    if not rows:
+        return
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            for row in rows:
+                f.write(','.join(_csv_field(v) for v in row))
+                f.write('\n')
+        columns = COLUMNS[table]
+        spec = ', '.join(f"'{c}': 'VARCHAR'" for c in columns)
+        select = ', '.join(f"TRY_CAST({c} AS {TYPES[c]})" if c in TYPES else c for c in columns)
+        store.execute(f"""
+            INSERT OR REPLACE INTO {table}
+            SELECT {select} FROM read_csv(?, header=false, columns={{{spec}}},
+                                          nullstr='', allow_quoted_nulls=false, quote='"', escape='"')
+        """, [path])
+    finally:
+        os.remove(path)
+
+
+def _export_all(db, store):
+    """Full copy; change tracking is switched on first so nothing written meanwhile is missed."""
+    _set_tracking(db, True)
+    for table in CHANGE_TRACKED + APPEND_ONLY:
+        store.execute(f"DELETE FROM {table}")
+        last_id = 0
+        while True:
+            rows = db.execute(*_select(table, "WHERE id > ? ORDER BY id LIMIT ?", (last_id, SYNC_BATCH))).fetchall()
+            if not rows:
+                break
+            _insert(store, table, rows)
+            last_id = rows[-1]['id']
+        if table in APPEND_ONLY:
+            _set_meta(store, f'last_id:{table}', last_id)
+    _set_meta(store, 'exported_at', datetime.utcnow().strftime(_TS_FORMAT))
+
+
+def _apply_changes(db, store):
+    """Copy rows recorded in the change log; returns how many ids were applied."""
+    applied = 0
+    for table in CHANGE_TRACKED:
+        while True:
+            # Claim a batch: ids marked again after this point get a new log entry
+            db.execute("BEGIN IMMEDIATE")
+            ids = [row['row_id'] for row in db.execute(
+                "SELECT row_id FROM analytics_export_changes WHERE table_name=? LIMIT ?", (table, SYNC_BATCH)
+            ).fetchall()]
+            if not ids:
+                db.commit()
+                break
+            placeholders = ','.join('?' * len(ids))
+            rows = db.execute(*_select(table, f"WHERE id IN ({placeholders})", ids)).fetchall()
+            db.execute(f"DELETE FROM analytics_export_changes WHERE table_name=? AND row_id IN ({placeholders})",
+                       [table, *ids])
+            db.commit()
+            try:
+                store.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+                _insert(store, table, rows)
+                if table == 'scheduled_posts':
+                    # Deleting a post also deletes its workflow history
+                    gone = sorted(set(ids) - {row['id'] for row in rows})
+                    if gone:
+                        store.execute(
+                            f"DELETE FROM workflow_history WHERE post_id IN ({','.join('?' * len(gone))})", gone)
+            except Exception:
+                db.executemany(
+                    "INSERT INTO analytics_export_changes (table_name, row_id) VALUES (?, ?) "
+                    "ON CONFLICT(table_name, row_id) DO NOTHING",
+                    [(table, i) for i in ids]
+                )
+                db.commit()
+                raise
+            applied += len(ids)
+    return applied
+
+
+def _append_new(db, store):
+    appended = 0
+    for table in APPEND_ONLY:
+        last_id = int(_meta(store, f'last_id:{table}') or 0)
+        while True:
+            rows = db.execute(*_select(table, "WHERE id > ? ORDER BY id LIMIT ?", (last_id, SYNC_BATCH))).fetchall()
+            if not rows:
+                break
+            _insert(store, table, rows)
+            last_id = rows[-1]['id']
+            appended += len(rows)
+        _set_meta(store, f'last_id:{table}', last_id)
+    return appended
+
+
+def sync(progress=None):
+    """Bring the store up to date. Can run as a background job (see services/jobs.py)."""
+    db = get_db()
+    tracking = db.execute("SELECT value FROM analytics_export_state WHERE key='tracking'").fetchone()
+    tracking = bool(tracking) and tracking['value'] == '1'
+    if not enabled():
+        if tracking:
+            _set_tracking(db, False)
+        db.close()
+        return {'enabled': False}
+
+    started = time.monotonic()
+    try:
+        store = duckdb.connect(STORE_PATH)
+    except duckdb.IOException:
+        # Another worker holds the write lock and is syncing right now
+        db.close()
+        return {'enabled': True, 'skipped': True}
+
+    summary = {'enabled': True, 'full_export': False, 'changed': 0, 'appended': 0}
+    try:
+        _create_tables(store)
+        if _meta(store, 'exported_at') is None or not tracking:
+            _export_all(db, store)
+            summary['full_export'] = True
+        summary['changed'] = _apply_changes(db, store)
+        summary['appended'] = _append_new(db, store)
+        for table in SNAPSHOT:
+            store.execute(f"DELETE FROM {table}")
+            _insert(store, table, db.execute(*_select(table)).fetchall())
+        _set_meta(store, 'synced_at', datetime.utcnow().strftime(_TS_FORMAT))
+        store.execute("CHECKPOINT")
+    finally:
+        store.close()
+        db.close()
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    if progress:
+        progress.set_total(1)
+        progress.advance(succeeded=1)
+    return summary
+
+
+def query(sql, params=()):
+    """Run sql against the store; None when it is unavailable or staler than MAX_LAG_SECONDS."""
+    if not enabled() or not os.path.exists(STORE_PATH):
+        return None
+    try:
+        store = duckdb.connect(STORE_PATH, read_only=True)
+    except duckdb.Error:
+        return None
+    try:
+        synced_at = _meta(store, 'synced_at')
+        if not synced_at or datetime.utcnow() - datetime.strptime(synced_at, _TS_FORMAT) > timedelta(
+                seconds=MAX_LAG_SECONDS):
+            return None
+        cursor = store.execute(sql, list(params))
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+    except duckdb.Error:
+        traceback.print_exc()
+        return None
+    finally:
+        store.close()
+
+
+def history_tables(client_id=None, days=None):
+    """Top posts, team performance and average turnaround for a long period from the store.
+
+    Mirrors the SQLite queries in get_analytics; returns None when the store
+    cannot answer, so the caller falls back to the live database.
+    """
+    since = (datetime.utcnow() - timedelta(days=days)).strftime(_TS_FORMAT) if days else None
+    post_filter, post_params = '', []
+    if since:
+        post_filter += ' AND COALESCE(sp.scheduled_at, sp.created_at) >= ?'
+        post_params.append(since)
+    if client_id:
+        post_filter += ' AND sp.client_id = ?'
+        post_params.append(int(client_id))
+
+    top_posts = query(f"""
+        SELECT sp.id, sp.topic, sp.caption, sp.post_type, sp.platforms,
+               sp.scheduled_at, sp.design_output_urls, c.name as client_name,
+               pi.impressions, pi.reach, pi.likes, pi.comments, pi.shares,
+               pi.saves, pi.engagement_rate, pi.video_views
+        FROM post_insights pi
+        JOIN scheduled_posts sp ON pi.post_id = sp.id
+        LEFT JOIN clients c ON sp.client_id = c.id
+        WHERE 1=1 {post_filter}
+        ORDER BY pi.engagement_rate DESC, pi.impressions DESC
+        LIMIT 10
+    """, post_params)
+    if top_posts is None:
+        return None
+
+    team_performance = query(f"""
+        SELECT u.username, u.role,
+               COUNT(DISTINCT wh.post_id) as actions,
+               COUNT(DISTINCT CASE WHEN wh.to_status = 'approved' THEN wh.post_id END) as approvals,
+               COUNT(DISTINCT CASE WHEN wh.to_status = 'posted' THEN wh.post_id END) as published
+        FROM workflow_history wh
+        JOIN users u ON wh.user_id = u.id
+        WHERE 1=1 {'AND wh.created_at >= ?' if since else ''}
+        GROUP BY wh.user_id, u.username, u.role ORDER BY actions DESC
+    """, [since] if since else [])
+    turnaround = query(f"""
+        SELECT AVG(
+            epoch(TRY_CAST(wh_posted.created_at AS TIMESTAMP)) - epoch(TRY_CAST(sp.created_at AS TIMESTAMP))
+        ) / 86400.0 as avg_days
+        FROM scheduled_posts sp
+        JOIN workflow_history wh_posted ON sp.id = wh_posted.post_id AND wh_posted.to_status = 'posted'
+        WHERE sp.status = 'posted' {post_filter}
+    """, post_params)
+    if team_performance is None or turnaround is None:
+        return None
+    return {
+        'top_posts': top_posts,
+        'team_performance': team_performance,
+        'avg_turnaround_days': (turnaround[0] if turnaround else {}).get('avg_days'),
+    }
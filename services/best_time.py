@@ -0,0 +1,130 @@
+"""Best time to post, per client and platform, on a weekday x hour grid.
+
+engagement_slot_stats (migration 41) holds engagement-rate sums and counts
+per (client, platform, weekday, hour) and is kept current by triggers as
+insights arrive. This module turns those sums into a 7x24 score matrix:
+
+- sums and counts are smoothed over neighbouring hours (the grid is treated
+  as one 168-hour ring, so Sunday 23:00 neighbours Monday 00:00);
+- each slot's mean is shrunk toward the agency-wide mean for the same slot
+  with PRIOR_STRENGTH pseudo-posts, so a slot with one lucky post does not
+  outrank one with a long record; the agency-wide matrix is itself shrunk
+  toward the agency's overall mean.
+
+Matrices are cached per (client, platform) and invalidated through the
+table_versions counters, so looking up a slot's score or the ranking is
+constant time between writes.
+"""
+import numpy as np
+
+from models import get_db
+from services.insight_refresh import base_platform
+from services.response_cache import ResponseCache
+
+WEEKDAY_CODES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Pseudo-posts of prior evidence mixed into every slot
+PRIOR_STRENGTH = 5.0
+# Weights for (previous hour, same hour, next hour)
+SMOOTHING = np.array([0.25, 0.5, 0.25])
+
+SOURCE_TABLES = ('scheduled_posts', 'post_insights')
+
+_cache = ResponseCache(max_entries=1024)
+
+
+def _load(client_id=None, platform=None):
+    """(sums, counts) 7x24 arrays over the matching engagement_slot_stats rows."""
+    sql = "SELECT weekday, hour, posts, engagement_sum FROM engagement_slot_stats WHERE posts > 0"
+    params = []
+    if client_id:
+        sql += " AND client_id = ?"
+        params.append(client_id)
+    if platform:
+        sql += " AND platform = ?"
+        params.append(base_platform(platform))
+    db = get_db()
+    rows = np.array(db.execute(sql, params).fetchall(), dtype=float).reshape(-1, 4)
+    db.close()
+
+    sums = np.zeros((7, 24))
+    counts = np.zeros((7, 24))
+    weekdays, hours = rows[:, 0].astype(int), rows[:, 1].astype(int)
+    np.add.at(counts, (weekdays, hours), rows[:, 2])
+    np.add.at(sums, (weekdays, hours), rows[:, 3])
+    return sums, counts
+
+
+def _smooth(grid):
+    ring = grid.ravel()
+    smoothed = SMOOTHING[0] * np.roll(ring, 1) + SMOOTHING[1] * ring + SMOOTHING[2] * np.roll(ring, -1)
+    return smoothed.reshape(7, 24)
+
+
+def _shrink(sums, counts, prior_mean):
+    return (_smooth(sums) + PRIOR_STRENGTH * prior_mean) / (_smooth(counts) + PRIOR_STRENGTH)
+
+
+def _compute(client_id, platform):
+    agency_sums, agency_counts = _load(platform=platform)
+    overall = agency_sums.sum() / agency_counts.sum() if agency_counts.sum() else 0.0
+    prior = _shrink(agency_sums, agency_counts, overall)
+    if client_id:
+        sums, counts = _load(client_id, platform)
+        scores = _shrink(sums, counts, prior)
+    else:
+        scores, counts = prior, agency_counts
+    return {
+        'scores': scores,
+        'posts': counts,
+        # Slot indexes (weekday * 24 + hour), best first
+        'ranking': np.argsort(-scores, axis=None, kind='stable'),
+    }
+
+
+def engagement_matrix(client_id=None, platform=None):
+    """Score matrix for a client (agency-wide when None), optionally for one platform.
+
+    Returns {'scores': 7x24 array, 'posts': 7x24 array, 'ranking': flat slot indexes}.
+    """
+    key = (client_id or None, base_platform(platform) or None)
+    return _cache.get_or_compute(key, SOURCE_TABLES, lambda: _compute(*key))
+
+
+def slot_score(matrix, when):
+    """Score of the slot a datetime falls in."""
+    return round(float(matrix['scores'][when.weekday(), when.hour]), 3)
+
+
+def best_slots(client_id=None, platform=None, limit=5):
+    """Top weekday/hour slots as dicts, best first."""
+    matrix = engagement_matrix(client_id, platform)
+    slots = []
+    for index in matrix['ranking'][:limit]:
+        weekday, hour = divmod(int(index), 24)
+        slots.append({
+            'weekday': weekday,
+            'day': WEEKDAY_CODES[weekday],
+            'hour': hour,
+            'score': round(float(matrix['scores'][weekday, hour]), 3),
+            'posts': int(matrix['posts'][weekday, hour]),
+        })
+    return slots
+
+
+def heatmap(client_id=None, platform=None):
+    """Scores as nested lists (weekday rows, hour columns) for JSON responses."""
+    return np.round(engagement_matrix(client_id, platform)['scores'], 3).tolist()
+
+
+def platforms(client_id=None):
+    """Base platforms with any recorded engagement for the client (or agency)."""
+    sql = "SELECT DISTINCT platform FROM engagement_slot_stats WHERE posts > 0"
+    params = []
+    if client_id:
+        sql += " AND client_id = ?"
+        params.append(client_id)
+    db = get_db()
+    rows = db.execute(sql + " ORDER BY platform", params).fetchall()
+    db.close()
+    return [row['platform'] for row in rows]
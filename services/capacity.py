@@ -0,0 +1,335 @@
+"""Team capacity: monthly workload bars and the users x days heatmap.
+
+Both views are built from a fixed number of grouped queries, whatever the
+size of the team: this month's open posts grouped by their assignees, the
+heatmap window's open posts grouped by day and assignees, and requirement
+totals per assignee aggregated over client_content_requirements. Per-user
+numbers are then tallied in Python.
+
+The counting rules per role are:
+
+- designer / motion_designer: open posts where they are the designer or the
+  motion designer; required is the design (or video) items of the clients
+  they are assigned to.
+- sm_specialist: open posts they are assigned to or created; required is
+  every item of the clients they handle as SM or writer.
+- moderator: approved and scheduled posts; required is every item of every
+  client.
+- admin: all open posts; no requirement.
+
+capacity_forecast() looks ahead instead: it expands every active posting
+rule into expected posts per week (services/posting_schedule.py), subtracts
+the posts already scheduled for each client and week, and charges the
+remaining slots to the client's assigned designer or motion designer and
+its SM and writer. Results are cached until posts, rules, clients or users
+change.
+"""
+from datetime import datetime, timedelta
+
+from models import get_db, dicts_from_rows
+from services import content_requirements
+from services.posting_schedule import expand_rule
+from services.response_cache import ResponseCache
+
+DESIGN_TYPES = ('post', 'story', 'carousel', 'banner', 'brochure')
+MOTION_TYPES = ('video', 'reel')
+CLOSED_STATUSES = ('posted', 'failed')
+HEATMAP_DAYS = 14
+MAX_FORECAST_WEEKS = 26
+
+FORECAST_TABLES = ('scheduled_posts', 'client_posting_rules', 'clients', 'users')
+_forecast_cache = ResponseCache(max_entries=64)
+
+# Same expression as idx_posts_rollup_day (migration 38), so the window is an index range
+_DAY = "IFNULL(DATE(COALESCE(scheduled_at, created_at)), '')"
+
+
+def requirements_index(db):
+    """Monthly required items per role and user, aggregated in SQL (services/content_requirements.py).
+
+    Returns {'designer': {uid: n}, 'motion_designer': {uid: n},
+    'sm_specialist': {uid: n}, 'total': n}.
+    """
+    index = content_requirements.totals_by_user(db, {
+        'designer': (('assigned_designer_id',), DESIGN_TYPES),
+        'motion_designer': (('assigned_motion_id',), MOTION_TYPES),
+        'sm_specialist': (('assigned_sm_id', 'assigned_writer_id'), None),
+    })
+    index['total'] = content_requirements.total(db)
+    return index
+
+
+def required_for(index, user):
+    role = user['role']
+    if role == 'moderator':
+        return index['total']
+    return index.get(role, {}).get(user['id'], 0)
+
+
+def _active_counts(db, users, month_start):
+    """Open posts created this month per user, under each role's counting rule."""
+    groups = db.execute(f"""
+        SELECT assigned_designer_id, assigned_motion_id, assigned_sm_id, created_by_id,
+               workflow_status IN ('approved', 'scheduled') AS ready, COUNT(*) AS c
+        FROM scheduled_posts
+        WHERE created_at >= ? AND workflow_status NOT IN ({','.join('?' * len(CLOSED_STATUSES))})
+        GROUP BY assigned_designer_id, assigned_motion_id, assigned_sm_id, created_by_id, ready
+    """, (month_start, *CLOSED_STATUSES)).fetchall()
+
+    design, social = {}, {}
+    total = ready = 0
+    for g in groups:
+        total += g['c']
+        if g['ready']:
+            ready += g['c']
+        # A post counts once even when the user fills both of its columns
+        for uid in {g['assigned_designer_id'], g['assigned_motion_id']} - {None}:
+            design[uid] = design.get(uid, 0) + g['c']
+        for uid in {g['assigned_sm_id'], g['created_by_id']} - {None}:
+            social[uid] = social.get(uid, 0) + g['c']
+
+    counts = {}
+    for user in users:
+        role = user['role']
+        if role in ('designer', 'motion_designer'):
+            counts[user['id']] = design.get(user['id'], 0)
+        elif role == 'sm_specialist':
+            counts[user['id']] = social.get(user['id'], 0)
+        elif role == 'moderator':
+            counts[user['id']] = ready
+        elif role == 'admin':
+            counts[user['id']] = total
+        else:
+            counts[user['id']] = 0
+    return counts
+
+
+def _heatmap(db, users, start):
+    """Open posts per user and day over HEATMAP_DAYS days from start."""
+    dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(HEATMAP_DAYS)]
+    groups = db.execute(f"""
+        SELECT {_DAY} AS day, assigned_designer_id, assigned_sm_id, assigned_motion_id, created_by_id,
+               COUNT(*) AS c
+        FROM scheduled_posts
+        WHERE {_DAY} BETWEEN ? AND ?
+          AND workflow_status NOT IN ({','.join('?' * len(CLOSED_STATUSES))})
+        GROUP BY day, assigned_designer_id, assigned_sm_id, assigned_motion_id, created_by_id
+    """, (dates[0], dates[-1], *CLOSED_STATUSES)).fetchall()
+
+    cells = {}
+    for g in groups:
+        for uid in {g['assigned_designer_id'], g['assigned_sm_id'], g['assigned_motion_id'],
+                    g['created_by_id']} - {None}:
+            cells[(uid, g['day'])] = cells.get((uid, g['day']), 0) + g['c']
+
+    return [{
+        'user_id': user['id'],
+        'username': user['username'],
+        'role': user['role'],
+        'days': [{'date': d, 'count': cells.get((user['id'], d), 0)} for d in dates],
+    } for user in users]
+
+
+def capacity_report(role_filter='', now=None):
+    """Everything /api/capacity returns: bars, heatmap, role summary, unassigned, deadlines."""
+    now = now or datetime.now()
+    month_start = now.strftime('%Y-%m-01')
+    db = get_db()
+
+    user_query = "SELECT id, username, role, job_title FROM users WHERE is_active=1"
+    user_params = []
+    if role_filter:
+        user_query += " AND role=?"
+        user_params = [role_filter]
+    users = dicts_from_rows(db.execute(user_query, user_params).fetchall())
+
+    requirements = requirements_index(db)
+    active = _active_counts(db, users, month_start)
+
+    # === CAPACITY BARS ===
+    capacity_bars = []
+    for user in users:
+        required = required_for(requirements, user)
+        active_count = active[user['id']]
+        capacity_bars.append({
+            'user_id': user['id'],
+            'username': user['username'],
+            'role': user['role'],
+            'job_title': user.get('job_title', ''),
+            'active': active_count,
+            'required': required,
+            'utilization': round((active_count / required * 100) if required > 0 else 0, 1)
+        })
+
+    # === HEATMAP: users x dates (the week before and after today) ===
+    heatmap_data = _heatmap(db, users, now - timedelta(days=6))
+
+    # === ROLE SUMMARY ===
+    role_summary = {}
+    for bar in capacity_bars:
+        r = bar['role']
+        if r not in role_summary:
+            role_summary[r] = {'role': r, 'users': 0, 'active': 0, 'required': 0}
+        role_summary[r]['users'] += 1
+        role_summary[r]['active'] += bar['active']
+        role_summary[r]['required'] += bar['required']
+    for rs in role_summary.values():
+        rs['utilization'] = round((rs['active'] / rs['required'] * 100) if rs['required'] > 0 else 0, 1)
+
+    # === UNASSIGNED POSTS ===
+    unassigned = dicts_from_rows(db.execute("""
+        SELECT sp.id, sp.topic, sp.caption, sp.post_type, sp.platforms, sp.workflow_status,
+               sp.scheduled_at, sp.priority, c.name as client_name
+        FROM scheduled_posts sp
+        LEFT JOIN clients c ON sp.client_id = c.id
+        WHERE sp.workflow_status NOT IN ('posted', 'failed', 'draft')
+          AND (
+            (sp.workflow_status = 'in_design' AND sp.assigned_designer_id IS NULL)
+            OR (sp.workflow_status = 'pending_review' AND sp.assigned_manager_id IS NULL)
+            OR (sp.workflow_status IN ('approved', 'scheduled') AND sp.assigned_sm_id IS NULL)
+          )
+        ORDER BY CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 ELSE 2 END, sp.created_at DESC
+        LIMIT 20
+    """).fetchall())
+
+    # === UPCOMING DEADLINES (7 days) ===
+    deadline_end = (now + timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+    deadlines = dicts_from_rows(db.execute("""
+        SELECT sp.id, sp.topic, sp.post_type, sp.platforms, sp.scheduled_at, sp.workflow_status,
+               sp.priority, c.name as client_name,
+               u_d.username as designer_name, u_s.username as sm_name
+        FROM scheduled_posts sp
+        LEFT JOIN clients c ON sp.client_id = c.id
+        LEFT JOIN users u_d ON sp.assigned_designer_id = u_d.id
+        LEFT JOIN users u_s ON sp.assigned_sm_id = u_s.id
+        WHERE sp.scheduled_at IS NOT NULL AND sp.scheduled_at != ''
+          AND sp.scheduled_at <= ?
+          AND sp.scheduled_at >= datetime('now')
+          AND sp.workflow_status NOT IN ('posted', 'failed')
+        ORDER BY sp.scheduled_at ASC
+    """, (deadline_end,)).fetchall())
+
+    db.close()
+    return {
+        'capacity_bars': capacity_bars,
+        'heatmap': heatmap_data,
+        'role_summary': list(role_summary.values()),
+        'unassigned': unassigned,
+        'deadlines': deadlines,
+        'roles': sorted(set(u['role'] for u in users))
+    }
+
+
+def _kind(post_type):
+    return 'motion' if post_type in MOTION_TYPES else 'design'
+
+
+def _compute_forecast(start, weeks):
+    end = (start + timedelta(days=weeks * 7)).isoformat()
+    db = get_db()
+    rules = db.execute(
+        "SELECT client_id, posting_days, posts_per_day, content_type FROM client_posting_rules WHERE is_active=1"
+    ).fetchall()
+    clients = {row['id']: row for row in db.execute(
+        "SELECT id, name, assigned_designer_id, assigned_motion_id, assigned_sm_id, assigned_writer_id FROM clients"
+    ).fetchall()}
+    users = dicts_from_rows(db.execute("SELECT id, username, role FROM users WHERE is_active=1").fetchall())
+    posts = db.execute("""
+        SELECT client_id, post_type,
+               CAST((julianday(DATE(scheduled_at)) - julianday(?)) / 7 AS INTEGER) AS week,
+               assigned_designer_id, assigned_motion_id, assigned_sm_id, assigned_writer_id,
+               workflow_status != 'posted' AS open, COUNT(*) AS c
+        FROM scheduled_posts
+        WHERE scheduled_at >= ? AND scheduled_at < ? AND workflow_status != 'failed'
+        GROUP BY client_id, post_type, week, assigned_designer_id, assigned_motion_id, assigned_sm_id,
+                 assigned_writer_id, open
+    """, (start.isoformat(), start.isoformat(), end)).fetchall()
+    db.close()
+
+    # Expected and existing posts per (client, kind), one count per week
+    expected, existing = {}, {}
+    for rule in rules:
+        counts = expand_rule(rule['posting_days'], rule['posts_per_day'], start.isoformat(), weeks)
+        key = (rule['client_id'], _kind(rule['content_type']))
+        expected[key] = [a + b for a, b in zip(expected.get(key, [0] * weeks), counts)]
+
+    active = {u['id'] for u in users}
+    scheduled = {uid: [0] * weeks for uid in active}
+    for p in posts:
+        if not 0 <= p['week'] < weeks:
+            continue
+        key = (p['client_id'], _kind(p['post_type']))
+        existing.setdefault(key, [0] * weeks)[p['week']] += p['c']
+        if p['open']:
+            for uid in {p['assigned_designer_id'], p['assigned_motion_id'], p['assigned_sm_id'],
+                        p['assigned_writer_id']} & active:
+                scheduled[uid][p['week']] += p['c']
+
+    # Slots the rules expect but nobody has created yet go to the client's team
+    unfilled = {uid: [0] * weeks for uid in active}
+    unstaffed = {}
+    totals = {'expected': [0] * weeks, 'existing': [0] * weeks, 'unfilled': [0] * weeks}
+    for (client_id, kind), counts in expected.items():
+        client = clients.get(client_id)
+        if client is None:
+            continue
+        have = existing.get((client_id, kind), [0] * weeks)
+        gap = [max(e - h, 0) for e, h in zip(counts, have)]
+        for w in range(weeks):
+            totals['expected'][w] += counts[w]
+            totals['unfilled'][w] += gap[w]
+        owners = {
+            'designer' if kind == 'design' else 'motion_designer':
+                client['assigned_designer_id' if kind == 'design' else 'assigned_motion_id'],
+            'sm_specialist': client['assigned_sm_id'],
+            'writer': client['assigned_writer_id'],
+        }
+        # The same person filling two roles is charged once
+        for uid in set(owners.values()) & active:
+            unfilled[uid] = [a + b for a, b in zip(unfilled[uid], gap)]
+        for role, uid in owners.items():
+            if uid not in active and sum(gap):
+                entry = unstaffed.setdefault((client_id, role), {
+                    'client_id': client_id, 'client_name': client['name'], 'role': role, 'slots': 0})
+                entry['slots'] += sum(gap)
+    for counts in existing.values():
+        for w in range(weeks):
+            totals['existing'][w] += counts[w]
+
+    curves = []
+    for user in users:
+        projected = [a + b for a, b in zip(scheduled[user['id']], unfilled[user['id']])]
+        if not any(projected) and user['role'] not in ('designer', 'motion_designer', 'sm_specialist'):
+            continue
+        curves.append({
+            'user_id': user['id'],
+            'username': user['username'],
+            'role': user['role'],
+            'scheduled': scheduled[user['id']],
+            'unfilled': unfilled[user['id']],
+            'projected': projected,
+            'peak_week': max(range(weeks), key=lambda w: projected[w]) if weeks else None,
+        })
+    curves.sort(key=lambda c: -max(c['projected'], default=0))
+
+    return {
+        'start': start.isoformat(),
+        'weeks': [(start + timedelta(days=7 * w)).isoformat() for w in range(weeks)],
+        'users': curves,
+        'totals': totals,
+        'unstaffed': sorted(unstaffed.values(), key=lambda e: -e['slots']),
+    }
+
+
+def capacity_forecast(weeks=8, start=None):
+    """Projected weekly load per user over the next weeks, from posting rules and existing posts.
+
+    For each user: scheduled (open posts already assigned to them),
+    unfilled (rule slots of their clients with no post yet) and projected
+    (the sum), one value per week starting at start (default today).
+    unstaffed lists clients whose unfilled slots have no active assignee.
+    """
+    weeks = max(1, min(int(weeks), MAX_FORECAST_WEEKS))
+    start = start or datetime.now().date()
+    return _forecast_cache.get_or_compute(
+        (start.isoformat(), weeks), FORECAST_TABLES, lambda: _compute_forecast(start, weeks))
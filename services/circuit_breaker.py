@@ -0,0 +1,154 @@
+"""Circuit breakers for the platform API endpoint families.
+
+Each family (graph.facebook.com, api.linkedin.com) has its own breaker. It
+trips when the recent error rate or slow-call rate gets too high. While open,
+calls fail immediately with CircuitOpenError, so posts are deferred instead
+of each waiting out the full request timeout. After a cooldown the breaker
+goes half-open and lets a few probe calls through; if they succeed it closes
+again, otherwise it reopens with a longer cooldown.
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+WINDOW_SECONDS = int(os.getenv('BREAKER_WINDOW_SECONDS', 120))
+MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 5))
+ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', 0.5))
+SLOW_CALL_SECONDS = float(os.getenv('BREAKER_SLOW_CALL_SECONDS', 15))
+SLOW_CALL_RATE = float(os.getenv('BREAKER_SLOW_CALL_RATE', 0.5))
+COOLDOWN_SECONDS = float(os.getenv('BREAKER_COOLDOWN_SECONDS', 30))
+MAX_COOLDOWN_SECONDS = float(os.getenv('BREAKER_MAX_COOLDOWN_SECONDS', 600))
+HALF_OPEN_PROBES = int(os.getenv('BREAKER_HALF_OPEN_PROBES', 2))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint family whose breaker is open."""
+
+    def __init__(self, family, retry_in):
+        self.family = family
+        self.retry_in = retry_in
+        super().__init__(f'{family} API unavailable (circuit open); retry in {int(retry_in) + 1}s')
+
+
+class CircuitBreaker:
+    def __init__(self, family):
+        self.family = family
+        self.state = CLOSED
+        self.calls = deque()  # (timestamp, failed, slow)
+        self.opened_at = 0.0
+        self.cooldown = COOLDOWN_SECONDS
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.transitions = deque(maxlen=50)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state, reason):
+        self.transitions.append({
+            'from': self.state, 'to': state, 'reason': reason,
+            'at': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        print(f"[CircuitBreaker] {self.family}: {self.state} -> {state} ({reason})")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.probes_in_flight = 0
+        elif state == HALF_OPEN:
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+        elif state == CLOSED:
+            self.calls.clear()
+            self.cooldown = COOLDOWN_SECONDS
+
+    def before_call(self):
+        """Reserve permission for one call or raise CircuitOpenError."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self.opened_at + self.cooldown - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.family, remaining)
+                self._transition(HALF_OPEN, 'cooldown elapsed')
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= HALF_OPEN_PROBES:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.family, 1)
+                self.probes_in_flight += 1
+
+    def release(self):
+        """Give back a reservation for a call that was never made."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def record(self, failed, elapsed):
+        with self._lock:
+            now = time.monotonic()
+            slow = elapsed >= SLOW_CALL_SECONDS
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+                if failed or slow:
+                    self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN_SECONDS)
+                    self._transition(OPEN, 'probe failed' if failed else 'probe slow')
+                else:
+                    self.probe_successes += 1
+                    if self.probe_successes >= HALF_OPEN_PROBES:
+                        self._transition(CLOSED, 'probes succeeded')
+                return
+            if self.state == OPEN:
+                return
+
+            self.calls.append((now, failed, slow))
+            while self.calls and self.calls[0][0] < now - WINDOW_SECONDS:
+                self.calls.popleft()
+            total = len(self.calls)
+            if total < MIN_CALLS:
+                return
+            failures = sum(1 for _, f, _ in self.calls if f)
+            slow_calls = sum(1 for _, _, s in self.calls if s)
+            if failures / total >= ERROR_RATE:
+                self._transition(OPEN, f'error rate {failures}/{total}')
+            elif slow_calls / total >= SLOW_CALL_RATE:
+                self._transition(OPEN, f'slow calls {slow_calls}/{total}')
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            total = len(self.calls)
+            return {
+                'family': self.family,
+                'state': self.state,
+                'window_calls': total,
+                'window_failures': sum(1 for _, f, _ in self.calls if f),
+                'window_slow': sum(1 for _, _, s in self.calls if s),
+                'retry_in': round(max(0.0, self.opened_at + self.cooldown - now), 1) if self.state == OPEN else 0,
+                'cooldown': self.cooldown,
+                'rejected': self.rejected,
+                'transitions': list(self.transitions),
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(family):
+    with _breakers_lock:
+        breaker = _breakers.get(family)
+        if breaker is None:
+            breaker = CircuitBreaker(family)
+            _breakers[family] = breaker
+        return breaker
+
+
+def snapshot():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in sorted(breakers, key=lambda b: b.family)]
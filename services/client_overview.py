@@ -0,0 +1,97 @@
+"""Per-client posting coverage and pipeline figures for the clients overview.
+
+Everything is read with one query per kind of figure, whatever the number
+of clients. Weekly coverage comes straight from client_week_coverage
+(migration 46), which triggers keep current: one row per client and ISO
+week with the post count and a 7-bit mask of the days covered (bit 0 is
+Monday), so any range of weeks costs one indexed lookup per client-week.
+Pipelines are open posts grouped by client and workflow status, and
+accounts are read ordered by client.
+"""
+from datetime import date, timedelta
+
+
+def _client_filter(client_ids):
+    if client_ids is None:
+        return '', []
+    return f" AND client_id IN ({','.join('?' * len(client_ids))})", list(client_ids)
+
+
+def week_start(day):
+    """Monday of the ISO week containing day."""
+    return day - timedelta(days=day.weekday())
+
+
+def mask_days(mask):
+    """A coverage mask as seven booleans, Monday first."""
+    return [bool(mask >> n & 1) for n in range(7)]
+
+
+def weekly_coverage(db, start, weeks, client_ids=None):
+    """Coverage per client for weeks ISO weeks from the week starting at start (a Monday).
+
+    Returns {client_id: [{'posts': n, 'mask': bits}, ...]} with one entry
+    per week; clients with no posts in the range are left out. client_ids
+    limits the clients read (None for all).
+    """
+    where, params = _client_filter(client_ids)
+    last = start + timedelta(weeks=weeks - 1)
+    coverage = {}
+    for row in db.execute(f"""
+        SELECT client_id, week_start, posts, mask FROM client_week_coverage
+        WHERE week_start BETWEEN ? AND ? AND posts > 0{where}
+    """, (start.isoformat(), last.isoformat(), *params)).fetchall():
+        weeks_of = coverage.setdefault(row['client_id'], [{'posts': 0, 'mask': 0} for _ in range(weeks)])
+        index = (date.fromisoformat(row['week_start']) - start).days // 7
+        weeks_of[index] = {'posts': row['posts'], 'mask': row['mask']}
+    return coverage
+
+
+def pipelines(db, client_ids=None):
+    """Counts of unpublished posts per workflow status, as {client_id: {status: n}}."""
+    where, params = _client_filter(client_ids)
+    pipeline = {}
+    for row in db.execute(f"""
+        SELECT client_id, workflow_status, COUNT(*) AS c
+        FROM scheduled_posts
+        WHERE workflow_status IS NOT NULL AND workflow_status != '' AND workflow_status != 'posted'{where}
+        GROUP BY client_id, workflow_status
+    """, params).fetchall():
+        pipeline.setdefault(row['client_id'], {})[row['workflow_status']] = row['c']
+    return pipeline
+
+
+def accounts(db, client_ids=None):
+    """Platform and name of every account, as {client_id: [account, ...]}."""
+    where, params = _client_filter(client_ids)
+    by_client = {}
+    for row in db.execute(
+        f"SELECT client_id, platform, account_name FROM accounts WHERE 1=1{where} ORDER BY client_id, id", params
+    ).fetchall():
+        by_client.setdefault(row['client_id'], []).append({'platform': row['platform'],
+                                                           'account_name': row['account_name']})
+    return by_client
+
+
+def attach_overview(db, clients, today, all_clients=False):
+    """Add coverage, totals, pipeline and accounts to each client dict in place.
+
+    Pass all_clients=True when clients is the whole table, which skips the
+    client id filter.
+    """
+    client_ids = None if all_clients else [c['id'] for c in clients]
+    if client_ids == []:
+        return
+    coverage = weekly_coverage(db, week_start(today), 2, client_ids)
+    pipeline = pipelines(db, client_ids)
+    client_accounts = accounts(db, client_ids)
+
+    empty = [{'posts': 0, 'mask': 0}, {'posts': 0, 'mask': 0}]
+    for client in clients:
+        this_week, next_week = coverage.get(client['id'], empty)
+        client['this_week_coverage'] = bin(this_week['mask']).count('1')
+        client['next_week_coverage'] = bin(next_week['mask']).count('1')
+        client['this_week_total'] = this_week['posts']
+        client['next_week_total'] = next_week['posts']
+        client['pipeline'] = pipeline.get(client['id'], {})
+        client['accounts'] = client_accounts.get(client['id'], [])
@@ -0,0 +1,103 @@
+"""Monthly content requirements per client.
+
+client_content_requirements (migration 44) holds one row per requirement
+(content type, platforms, monthly count) and is the copy SQL reads:
+totals per assignee are a single aggregate over it joined to the clients'
+assigned_* columns. clients.content_requirements keeps the same list as
+JSON for the pages that render it; both are written together by
+replace_requirements().
+"""
+import json
+
+
+def parse(value):
+    """Requirements as a list of {'type', 'platforms', 'count'} dicts.
+
+    Accepts the JSON string the client forms send (or an already decoded
+    list). Entries without a type or with a non-positive count are dropped;
+    the older single 'platform' key is folded into 'platforms'.
+    """
+    if isinstance(value, str):
+        if not value.strip():
+            return []
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return []
+    if not isinstance(value, list):
+        return []
+
+    reqs = []
+    for r in value:
+        if not isinstance(r, dict) or not r.get('type'):
+            continue
+        try:
+            count = int(r.get('count') or 0)
+        except (TypeError, ValueError):
+            continue
+        if count <= 0:
+            continue
+        platforms = r.get('platforms') or ([r['platform']] if r.get('platform') else [])
+        if isinstance(platforms, str):
+            platforms = [p.strip() for p in platforms.split(',') if p.strip()]
+        reqs.append({'platforms': list(platforms), 'type': str(r['type']), 'count': count})
+    return reqs
+
+
+def replace_requirements(db, client_id, value):
+    """Replace a client's requirements in the table and the JSON column; returns the stored JSON.
+
+    The caller commits.
+    """
+    reqs = parse(value)
+    db.execute("DELETE FROM client_content_requirements WHERE client_id=?", (client_id,))
+    db.executemany(
+        "INSERT INTO client_content_requirements (client_id, position, content_type, platforms, monthly_count) "
+        "VALUES (?,?,?,?,?)",
+        [(client_id, i, r['type'], ','.join(r['platforms']), r['count']) for i, r in enumerate(reqs)]
+    )
+    stored = json.dumps(reqs) if reqs else ''
+    db.execute("UPDATE clients SET content_requirements=? WHERE id=?", (stored, client_id))
+    return stored
+
+
+def totals_by_user(db, roles):
+    """Monthly required items per user, for several assignee roles in one aggregate.
+
+    roles maps a name to (columns, types): the clients.assigned_* columns
+    that make a user responsible for a client, and the content types that
+    count (None for all). A user holding two of a role's columns on the
+    same client counts that client once. Returns {name: {user_id: count}}.
+    """
+    assignments, params, filters = [], [], []
+    for name, (columns, types) in roles.items():
+        assignments.extend(f"SELECT id AS client_id, {c} AS user_id, ? AS role FROM clients" for c in columns)
+        params.extend([name] * len(columns))
+        if types:
+            filters.append(f"(a.role = ? AND r.content_type IN ({','.join('?' * len(types))}))")
+        else:
+            filters.append("a.role = ?")
+    for name, (columns, types) in roles.items():
+        params.append(name)
+        params.extend(types or ())
+
+    totals = {name: {} for name in roles}
+    for row in db.execute(f"""
+        SELECT a.role, a.user_id, SUM(r.monthly_count) AS required
+        FROM ({' UNION '.join(assignments)}) a
+        JOIN client_content_requirements r ON r.client_id = a.client_id
+        WHERE a.user_id IS NOT NULL AND ({' OR '.join(filters)})
+        GROUP BY a.role, a.user_id
+    """, params).fetchall():
+        totals[row['role']][row['user_id']] = row['required']
+    return totals
+
+
+def total(db, types=None):
+    """Monthly required items over all clients."""
+    sql = "SELECT IFNULL(SUM(monthly_count), 0) FROM client_content_requirements"
+    params = []
+    if types:
+        sql += f" WHERE content_type IN ({','.join('?' * len(types))})"
+        params.extend(types)
+    return db.execute(sql, params).fetchone()[0]
@@ -1,10 +1,11 @@
-import requests
+from services import platform_http
+from services.platform_http import GRAPH_API_BASE
 
 
 def post_image(access_token, page_id, image_url, caption=''):
     """Post an image to a Facebook page."""
-    url = f"https://graph.facebook.com/v18.0/{page_id}/photos"
-    resp = requests.post(url, data={
+    url = f"{GRAPH_API_BASE}/{page_id}/photos"
+    resp = platform_http.post(url, account=page_id, data={
         'url': image_url,
         'message': caption,
         'access_token': access_token
@@ -17,8 +18,8 @@ def post_image(access_token, page_id, image_url, caption=''):
 
 def post_text(access_token, page_id, text):
     """Post text to a Facebook page."""
-    url = f"https://graph.facebook.com/v18.0/{page_id}/feed"
-    resp = requests.post(url, data={
+    url = f"{GRAPH_API_BASE}/{page_id}/feed"
+    resp = platform_http.post(url, account=page_id, data={
         'message': text,
         'access_token': access_token
     }, timeout=30)
@@ -30,8 +31,8 @@ def post_text(access_token, page_id, text):
 
 def post_video(access_token, page_id, video_url, caption=''):
     """Post a video to a Facebook page."""
-    url = f"https://graph.facebook.com/v18.0/{page_id}/videos"
-    resp = requests.post(url, data={
+    url = f"{GRAPH_API_BASE}/{page_id}/videos"
+    resp = platform_http.post(url, account=page_id, data={
         'file_url': video_url,
         'description': caption,
         'access_token': access_token
@@ -44,10 +45,10 @@ def post_video(access_token, page_id, video_url, caption=''):
 
 def post_story(access_token, page_id, image_url):
     """Post a story (photo) to a Facebook page."""
-    url = f"https://graph.facebook.com/v18.0/{page_id}/photo_stories"
+    url = f"{GRAPH_API_BASE}/{page_id}/photo_stories"
     # First upload the photo
-    photo_url = f"https://graph.facebook.com/v18.0/{page_id}/photos"
-    photo_resp = requests.post(photo_url, data={
+    photo_url = f"{GRAPH_API_BASE}/{page_id}/photos"
+    photo_resp = platform_http.post(photo_url, account=page_id, data={
         'url': image_url,
         'published': 'false',
         'access_token': access_token
@@ -56,7 +57,7 @@ def post_story(access_token, page_id, image_url):
     if 'id' not in photo_data:
         return {'success': False, 'error': 'Failed to upload story photo'}
 
-    story_resp = requests.post(url, data={
+    story_resp = platform_http.post(url, account=page_id, data={
         'photo_id': photo_data['id'],
         'access_token': access_token
     }, timeout=30)
@@ -70,8 +71,8 @@ def post_multiple_images(access_token, page_id, image_urls, caption=''):
     """Post multiple images to a Facebook page as a single post."""
     photo_ids = []
     for img_url in image_urls:
-        url = f"https://graph.facebook.com/v18.0/{page_id}/photos"
-        resp = requests.post(url, data={
+        url = f"{GRAPH_API_BASE}/{page_id}/photos"
+        resp = platform_http.post(url, account=page_id, data={
             'url': img_url,
             'published': 'false',
             'access_token': access_token
@@ -83,12 +84,12 @@ def post_multiple_images(access_token, page_id, image_urls, caption=''):
     if not photo_ids:
         return {'success': False, 'error': 'No photos uploaded'}
 
-    feed_url = f"https://graph.facebook.com/v18.0/{page_id}/feed"
+    feed_url = f"{GRAPH_API_BASE}/{page_id}/feed"
     post_data = {'message': caption, 'access_token': access_token}
     for i, pid in enumerate(photo_ids):
         post_data[f'attached_media[{i}]'] = f'{{"media_fbid":"{pid}"}}'
 
-    resp = requests.post(feed_url, data=post_data, timeout=30)
+    resp = platform_http.post(feed_url, account=page_id, data=post_data, timeout=30)
     data = resp.json()
     if 'id' in data:
         return {'success': True, 'post_id': data['id'], 'type': 'carousel'}
@@ -0,0 +1,73 @@
+"""Compressed cold storage for raw platform insight responses.
+
+The full API response behind each post_insights row is kept zlib-compressed
+in post_insight_payloads, keyed by (post_id, platform). A payload is only
+rewritten when its content hash changes, and it is only read when a caller
+explicitly asks for it, so the hot insights table stays small.
+"""
+import hashlib
+import json
+import zlib
+from models import get_db
+
+COMPRESSION_LEVEL = 6
+
+
+def content_hash(raw):
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def store(db, payloads):
+    """Write changed payloads; payloads is a list of (post_id, platform, raw_json). Caller commits.
+
+    Returns how many payloads were actually written.
+    """
+    payloads = [(post_id, platform, raw) for post_id, platform, raw in payloads if raw and raw != '{}']
+    if not payloads:
+        return 0
+
+    post_ids = sorted({p[0] for p in payloads})
+    placeholders = ','.join('?' * len(post_ids))
+    current = {
+        (row['post_id'], row['platform']): row['content_hash']
+        for row in db.execute(
+            f"SELECT post_id, platform, content_hash FROM post_insight_payloads WHERE post_id IN ({placeholders})",
+            post_ids
+        ).fetchall()
+    }
+
+    changed = []
+    for post_id, platform, raw in payloads:
+        digest = content_hash(raw)
+        if current.get((post_id, platform)) == digest:
+            continue
+        changed.append((post_id, platform, digest, zlib.compress(raw.encode(), COMPRESSION_LEVEL), len(raw)))
+
+    db.executemany("""
+        INSERT INTO post_insight_payloads (post_id, platform, content_hash, payload, raw_size, updated_at)
+        VALUES (?,?,?,?,?, datetime('now'))
+        ON CONFLICT(post_id, platform) DO UPDATE SET
+            content_hash=excluded.content_hash, payload=excluded.payload,
+            raw_size=excluded.raw_size, updated_at=excluded.updated_at
+    """, changed)
+    return len(changed)
+
+
+def load(post_id, platform=None):
+    """Decompressed payloads for a post as {platform: parsed JSON}."""
+    db = get_db()
+    sql = "SELECT platform, payload FROM post_insight_payloads WHERE post_id=?"
+    params = [post_id]
+    if platform:
+        sql += " AND platform=?"
+        params.append(platform)
+    rows = db.execute(sql, params).fetchall()
+    db.close()
+    payloads = {}
+    for row in rows:
+        raw = zlib.decompress(row['payload']).decode()
+        try:
+            payloads[row['platform']] = json.loads(raw)
+        except ValueError:
+            payloads[row['platform']] = raw
+    return payloads
@@ -0,0 +1,265 @@
+"""Age-tiered, incremental refresh planning for post insights.
+
+Each published (post, platform) has a row in insight_refresh_schedule with
+the time its metrics should next be fetched. The interval depends on the
+post's age (hourly on day one, every 6 hours for the first week, daily
+after that) and is stretched while metrics stay flat or tightened while
+they are moving fast. Rows stop being refreshed MAX_AGE_DAYS after
+publishing. Due rows are read from the next_fetch_at index, so a refresh
+run only touches what is due.
+
+Stories (post_type 'story' or *_story platforms) lose their metrics about
+STORY_LIFETIME_MINUTES after publishing, so they follow a fixed capture
+plan instead: STORY_CAPTURE_MINUTES after publishing, then a final capture
+STORY_FINAL_MARGIN_MINUTES before expiry. refresh_due_stories() runs every
+few minutes off the publish-time index on story rows.
+"""
+import os
+from datetime import datetime, timedelta
+from models import get_db, dicts_from_rows
+
+# (post age in hours below which the tier applies, refresh interval in minutes)
+REFRESH_TIERS = [
+    (24, 60),
+    (24 * 7, 6 * 60),
+]
+DEFAULT_INTERVAL_MINUTES = 24 * 60
+MIN_INTERVAL_MINUTES = 30
+
+MAX_AGE_DAYS = int(os.getenv('INSIGHTS_REFRESH_MAX_AGE_DAYS', 30))
+
+# Relative change in metrics since the previous fetch below which a post is
+# considered flat, and above which it is considered hot.
+STABLE_CHANGE = 0.02
+HOT_CHANGE = 0.25
+# A flat post's interval may grow up to this multiple of its tier interval.
+MAX_STRETCH = 4
+
+# Retry delays after failed fetches; rows stop after the last one fails.
+FAILURE_RETRY_MINUTES = [15, 60, 240, 720]
+
+# Due rows claimed at a time, and how long a claim holds them. Runs over
+# more rows than this claim and fetch them one batch after another, so a
+# claim never has to outlast more than one batch.
+REFRESH_BATCH = int(os.getenv('INSIGHTS_REFRESH_BATCH', 200))
+CLAIM_MINUTES = 15
+
+REFRESHABLE_PLATFORMS = ('instagram', 'facebook', 'linkedin')
+
+# Story metrics are gone once the story expires. Captures happen at these
+# ages (minutes) plus a final one STORY_FINAL_MARGIN_MINUTES before expiry;
+# a failed capture is retried every STORY_RETRY_MINUTES until then.
+STORY_LIFETIME_MINUTES = 24 * 60
+STORY_CAPTURE_MINUTES = [60, 4 * 60, 8 * 60, 16 * 60]
+STORY_FINAL_MARGIN_MINUTES = int(os.getenv('STORY_FINAL_MARGIN_MINUTES', 20))
+STORY_RETRY_MINUTES = 5
+STORY_CLAIM_MINUTES = 5
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _ts(dt):
+    return dt.strftime(_TS_FORMAT) if dt else None
+
+
+def _parse_ts(value):
+    try:
+        return datetime.strptime((value or '')[:19].replace('T', ' '), _TS_FORMAT)
+    except ValueError:
+        return datetime.utcnow()
+
+
+def tier_interval(age_hours):
+    for max_age_hours, minutes in REFRESH_TIERS:
+        if age_hours < max_age_hours:
+            return minutes
+    return DEFAULT_INTERVAL_MINUTES
+
+
+def engagement_total(data):
+    """Single number summarizing a fetch, used to detect whether metrics moved."""
+    return sum(int(data.get(k, 0) or 0) for k in ('impressions', 'likes', 'comments', 'shares', 'saves'))
+
+
+def plan_next_fetch(published_at, now, previous=None, current=None, previous_interval=None):
+    """Return (next_fetch_at, interval_minutes); next_fetch_at is None once the post is too old.
+
+    previous/current are engagement totals of the last two fetches; with
+    both present the tier interval is stretched for flat posts and
+    tightened for fast-moving ones.
+    """
+    cutoff = published_at + timedelta(days=MAX_AGE_DAYS)
+    if now >= cutoff:
+        return None, 0
+
+    base = tier_interval((now - published_at).total_seconds() / 3600)
+    interval = base
+    if previous is not None and current is not None:
+        change = abs(current - previous) / max(previous, 1)
+        if change < STABLE_CHANGE:
+            interval = min(max((previous_interval or base) * 2, base), base * MAX_STRETCH)
+        elif change > HOT_CHANGE:
+            interval = max(base // 2, MIN_INTERVAL_MINUTES)
+
+    return min(now + timedelta(minutes=interval), cutoff), interval
+
+
+def story_expires_at(published_at):
+    return published_at + timedelta(minutes=STORY_LIFETIME_MINUTES)
+
+
+def plan_story_fetch(published_at, now):
+    """Next capture time for a story, or None once the final capture has been taken."""
+    final = story_expires_at(published_at) - timedelta(minutes=STORY_FINAL_MARGIN_MINUTES)
+    for minutes in STORY_CAPTURE_MINUTES:
+        capture = published_at + timedelta(minutes=minutes)
+        if capture > now and capture < final:
+            return capture
+    return final if final > now else None
+
+
+def base_platform(platform):
+    return (platform or '').strip().replace('_story', '').replace('_reel', '')
+
+
+def enqueue(db, post_id, platform, published_at=None, is_story=False):
+    """Start refreshing a newly published (post, platform). Caller commits."""
+    platform = (platform or '').strip()
+    if base_platform(platform) not in REFRESHABLE_PLATFORMS:
+        return
+    is_story = is_story or platform.endswith('_story')
+    published_at = published_at or datetime.utcnow()
+    if is_story:
+        first_fetch, interval = plan_story_fetch(published_at, published_at), 0
+    else:
+        first_fetch, interval = published_at + timedelta(minutes=REFRESH_TIERS[0][1]), REFRESH_TIERS[0][1]
+    db.execute(
+        """INSERT OR IGNORE INTO insight_refresh_schedule
+               (post_id, platform, published_at, next_fetch_at, interval_minutes, is_story)
+           VALUES (?,?,?,?,?,?)""",
+        (post_id, platform, _ts(published_at), _ts(first_fetch), interval, 1 if is_story else 0)
+    )
+
+
+def _claim_due(limit, stories_only=False):
+    """Read due rows and push their next_fetch_at out so concurrent runs skip them."""
+    now = datetime.utcnow()
+    db = get_db()
+    db.execute("BEGIN IMMEDIATE")
+    sql = """SELECT post_id, platform, published_at, last_fetched_at, last_engagement,
+                    interval_minutes, failures, is_story
+             FROM insight_refresh_schedule"""
+    if stories_only:
+        # Live stories only, read through the partial publish-time index
+        sql += """ INDEXED BY idx_insight_refresh_stories
+             WHERE is_story = 1 AND published_at >= ?
+               AND next_fetch_at IS NOT NULL AND next_fetch_at <= ?"""
+        params = [_ts(now - timedelta(minutes=STORY_LIFETIME_MINUTES)), _ts(now)]
+    else:
+        sql += """
+             WHERE next_fetch_at IS NOT NULL AND next_fetch_at <= ?"""
+        params = [_ts(now)]
+    sql += " ORDER BY next_fetch_at"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    due = dicts_from_rows(db.execute(sql, params).fetchall())
+    claim_minutes = STORY_CLAIM_MINUTES if stories_only else CLAIM_MINUTES
+    claim_until = _ts(now + timedelta(minutes=claim_minutes))
+    db.executemany(
+        "UPDATE insight_refresh_schedule SET next_fetch_at=? WHERE post_id=? AND platform=?",
+        [(claim_until, row['post_id'], row['platform']) for row in due]
+    )
+    db.commit()
+    db.close()
+    return due
+
+
+def _story_retry(published_at, now):
+    """Retry time for a failed story capture, or None when the story is gone."""
+    retry_at = now + timedelta(minutes=STORY_RETRY_MINUTES)
+    return retry_at if retry_at < story_expires_at(published_at) else None
+
+
+def refresh_due_insights(limit=REFRESH_BATCH, progress=None, stories_only=False):
+    """Fetch insights for every (post, platform) whose refresh is due.
+
+    Returns counts of fetched, failed and retired rows. Pass limit=None to
+    take everything that is due. Rows are claimed REFRESH_BATCH at a time;
+    the progress total grows as each batch is claimed.
+    """
+    summary = {'due': 0, 'fetched': 0, 'failed': 0, 'retired': 0}
+    total = 0
+    while True:
+        size = REFRESH_BATCH if limit is None else min(REFRESH_BATCH, limit - summary['due'])
+        due = _claim_due(size, stories_only)
+        if due:
+            total += len({row['post_id'] for row in due})
+            if progress:
+                progress.set_total(total)
+            _refresh_claimed(due, progress, summary)
+        if len(due) < size or (limit is not None and summary['due'] >= limit):
+            break
+    if progress and not total:
+        progress.set_total(0)
+    return summary
+
+
+def _refresh_claimed(due, progress, summary):
+    """Fetch claimed rows, plan their next fetch and add the outcome to summary."""
+    from services.insights import _sync
+
+    summary['due'] += len(due)
+    post_ids = sorted({row['post_id'] for row in due})
+    results, _ = _sync(post_ids, progress, only={(row['post_id'], row['platform']) for row in due})
+
+    now = datetime.utcnow()
+    updates = []
+    for row in due:
+        data = results.get(row['post_id'], {}).get(row['platform'])
+        published_at = _parse_ts(row['published_at'])
+        if data is None:
+            # Nothing left to fetch (publish record or external id gone)
+            updates.append((None, row['last_fetched_at'], row['last_engagement'],
+                            row['interval_minutes'], row['failures'], row['post_id'], row['platform']))
+            summary['retired'] += 1
+        elif data.get('success'):
+            current = engagement_total(data)
+            if row['is_story']:
+                next_at, interval = plan_story_fetch(published_at, now), 0
+            else:
+                previous = row['last_engagement'] if row['last_fetched_at'] else None
+                next_at, interval = plan_next_fetch(published_at, now, previous, current, row['interval_minutes'])
+            updates.append((_ts(next_at), _ts(now), current, interval, 0, row['post_id'], row['platform']))
+            summary['fetched'] += 1
+            if next_at is None:
+                summary['retired'] += 1
+        else:
+            failures = (row['failures'] or 0) + 1
+            next_at = None
+            if row['is_story']:
+                next_at = _story_retry(published_at, now)
+            elif failures <= len(FAILURE_RETRY_MINUTES):
+                next_at = now + timedelta(minutes=FAILURE_RETRY_MINUTES[failures - 1])
+                if next_at >= published_at + timedelta(days=MAX_AGE_DAYS):
+                    next_at = None
+            updates.append((_ts(next_at), row['last_fetched_at'], row['last_engagement'],
+                            row['interval_minutes'], failures, row['post_id'], row['platform']))
+            summary['failed'] += 1
+            if next_at is None:
+                summary['retired'] += 1
+
+    db = get_db()
+    db.executemany(
+        """UPDATE insight_refresh_schedule
+           SET next_fetch_at=?, last_fetched_at=?, last_engagement=?, interval_minutes=?, failures=?
+           WHERE post_id=? AND platform=?""",
+        updates
+    )
+    db.commit()
+    db.close()
+
+
+def refresh_due_stories():
+    """Capture every live story whose next capture is due; run every few minutes."""
+    return refresh_due_insights(limit=None, stories_only=True)
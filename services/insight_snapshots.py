@@ -0,0 +1,143 @@
+"""Time series of post insights.
+
+Every successful fetch appends a row to post_insight_snapshots (post_insights
+keeps only the latest values). Rows carry the post's age at capture time so
+analytics can ask for a metric "at 24 hours" across many posts.
+
+compact() keeps raw snapshots for RAW_RETENTION_DAYS, then downsamples to one
+per hour of post age, and after HOURLY_RETENTION_DAYS to one per day. The
+metrics are cumulative counters, so the last snapshot in a bucket stands for
+the whole bucket.
+"""
+from datetime import datetime, timedelta
+from models import get_db
+
+METRICS = ('impressions', 'reach', 'likes', 'comments', 'shares', 'saves', 'clicks', 'video_views',
+           'engagement_bp')
+
+RAW_RETENTION_DAYS = 7
+HOURLY_RETENTION_DAYS = 90
+
+HOURLY = 60
+DAILY = 1440
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def snapshot_row(post_id, platform, published_at, data, captured_at):
+    """Build the insert tuple for one fetch result."""
+    try:
+        published = datetime.strptime((published_at or '')[:19].replace('T', ' '), _TS_FORMAT)
+    except ValueError:
+        published = captured_at
+    age_minutes = max(0, int((captured_at - published).total_seconds() // 60))
+    return (
+        post_id, platform, captured_at.strftime(_TS_FORMAT), age_minutes,
+        int(data.get('impressions', 0) or 0), int(data.get('reach', 0) or 0),
+        int(data.get('likes', 0) or 0), int(data.get('comments', 0) or 0),
+        int(data.get('shares', 0) or 0), int(data.get('saves', 0) or 0),
+        int(data.get('clicks', 0) or 0), int(data.get('video_views', 0) or 0),
+        int(round((data.get('engagement_rate', 0) or 0) * 100)),
+    )
+
+
+def record(db, rows):
+    """Append snapshot rows built by snapshot_row. Caller commits."""
+    if rows:
+        db.executemany("""
+            INSERT INTO post_insight_snapshots (post_id, platform, captured_at, age_minutes,
+                impressions, reach, likes, comments, shares, saves, clicks, video_views, engagement_bp)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """, rows)
+
+
+def _downsample(db, resolution, older_than):
+    """Keep the last snapshot per (post, platform, age bucket) among rows captured before older_than."""
+    cutoff = older_than.strftime(_TS_FORMAT)
+    deleted = db.execute("""
+        DELETE FROM post_insight_snapshots
+        WHERE resolution_minutes <= ? AND captured_at < ?
+          AND id NOT IN (
+              SELECT MAX(id) FROM post_insight_snapshots
+              WHERE resolution_minutes <= ? AND captured_at < ?
+              GROUP BY post_id, platform, age_minutes / ?
+          )
+    """, (resolution, cutoff, resolution, cutoff, resolution)).rowcount
+    db.execute(
+        "UPDATE post_insight_snapshots SET resolution_minutes=? WHERE resolution_minutes < ? AND captured_at < ?",
+        (resolution, resolution, cutoff)
+    )
+    return deleted
+
+
+def compact():
+    """Downsample old snapshots; returns how many rows were removed at each step."""
+    now = datetime.utcnow()
+    db = get_db()
+    hourly = _downsample(db, HOURLY, now - timedelta(days=RAW_RETENTION_DAYS))
+    daily = _downsample(db, DAILY, now - timedelta(days=HOURLY_RETENTION_DAYS))
+    db.commit()
+    db.close()
+    return {'hourly': hourly, 'daily': daily}
+
+
+def metric_at_age(metric, age_hours, platform=None, client_id=None, tolerance=0.25):
+    """Value of metric for each (post, platform) at the given post age.
+
+    Uses the latest snapshot taken at or before that age, provided it was
+    taken no earlier than (1 - tolerance) of the age, so a 2-hour reading
+    does not stand in for a 24-hour one. Returns a list of
+    {'post_id', 'platform', 'age_minutes', 'value'}.
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Unknown metric: {metric}')
+    target = int(age_hours * 60)
+    params = [int(target * (1 - tolerance)), target]
+    filters = ''
+    if platform:
+        filters += ' AND platform = ?'
+        params.append(platform)
+    if client_id:
+        filters += ' AND post_id IN (SELECT id FROM scheduled_posts WHERE client_id = ?)'
+        params.append(client_id)
+
+    db = get_db()
+    rows = db.execute(f"""
+        SELECT s.post_id, s.platform, s.age_minutes, MAX(s.{metric}) AS value
+        FROM (
+            SELECT post_id, platform, MAX(age_minutes) AS age_minutes
+            FROM post_insight_snapshots
+            WHERE age_minutes BETWEEN ? AND ?{filters}
+            GROUP BY post_id, platform
+        ) m
+        JOIN post_insight_snapshots s
+          ON s.post_id = m.post_id AND s.platform = m.platform AND s.age_minutes = m.age_minutes
+        GROUP BY s.post_id, s.platform
+    """, params).fetchall()
+    db.close()
+    return [dict(r) for r in rows]
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 1)
+
+
+def cohort_curve(metric, ages_hours=(1, 6, 24, 72, 168), platform=None, client_id=None):
+    """Distribution of metric across posts at each age, for engagement-curve charts."""
+    curve = []
+    for age in ages_hours:
+        values = sorted(r['value'] for r in metric_at_age(metric, age, platform, client_id))
+        curve.append({
+            'age_hours': age,
+            'posts': len(values),
+            'avg': round(sum(values) / len(values), 1) if values else 0,
+            'p25': _percentile(values, 25),
+            'median': _percentile(values, 50),
+            'p75': _percentile(values, 75),
+        })
+    return curve
@@ -1,16 +1,33 @@
 """Fetch real engagement metrics from social media platform APIs."""
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
 import requests
-from models import get_db, dict_from_row, dicts_from_rows
+from models import get_db, dicts_from_rows
+from services import platform_http, insight_payloads, insight_snapshots
+from services.insight_refresh import base_platform
+from services.platform_http import GRAPH_API_BASE, LINKEDIN_API_BASE, token_key
+from services.rate_limiter import PRIORITY_BACKGROUND
+
+# Concurrent platform fetches during a sync, overall and per page / member token
+SYNC_WORKERS = int(os.getenv('INSIGHTS_SYNC_WORKERS', 8))
+SYNC_PER_ACCOUNT = int(os.getenv('INSIGHTS_SYNC_PER_ACCOUNT', 2))
+
+# post_insights rows written per transaction
+SYNC_BATCH_SIZE = 50
 
 
-def fetch_instagram_insights(access_token, media_id):
+def fetch_instagram_insights(access_token, media_id, account_key=None):
     """Fetch insights for an Instagram media post using the Graph API."""
+    account = account_key or token_key(access_token)
     try:
         # Get basic media metrics
-        url = f"https://graph.facebook.com/v18.0/{media_id}"
-        resp = requests.get(url, params={
-            'fields': 'like_count,comments_count,timestamp,media_type',
+        url = f"{GRAPH_API_BASE}/{media_id}"
+        resp = platform_http.get(url, account=account, priority=PRIORITY_BACKGROUND, params={
+            'fields': 'like_count,comments_count,timestamp,media_type,media_product_type',
             'access_token': access_token
         }, timeout=15)
         data = resp.json()
@@ -24,13 +41,16 @@ def fetch_instagram_insights(access_token, media_id):
         }
 
         # Get detailed insights (impressions, reach, saved, shares)
-        insights_url = f"https://graph.facebook.com/v18.0/{media_id}/insights"
+        insights_url = f"{GRAPH_API_BASE}/{media_id}/insights"
         metrics = 'impressions,reach,saved,shares'
         media_type = data.get('media_type', '')
-        if media_type in ('VIDEO', 'REELS'):
+        if data.get('media_product_type') == 'STORY':
+            # Stories have no saves or shares; replies stand in for comments
+            metrics = 'impressions,reach,replies'
+        elif media_type in ('VIDEO', 'REELS'):
             metrics += ',plays,video_views'
 
-        insights_resp = requests.get(insights_url, params={
+        insights_resp = platform_http.get(insights_url, account=account, priority=PRIORITY_BACKGROUND, params={
             'metric': metrics,
             'access_token': access_token
         }, timeout=15)
@@ -50,6 +70,8 @@ def fetch_instagram_insights(access_token, media_id):
                     result['shares'] = value
                 elif name in ('plays', 'video_views'):
                     result['video_views'] = value
+                elif name == 'replies':
+                    result['comments'] = value
 
         # Calculate engagement rate
         reach = result.get('reach', 0) or result.get('impressions', 0)
@@ -65,12 +87,13 @@ def fetch_instagram_insights(access_token, media_id):
         return {'success': False, 'error': str(e)}
 
 
-def fetch_facebook_insights(access_token, post_id):
+def fetch_facebook_insights(access_token, post_id, account_key=None):
     """Fetch insights for a Facebook page post."""
+    account = account_key or token_key(access_token)
     try:
         # Get post metrics
-        url = f"https://graph.facebook.com/v18.0/{post_id}"
-        resp = requests.get(url, params={
+        url = f"{GRAPH_API_BASE}/{post_id}"
+        resp = platform_http.get(url, account=account, priority=PRIORITY_BACKGROUND, params={
             'fields': 'shares,likes.summary(true),comments.summary(true),insights.metric(post_impressions,post_impressions_unique,post_clicks,post_reactions_by_type_total)',
             'access_token': access_token
         }, timeout=15)
@@ -111,13 +134,14 @@ def fetch_facebook_insights(access_token, post_id):
         return {'success': False, 'error': str(e)}
 
 
-def fetch_linkedin_insights(access_token, post_urn):
+def fetch_linkedin_insights(access_token, post_urn, account_key=None):
     """Fetch insights for a LinkedIn post."""
+    account = account_key or token_key(access_token)
     try:
         # LinkedIn social actions (likes, comments)
         encoded_urn = requests.utils.quote(post_urn, safe='')
-        stats_url = f"https://api.linkedin.com/v2/socialActions/{encoded_urn}"
-        resp = requests.get(stats_url, headers={
+        stats_url = f"{LINKEDIN_API_BASE}/socialActions/{encoded_urn}"
+        resp = platform_http.get(stats_url, account=account, priority=PRIORITY_BACKGROUND, headers={
             'Authorization': f'Bearer {access_token}',
             'X-Restli-Protocol-Version': '2.0.0'
         }, timeout=15)
@@ -130,8 +154,8 @@ def fetch_linkedin_insights(access_token, post_urn):
             result['comments'] = data.get('commentsSummary', {}).get('totalFirstLevelComments', 0)
 
         # Try to get share statistics
-        share_url = f"https://api.linkedin.com/v2/organizationalEntityShareStatistics?q=organizationalEntity&shares[0]={post_urn}"
-        share_resp = requests.get(share_url, headers={
+        share_url = f"{LINKEDIN_API_BASE}/organizationalEntityShareStatistics?q=organizationalEntity&shares[0]={post_urn}"
+        share_resp = platform_http.get(share_url, account=account, priority=PRIORITY_BACKGROUND, headers={
             'Authorization': f'Bearer {access_token}',
             'X-Restli-Protocol-Version': '2.0.0'
         }, timeout=15)
@@ -153,110 +177,187 @@ def fetch_linkedin_insights(access_token, post_urn):
         return {'success': False, 'error': str(e)}
 
 
-def sync_post_insights(post_id):
-    """Fetch and store insights for a specific post from all its platforms."""
+def _fetch_insights(target):
+    """Fetch one platform's metrics for one published post."""
+    platform = base_platform(target['platform'])
+    token = target['access_token']
+    external_id = target['external_id']
+    # Graph budgets are tracked per page/IG account; LinkedIn per member token
+    if platform == 'instagram':
+        return fetch_instagram_insights(token, external_id, target['account_key'])
+    elif platform == 'facebook':
+        return fetch_facebook_insights(token, external_id, target['account_key'])
+    elif platform == 'linkedin':
+        return fetch_linkedin_insights(token, external_id)
+    return {'success': False, 'error': f'Unsupported platform: {platform}'}
+
+
+def _sync_targets(db, post_ids, only=None):
+    """One work item per platform each post was successfully published to.
+
+    only optionally restricts the items to a set of (post_id, platform) pairs.
+    """
+    targets = {}
+    for i in range(0, len(post_ids), 500):
+        chunk = post_ids[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        logs = dicts_from_rows(db.execute(f"""
+            SELECT pl.post_id, TRIM(pl.platform) AS platform, pl.external_post_id, pl.posted_at,
+                   a.access_token, a.account_id
+            FROM post_logs pl
+            JOIN scheduled_posts sp ON sp.id = pl.post_id
+            LEFT JOIN accounts a ON a.id = (
+                SELECT id FROM accounts
+                WHERE client_id = sp.client_id AND is_active = 1
+                  AND platform = REPLACE(REPLACE(TRIM(pl.platform), '_story', ''), '_reel', '')
+                ORDER BY id LIMIT 1
+            )
+            WHERE pl.post_id IN ({placeholders}) AND pl.status = 'success' AND pl.external_post_id != ''
+            ORDER BY pl.id
+        """, chunk).fetchall())
+
+        for log in logs:
+            key = (log['post_id'], log['platform'])
+            if only is not None and key not in only:
+                continue
+            targets[key] = {
+                'post_id': log['post_id'],
+                'published_at': targets[key]['published_at'] if key in targets else log.get('posted_at'),
+                'platform': log['platform'],
+                'external_id': log['external_post_id'],
+                'access_token': log.get('access_token'),
+                'account_key': log.get('account_id') or None,
+            }
+    return list(targets.values())
+
+
+_UPSERT_INSIGHTS_SQL = """
+    INSERT INTO post_insights (post_id, platform, external_post_id, impressions, reach,
+        likes, comments, shares, saves, clicks, engagement_rate, video_views, fetched_at)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?, datetime('now'))
+    ON CONFLICT(post_id, platform) DO UPDATE SET
+        impressions=excluded.impressions, reach=excluded.reach,
+        likes=excluded.likes, comments=excluded.comments,
+        shares=excluded.shares, saves=excluded.saves,
+        clicks=excluded.clicks, engagement_rate=excluded.engagement_rate,
+        video_views=excluded.video_views,
+        fetched_at=datetime('now')
+"""
+
+
+def _insight_row(target, data):
+    return (
+        target['post_id'], target['platform'], target['external_id'],
+        data.get('impressions', 0), data.get('reach', 0),
+        data.get('likes', 0), data.get('comments', 0),
+        data.get('shares', 0), data.get('saves', 0),
+        data.get('clicks', 0), data.get('engagement_rate', 0),
+        data.get('video_views', 0)
+    )
+
+
+def _sync(post_ids, progress=None, only=None):
+    """Fetch and store insights for many posts with bounded concurrency.
+
+    Platform calls run on SYNC_WORKERS threads, with at most SYNC_PER_ACCOUNT
+    in flight per page / member token. Results are written from this thread
+    in batches of SYNC_BATCH_SIZE rows per transaction, each row updating
+    post_insights, appending to post_insight_snapshots and, if the raw
+    response changed, rewriting its compressed payload. Returns the
+    per-post platform results and summary counts.
+    """
     db = get_db()
-
-    # Get the post and its log entries (which have the external post IDs)
-    post = dict_from_row(db.execute(
-        "SELECT sp.*, c.name as client_name FROM scheduled_posts sp LEFT JOIN clients c ON sp.client_id = c.id WHERE sp.id=?",
-        (post_id,)
-    ).fetchone())
-
-    if not post:
-        db.close()
-        return {'success': False, 'error': 'Post not found'}
-
-    logs = dicts_from_rows(db.execute(
-        "SELECT * FROM post_logs WHERE post_id=? AND status='success'",
-        (post_id,)
-    ).fetchall())
-
-    results = {}
-    for log in logs:
-        platform = log.get('platform', '').strip()
-        response_str = log.get('response', '{}')
-
-        # Extract external post_id from response
-        try:
-            resp_data = eval(response_str) if response_str.startswith('{') else {}
-        except Exception:
-            resp_data = {}
-
-        external_id = log.get('external_post_id') or resp_data.get('post_id', '')
-        if not external_id:
-            continue
-
-        # Get account token
-        account = None
-        if post.get('client_id'):
-            account = dict_from_row(db.execute(
-                "SELECT * FROM accounts WHERE client_id=? AND platform=? AND is_active=1",
-                (post['client_id'], platform)
-            ).fetchone())
-
-        if not account or not account.get('access_token'):
-            results[platform] = {'success': False, 'error': 'No token'}
-            continue
-
-        token = account['access_token']
-
-        # Fetch from the right platform
-        if platform == 'instagram':
-            data = fetch_instagram_insights(token, external_id)
-        elif platform == 'facebook':
-            data = fetch_facebook_insights(token, external_id)
-        elif platform == 'linkedin':
-            data = fetch_linkedin_insights(token, external_id)
+    targets = _sync_targets(db, post_ids, only)
+
+    results = {post_id: {} for post_id in post_ids}
+    remaining = {post_id: 0 for post_id in post_ids}
+    for target in targets:
+        remaining[target['post_id']] += 1
+    summary = {'synced': 0, 'failed': 0, 'skipped': 0, 'total': len(post_ids)}
+
+    def _post_done(post_id):
+        platform_results = results[post_id].values()
+        if not platform_results:
+            summary['skipped'] += 1
+            if progress:
+                progress.advance(skipped=1)
+        elif all(r.get('success') for r in platform_results):
+            summary['synced'] += 1
+            if progress:
+                progress.advance(succeeded=1)
         else:
-            data = {'success': False, 'error': f'Unsupported platform: {platform}'}
-
-        if data.get('success'):
-            # Upsert into post_insights
-            db.execute("""
-                INSERT INTO post_insights (post_id, platform, external_post_id, impressions, reach,
-                    likes, comments, shares, saves, clicks, engagement_rate, video_views, raw_data, fetched_at)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?, datetime('now'))
-                ON CONFLICT(post_id, platform) DO UPDATE SET
-                    impressions=excluded.impressions, reach=excluded.reach,
-                    likes=excluded.likes, comments=excluded.comments,
-                    shares=excluded.shares, saves=excluded.saves,
-                    clicks=excluded.clicks, engagement_rate=excluded.engagement_rate,
-                    video_views=excluded.video_views, raw_data=excluded.raw_data,
-                    fetched_at=datetime('now')
-            """, (
-                post_id, platform, external_id,
-                data.get('impressions', 0), data.get('reach', 0),
-                data.get('likes', 0), data.get('comments', 0),
-                data.get('shares', 0), data.get('saves', 0),
-                data.get('clicks', 0), data.get('engagement_rate', 0),
-                data.get('video_views', 0), data.get('raw_data', '{}')
-            ))
-            db.commit()
-
-        results[platform] = data
-
+            summary['failed'] += 1
+            if progress:
+                progress.advance(failed=1)
+
+    for post_id, count in remaining.items():
+        if count == 0:
+            _post_done(post_id)
+
+    account_slots = {}
+    for target in targets:
+        key = (target['platform'], target['account_key'] or token_key(target['access_token']))
+        target['slot'] = account_slots.setdefault(key, threading.Semaphore(SYNC_PER_ACCOUNT))
+
+    def _run(target):
+        if not target['access_token']:
+            return target, {'success': False, 'error': 'No token'}
+        with target['slot']:
+            try:
+                return target, _fetch_insights(target)
+            except Exception as e:
+                return target, {'success': False, 'error': str(e)}
+
+    def _write(batch):
+        captured_at = datetime.utcnow()
+        db.executemany(_UPSERT_INSIGHTS_SQL, [_insight_row(t, d) for t, d in batch])
+        insight_payloads.store(db, [(t['post_id'], t['platform'], d.get('raw_data')) for t, d in batch])
+        insight_snapshots.record(db, [
+            insight_snapshots.snapshot_row(t['post_id'], t['platform'], t['published_at'], d, captured_at)
+            for t, d in batch
+        ])
+        db.commit()
+
+    batch = []
+    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as pool:
+        for future in as_completed([pool.submit(_run, t) for t in targets]):
+            target, data = future.result()
+            post_id = target['post_id']
+            results[post_id][target['platform']] = data
+            if data.get('success'):
+                batch.append((target, data))
+                if len(batch) >= SYNC_BATCH_SIZE:
+                    _write(batch)
+                    batch = []
+            remaining[post_id] -= 1
+            if remaining[post_id] == 0:
+                _post_done(post_id)
+
+    if batch:
+        _write(batch)
     db.close()
-    return {'success': True, 'platforms': results}
+    return results, summary
 
 
-def sync_all_recent_insights():
-    """Sync insights for all published posts from the last 30 days."""
+def sync_post_insights(post_id):
+    """Fetch and store insights for a specific post from all its platforms."""
     db = get_db()
-    posts = dicts_from_rows(db.execute("""
-        SELECT id FROM scheduled_posts
-        WHERE status='posted' AND workflow_status='posted'
-        AND COALESCE(scheduled_at, created_at) >= datetime('now', '-30 days')
-    """).fetchall())
+    post = db.execute("SELECT id FROM scheduled_posts WHERE id=?", (post_id,)).fetchone()
     db.close()
+    if not post:
+        return {'success': False, 'error': 'Post not found'}
+
+    results, _ = _sync([post_id])
+    return {'success': True, 'platforms': results[post_id]}
+
 
-    synced = 0
-    for post in posts:
-        try:
-            result = sync_post_insights(post['id'])
-            if result.get('success'):
-                synced += 1
-        except Exception:
-            pass
+def sync_all_recent_insights(progress=None):
+    """Refresh insights for every recently published post whose refresh is due.
 
-    return {'synced': synced, 'total': len(posts)}
+    Which posts are due is decided by the age-tiered planner in
+    services/insight_refresh.py. Meant to run as a background job (see
+    services/jobs.py); progress is reported per post.
+    """
+    from services.insight_refresh import refresh_due_insights
+    summary = refresh_due_insights(limit=None, progress=progress)
+    return {'synced': summary['fetched'], 'failed': summary['failed'], 'total': summary['due']}
@@ -1,12 +1,17 @@
-import requests
+import os
 import time
+from services import platform_http
+from services.platform_http import GRAPH_API_BASE
+
+# Seconds between reel container status checks
+REEL_POLL_INTERVAL = float(os.getenv('IG_REEL_POLL_INTERVAL', 2))
 
 
 def post_image(access_token, account_id, image_url, caption=''):
     """Post a single image to Instagram."""
     # Step 1: Create media container
-    create_url = f"https://graph.facebook.com/v18.0/{account_id}/media"
-    create_resp = requests.post(create_url, data={
+    create_url = f"{GRAPH_API_BASE}/{account_id}/media"
+    create_resp = platform_http.post(create_url, account=account_id, data={
         'image_url': image_url,
         'caption': caption,
         'access_token': access_token
@@ -18,8 +23,8 @@ def post_image(access_token, account_id, image_url, caption=''):
     container_id = create_data['id']
 
     # Step 2: Publish
-    publish_url = f"https://graph.facebook.com/v18.0/{account_id}/media_publish"
-    pub_resp = requests.post(publish_url, data={
+    publish_url = f"{GRAPH_API_BASE}/{account_id}/media_publish"
+    pub_resp = platform_http.post(publish_url, account=account_id, data={
         'creation_id': container_id,
         'access_token': access_token
     }, timeout=30)
@@ -33,8 +38,8 @@ def post_carousel(access_token, account_id, image_urls, caption=''):
     """Post a carousel (multiple images) to Instagram."""
     children_ids = []
     for url in image_urls:
-        create_url = f"https://graph.facebook.com/v18.0/{account_id}/media"
-        resp = requests.post(create_url, data={
+        create_url = f"{GRAPH_API_BASE}/{account_id}/media"
+        resp = platform_http.post(create_url, account=account_id, data={
             'image_url': url,
             'is_carousel_item': 'true',
             'access_token': access_token
@@ -45,8 +50,8 @@ def post_carousel(access_token, account_id, image_urls, caption=''):
         children_ids.append(data['id'])
 
     # Create carousel container
-    create_url = f"https://graph.facebook.com/v18.0/{account_id}/media"
-    resp = requests.post(create_url, data={
+    create_url = f"{GRAPH_API_BASE}/{account_id}/media"
+    resp = platform_http.post(create_url, account=account_id, data={
         'media_type': 'CAROUSEL',
         'children': ','.join(children_ids),
         'caption': caption,
@@ -59,8 +64,8 @@ def post_carousel(access_token, account_id, image_urls, caption=''):
     container_id = data['id']
 
     # Publish
-    publish_url = f"https://graph.facebook.com/v18.0/{account_id}/media_publish"
-    pub_resp = requests.post(publish_url, data={
+    publish_url = f"{GRAPH_API_BASE}/{account_id}/media_publish"
+    pub_resp = platform_http.post(publish_url, account=account_id, data={
         'creation_id': container_id,
         'access_token': access_token
     }, timeout=30)
@@ -72,8 +77,8 @@ def post_carousel(access_token, account_id, image_urls, caption=''):
 
 def post_story(access_token, account_id, image_url):
     """Post a story to Instagram."""
-    create_url = f"https://graph.facebook.com/v18.0/{account_id}/media"
-    create_resp = requests.post(create_url, data={
+    create_url = f"{GRAPH_API_BASE}/{account_id}/media"
+    create_resp = platform_http.post(create_url, account=account_id, data={
         'image_url': image_url,
         'media_type': 'STORIES',
         'access_token': access_token
@@ -84,8 +89,8 @@ def post_story(access_token, account_id, image_url):
 
     container_id = create_data['id']
 
-    publish_url = f"https://graph.facebook.com/v18.0/{account_id}/media_publish"
-    pub_resp = requests.post(publish_url, data={
+    publish_url = f"{GRAPH_API_BASE}/{account_id}/media_publish"
+    pub_resp = platform_http.post(publish_url, account=account_id, data={
         'creation_id': container_id,
         'access_token': access_token
     }, timeout=30)
@@ -97,8 +102,8 @@ def post_story(access_token, account_id, image_url):
 
 def post_reel(access_token, account_id, video_url, caption=''):
     """Post a reel (video) to Instagram."""
-    create_url = f"https://graph.facebook.com/v18.0/{account_id}/media"
-    create_resp = requests.post(create_url, data={
+    create_url = f"{GRAPH_API_BASE}/{account_id}/media"
+    create_resp = platform_http.post(create_url, account=account_id, data={
         'video_url': video_url,
         'media_type': 'REELS',
         'caption': caption,
@@ -112,8 +117,8 @@ def post_reel(access_token, account_id, video_url, caption=''):
 
     # Wait for video processing
     for _ in range(30):
-        status_url = f"https://graph.facebook.com/v18.0/{container_id}"
-        status_resp = requests.get(status_url, params={
+        status_url = f"{GRAPH_API_BASE}/{container_id}"
+        status_resp = platform_http.get(status_url, account=account_id, params={
             'fields': 'status_code',
             'access_token': access_token
         }, timeout=30)
@@ -122,10 +127,10 @@ def post_reel(access_token, account_id, video_url, caption=''):
             break
         if status_data.get('status_code') == 'ERROR':
             return {'success': False, 'error': 'Video processing failed'}
-        time.sleep(2)
+        time.sleep(REEL_POLL_INTERVAL)
 
-    publish_url = f"https://graph.facebook.com/v18.0/{account_id}/media_publish"
-    pub_resp = requests.post(publish_url, data={
+    publish_url = f"{GRAPH_API_BASE}/{account_id}/media_publish"
+    pub_resp = platform_http.post(publish_url, account=account_id, data={
         'creation_id': container_id,
         'access_token': access_token
     }, timeout=30)
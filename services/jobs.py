@@ -0,0 +1,156 @@
+"""Background jobs with progress stored in the database.
+
+Long-running work (insights sync, bulk fetches) runs on a daemon thread and
+records its progress in the background_jobs table, so the request that
+started it returns immediately with a job id and any gunicorn worker can
+answer progress polls.
+"""
+import json
+import threading
+import time
+import traceback
+from models import get_db, dict_from_row
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+# A running job that has not reported progress for this long is assumed to
+# have died with its worker process.
+STALE_MINUTES = 15
+
+
+def get_job(job_id):
+    db = get_db()
+    job = dict_from_row(db.execute("SELECT * FROM background_jobs WHERE id=?", (job_id,)).fetchone())
+    db.close()
+    if job:
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        job['progress'] = round(job['completed'] * 100.0 / job['total'], 1) if job['total'] else 0
+    return job
+
+
+def _active_job(db, job_type):
+    """Fail stale jobs, then return the id of a queued or running job of this type, if any. Caller commits."""
+    db.execute(
+        """UPDATE background_jobs SET status=?, error='Job stopped reporting progress', finished_at=datetime('now')
+           WHERE status IN (?, ?) AND updated_at < datetime('now', ?)""",
+        (FAILED, QUEUED, RUNNING, f'-{STALE_MINUTES} minutes')
+    )
+    row = db.execute(
+        "SELECT id FROM background_jobs WHERE job_type=? AND status IN (?, ?) ORDER BY id DESC LIMIT 1",
+        (job_type, QUEUED, RUNNING)
+    ).fetchone()
+    return row['id'] if row else None
+
+
+def find_active_job(job_type):
+    """Return the id of a queued or running job of this type, if any."""
+    db = get_db()
+    job_id = _active_job(db, job_type)
+    db.commit()
+    db.close()
+    return job_id
+
+
+class JobProgress:
+    """Handed to the job function to report progress.
+
+    Counts are buffered and written at most once per FLUSH_SECONDS so a job
+    advancing thousands of items does not issue thousands of UPDATEs.
+    """
+
+    FLUSH_SECONDS = 1.0
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._pending = [0, 0, 0]  # succeeded, failed, skipped
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_total(self, total):
+        self._update("total=?", (total,))
+
+    def advance(self, succeeded=0, failed=0, skipped=0):
+        with self._lock:
+            self._pending[0] += succeeded
+            self._pending[1] += failed
+            self._pending[2] += skipped
+            due = time.monotonic() - self._flushed_at >= self.FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            succeeded, failed, skipped = self._pending
+            self._pending = [0, 0, 0]
+            self._flushed_at = time.monotonic()
+        if succeeded or failed or skipped:
+            self._update("completed=completed+?, succeeded=succeeded+?, failed=failed+?",
+                         (succeeded + failed + skipped, succeeded, failed))
+
+    def _update(self, assignments, params):
+        db = get_db()
+        db.execute(
+            f"UPDATE background_jobs SET {assignments}, updated_at=datetime('now') WHERE id=?",
+            (*params, self.job_id)
+        )
+        db.commit()
+        db.close()
+
+
+def start_job(job_type, func, *args, user_id=None):
+    """Run func(progress, *args) on a background thread and return the job id.
+
+    If a job of the same type is already queued or running, its id is
+    returned instead of starting a second one. The function's return value
+    is stored as the job result.
+    """
+    db = get_db()
+    # Check and insert under the write lock so concurrent requests start one job between them
+    db.execute("BEGIN IMMEDIATE")
+    existing = _active_job(db, job_type)
+    if existing:
+        db.commit()
+        db.close()
+        return existing
+    job_id = db.execute(
+        "INSERT INTO background_jobs (job_type, status, created_by_id) VALUES (?,?,?)",
+        (job_type, QUEUED, user_id)
+    ).lastrowid
+    db.commit()
+    db.close()
+
+    def _run():
+        _set_status(job_id, RUNNING, started=True)
+        progress = JobProgress(job_id)
+        try:
+            result = func(progress, *args)
+            progress.flush()
+            _set_status(job_id, COMPLETED, result=result)
+        except Exception as e:
+            traceback.print_exc()
+            progress.flush()
+            _set_status(job_id, FAILED, error=str(e))
+
+    threading.Thread(target=_run, daemon=True).start()
+    return job_id
+
+
+def _set_status(job_id, status, started=False, result=None, error=''):
+    db = get_db()
+    if started:
+        db.execute(
+            "UPDATE background_jobs SET status=?, started_at=datetime('now'), updated_at=datetime('now') WHERE id=?",
+            (status, job_id)
+        )
+    else:
+        db.execute(
+            """UPDATE background_jobs SET status=?, result=?, error=?,
+                   updated_at=datetime('now'), finished_at=datetime('now')
+               WHERE id=?""",
+            (status, json.dumps(result) if result is not None else '', error, job_id)
+        )
+    db.commit()
+    db.close()
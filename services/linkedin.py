@@ -1,10 +1,12 @@
 import requests
 import os
+from services import platform_http
+from services.platform_http import LINKEDIN_API_BASE, token_key
 
 
 def _get_person_urn(access_token):
     """Get the authenticated user's LinkedIn URN."""
-    resp = requests.get('https://api.linkedin.com/v2/userinfo', headers={
+    resp = platform_http.get(f'{LINKEDIN_API_BASE}/userinfo', account=token_key(access_token), headers={
         'Authorization': f'Bearer {access_token}'
     }, timeout=30)
     data = resp.json()
@@ -32,7 +34,7 @@ def post_text(access_token, text):
         'visibility': {'com.linkedin.ugc.MemberNetworkVisibility': 'PUBLIC'}
     }
 
-    resp = requests.post('https://api.linkedin.com/v2/ugcPosts', json=payload, headers={
+    resp = platform_http.post(f'{LINKEDIN_API_BASE}/ugcPosts', account=token_key(access_token), json=payload, headers={
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
         'X-Restli-Protocol-Version': '2.0.0'
@@ -61,8 +63,9 @@ def post_image(access_token, image_url, text=''):
         }
     }
 
-    reg_resp = requests.post(
-        'https://api.linkedin.com/v2/assets?action=registerUpload',
+    reg_resp = platform_http.post(
+        f'{LINKEDIN_API_BASE}/assets?action=registerUpload',
+        account=token_key(access_token),
         json=register_payload,
         headers={
             'Authorization': f'Bearer {access_token}',
@@ -80,7 +83,7 @@ def post_image(access_token, image_url, text=''):
 
     # Download image and upload to LinkedIn
     img_data = requests.get(image_url, timeout=30).content
-    upload_resp = requests.put(upload_url, data=img_data, headers={
+    upload_resp = platform_http.put(upload_url, account=token_key(access_token), data=img_data, headers={
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/octet-stream'
     }, timeout=60)
@@ -105,7 +108,7 @@ def post_image(access_token, image_url, text=''):
         'visibility': {'com.linkedin.ugc.MemberNetworkVisibility': 'PUBLIC'}
     }
 
-    resp = requests.post('https://api.linkedin.com/v2/ugcPosts', json=share_payload, headers={
+    resp = platform_http.post(f'{LINKEDIN_API_BASE}/ugcPosts', account=token_key(access_token), json=share_payload, headers={
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
         'X-Restli-Protocol-Version': '2.0.0'
@@ -133,8 +136,9 @@ def post_video(access_token, video_url, text=''):
         }
     }
 
-    reg_resp = requests.post(
-        'https://api.linkedin.com/v2/assets?action=registerUpload',
+    reg_resp = platform_http.post(
+        f'{LINKEDIN_API_BASE}/assets?action=registerUpload',
+        account=token_key(access_token),
         json=register_payload,
         headers={
             'Authorization': f'Bearer {access_token}',
@@ -151,7 +155,7 @@ def post_video(access_token, video_url, text=''):
     asset = reg_data['value']['asset']
 
     vid_data = requests.get(video_url, timeout=60).content
-    upload_resp = requests.put(upload_url, data=vid_data, headers={
+    upload_resp = platform_http.put(upload_url, account=token_key(access_token), data=vid_data, headers={
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/octet-stream'
     }, timeout=120)
@@ -175,7 +179,7 @@ def post_video(access_token, video_url, text=''):
         'visibility': {'com.linkedin.ugc.MemberNetworkVisibility': 'PUBLIC'}
     }
 
-    resp = requests.post('https://api.linkedin.com/v2/ugcPosts', json=share_payload, headers={
+    resp = platform_http.post(f'{LINKEDIN_API_BASE}/ugcPosts', account=token_key(access_token), json=share_payload, headers={
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
         'X-Restli-Protocol-Version': '2.0.0'
@@ -0,0 +1,272 @@
+"""Client logos: find one on the client's website and keep a local copy.
+
+A fetch reads the site's HTML (at most MAX_PAGE_BYTES, logo tags live in
+<head>) for an apple-touch-icon, og:image or favicon, falling back to
+Google's favicon service, then downloads the image (at most
+MAX_IMAGE_BYTES) into uploads/logos under a name derived from its SHA-256,
+so an image is written once however many times it is fetched.
+
+client_logo_state (migration 48) keeps the ETag / Last-Modified of each
+client's page and image: later fetches send conditional requests and a
+304 keeps the stored logo without downloading it again. bulk_fetch() runs
+the fetches on a bounded thread pool as a background job and writes all
+results in one transaction at the end.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlparse
+
+from models import get_db, dicts_from_rows
+from services import platform_http
+from services.rate_limiter import PRIORITY_BACKGROUND
+
+FETCH_WORKERS = int(os.getenv('LOGO_FETCH_WORKERS', 8))
+FETCH_TIMEOUT = 10
+MAX_PAGE_BYTES = 512 * 1024
+MAX_IMAGE_BYTES = 2 * 1024 * 1024
+
+FETCH_JOB = 'logo_fetch'
+
+LOGOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads', 'logos')
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+# In order of preference; each tag is matched with its attributes in either order
+_LOGO_PATTERNS = [
+    (r'<link[^>]*rel=["\']apple-touch-icon["\'][^>]*href=["\']([^"\']+)["\']',
+     r'<link[^>]*href=["\']([^"\']+)["\'][^>]*rel=["\']apple-touch-icon["\']'),
+    (r'<meta[^>]*property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']',
+     r'<meta[^>]*content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']'),
+    (r'<link[^>]*rel=["\']icon["\'][^>]*href=["\']([^"\']+\.png[^"\']*)["\']',
+     r'<link[^>]*href=["\']([^"\']+\.png[^"\']*)["\'][^>]*rel=["\']icon["\']'),
+    (r'<link[^>]*rel=["\'](?:shortcut )?icon["\'][^>]*href=["\']([^"\']+)["\']',
+     r'<link[^>]*href=["\']([^"\']+)["\'][^>]*rel=["\'](?:shortcut )?icon["\']'),
+]
+
+_EXTENSIONS = [('png', '.png'), ('svg', '.svg'), ('gif', '.gif'), ('webp', '.webp'),
+               ('ico', '.ico'), ('x-icon', '.ico')]
+
+_STATE_FIELDS = ('page_etag', 'page_last_modified', 'logo_src', 'image_etag', 'image_last_modified',
+                 'content_hash', 'logo_url')
+
+
+def normalize_website(url):
+    """(url with a scheme, domain), or (None, None) for an empty url."""
+    url = (url or '').strip()
+    if not url:
+        return None, None
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    parsed = urlparse(url)
+    return url, parsed.netloc or parsed.path.split('/')[0]
+
+
+def favicon_fallback(domain):
+    return f'https://www.google.com/s2/favicons?domain={domain}&sz=128'
+
+
+def find_logo_src(html, base_url):
+    """Absolute URL of the preferred logo image referenced by a page, or None."""
+    for patterns in _LOGO_PATTERNS:
+        for pattern in patterns:
+            match = re.search(pattern, html, re.IGNORECASE)
+            if match:
+                src = match.group(1)
+                if src.startswith('//'):
+                    return 'https:' + src
+                if not src.startswith(('http://', 'https://')):
+                    return urljoin(base_url, src)
+                return src
+    return None
+
+
+def _get(url, etag='', last_modified=''):
+    headers = dict(HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return platform_http.get(url, account=urlparse(url).netloc, priority=PRIORITY_BACKGROUND,
+                             timeout=FETCH_TIMEOUT, headers=headers, stream=True)
+
+
+def _read(resp, limit, truncate=False):
+    """A streamed body of at most limit bytes; longer ones are cut (truncate) or raise ValueError."""
+    length = resp.headers.get('Content-Length', '')
+    if not truncate and length.isdigit() and int(length) > limit:
+        raise ValueError(f'Response larger than {limit} bytes')
+    body = bytearray()
+    for chunk in resp.iter_content(64 * 1024):
+        body += chunk
+        if len(body) > limit:
+            if not truncate:
+                raise ValueError(f'Response larger than {limit} bytes')
+            break
+    return bytes(body[:limit])
+
+
+def _extension(content_type):
+    for marker, ext in _EXTENSIONS:
+        if marker in content_type:
+            return ext
+    return '.png'
+
+
+def _local_path(logo_url):
+    if not logo_url or not logo_url.startswith('/uploads/logos/'):
+        return None
+    return os.path.join(LOGOS_DIR, os.path.basename(logo_url))
+
+
+def save_image(body, content_type):
+    """Store image bytes under their content hash; returns (hash, logo_url)."""
+    digest = hashlib.sha256(body).hexdigest()
+    filename = f'{digest[:16]}{_extension(content_type)}'
+    path = os.path.join(LOGOS_DIR, filename)
+    if not os.path.exists(path):
+        os.makedirs(LOGOS_DIR, exist_ok=True)
+        # A temp file of its own per call: several workers often save the same image at once
+        fd, tmp = tempfile.mkstemp(dir=LOGOS_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            # Another worker stored the same content first
+            if not os.path.exists(path):
+                raise
+    return digest, f'/uploads/logos/{filename}'
+
+
+def fetch_logo(website, state=None):
+    """Fetch a website's logo, reusing a previous fetch's state for conditional requests.
+
+    Returns the new state (the client_logo_state columns, logo_url being
+    the local path, or the favicon service URL when the image could not be
+    downloaded), or None when website is empty.
+    """
+    url, domain = normalize_website(website)
+    if not url:
+        return None
+
+    new = {field: '' for field in _STATE_FIELDS}
+    if state and state.get('website') == url:
+        new.update({field: state.get(field) or '' for field in _STATE_FIELDS})
+    new['website'] = url
+
+    # The page: a 304 means the logo tag we found last time still holds
+    logo_src = None
+    try:
+        revalidate = bool(new['logo_src'])
+        validators = (new['page_etag'], new['page_last_modified']) if revalidate else ('', '')
+        with _get(url, *validators) as resp:
+            if resp.status_code == 304 and revalidate:
+                logo_src = new['logo_src']
+            else:
+                resp.raise_for_status()
+                html = _read(resp, MAX_PAGE_BYTES, truncate=True).decode(resp.encoding or 'utf-8', 'replace')
+                logo_src = find_logo_src(html, url)
+                new['page_etag'] = resp.headers.get('ETag', '')
+                new['page_last_modified'] = resp.headers.get('Last-Modified', '')
+    except Exception:
+        new['page_etag'] = new['page_last_modified'] = ''
+    logo_src = logo_src or favicon_fallback(domain)
+
+    if logo_src != new['logo_src']:
+        new.update(logo_src=logo_src, image_etag='', image_last_modified='', content_hash='')
+
+    # The image: only revalidate when the file it produced is still on disk
+    path = _local_path(new['logo_url'])
+    revalidate = bool(new['content_hash']) and path is not None and os.path.exists(path)
+    validators = (new['image_etag'], new['image_last_modified']) if revalidate else ('', '')
+    try:
+        with _get(logo_src, *validators) as resp:
+            if resp.status_code == 304 and revalidate:
+                return new
+            resp.raise_for_status()
+            body = _read(resp, MAX_IMAGE_BYTES)
+            if not body:
+                raise ValueError('Empty image')
+            digest, logo_url = save_image(body, resp.headers.get('Content-Type', ''))
+            new.update(content_hash=digest, logo_url=logo_url, image_etag=resp.headers.get('ETag', ''),
+                       image_last_modified=resp.headers.get('Last-Modified', ''))
+    except Exception:
+        new.update(logo_url=favicon_fallback(domain), content_hash='', image_etag='', image_last_modified='')
+    return new
+
+
+def fetch_logo_from_url(url):
+    """Logo for a website with no stored state: local path or favicon URL, None for an empty url."""
+    state = fetch_logo(url)
+    return state['logo_url'] if state else None
+
+
+def bulk_fetch(progress=None):
+    """Fetch logos for all clients that have a website set.
+
+    Runs as a background job (see services/jobs.py). A client's logo_url is
+    only changed when the fetched logo differs from it and the client's
+    website was not edited while the job ran.
+    """
+    db = get_db()
+    clients = dicts_from_rows(db.execute(
+        "SELECT id, name, website, logo_url FROM clients WHERE website IS NOT NULL AND website != ''"
+    ).fetchall())
+    states = {row['client_id']: dict(row) for row in db.execute("SELECT * FROM client_logo_state").fetchall()}
+    db.close()
+
+    if progress:
+        progress.set_total(len(clients))
+    fetched = []
+    results = []
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {pool.submit(fetch_logo, c['website'], states.get(c['id'])): c for c in clients}
+        for future in as_completed(futures):
+            client = futures[future]
+            entry = {'id': client['id'], 'name': client['name']}
+            try:
+                state = future.result()
+            except Exception as e:
+                entry.update(status='error', error=str(e))
+                state = None
+            if state is None:
+                entry.setdefault('status', 'no_logo')
+            else:
+                fetched.append((client, state))
+                entry.update(logo_url=state['logo_url'],
+                             status='ok' if state['logo_url'] != client['logo_url'] else 'unchanged')
+            results.append(entry)
+            if progress:
+                progress.advance(succeeded=1 if entry['status'] in ('ok', 'unchanged') else 0,
+                                 failed=1 if entry['status'] == 'error' else 0,
+                                 skipped=1 if entry['status'] == 'no_logo' else 0)
+
+    db = get_db()
+    db.executemany(
+        "UPDATE clients SET logo_url=? WHERE id=? AND website=?",
+        [(state['logo_url'], client['id'], client['website'])
+         for client, state in fetched if state['logo_url'] != client['logo_url']]
+    )
+    db.executemany(f"""
+        INSERT INTO client_logo_state (client_id, website, {', '.join(_STATE_FIELDS)}, fetched_at)
+        SELECT id, ?, {', '.join('?' * len(_STATE_FIELDS))}, datetime('now') FROM clients WHERE id=? AND website=?
+        ON CONFLICT(client_id) DO UPDATE SET website=excluded.website,
+            {', '.join(f'{f}=excluded.{f}' for f in _STATE_FIELDS)}, fetched_at=excluded.fetched_at
+    """, [(state['website'], *(state[f] for f in _STATE_FIELDS), client['id'], client['website'])
+          for client, state in fetched])
+    db.commit()
+    db.close()
+
+    results.sort(key=lambda r: r['id'])
+    return {
+        'total': len(results),
+        'updated': sum(1 for r in results if r['status'] == 'ok'),
+        'unchanged': sum(1 for r in results if r['status'] == 'unchanged'),
+        'failed': sum(1 for r in results if r['status'] in ('error', 'no_logo')),
+        'results': results,
+    }
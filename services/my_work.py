@@ -0,0 +1,99 @@
+"""Role inboxes for /api/posts/my-work: the posts waiting on a user.
+
+Each role is one statement. The action of every item (needs writing,
+returned for edits, ...) is a CASE expression over the post's own
+columns, so current and returned items come out of the same read, and
+roles whose inbox has several capped parts (SM specialists, admins) read
+them as UNION ALL branches. Each branch carries its position in the
+role's list and its row number in its own order, and the outer query
+sorts on both, so the inbox comes back branch by branch in each branch's
+order. Assignee-scoped branches seek an (assignee, workflow_status) index
+from migration 51; the admin branches are not scoped to a user and read
+the unassigned drafts through idx_posts_designer_status with a NULL
+designer and the overdue posts through idx_posts_status_scheduled
+(migration 49).
+"""
+
+_PRIORITY = "CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END"
+
+# What the dashboard shows per item
+_ITEM = """
+    SELECT sp.id, sp.client_id, sp.topic, sp.post_type, sp.platforms, sp.priority, sp.status, sp.workflow_status,
+           sp.scheduled_at, sp.revision_count, sp.updated_at, sp.created_at, c.name AS client_name,
+           {action} AS action
+    FROM scheduled_posts sp
+    LEFT JOIN clients c ON sp.client_id = c.id
+"""
+
+_RETURNED = "CASE WHEN sp.revision_count > 0 THEN 'returned_for_edits' ELSE '{0}' END"
+_STATIC = "(sp.post_type NOT IN ('reel', 'video') OR sp.post_type IS NULL)"
+_MOTION = "sp.post_type IN ('reel', 'video')"
+
+# role -> branches of (action expression, WHERE, ORDER BY, LIMIT or None),
+# each WHERE taking the user id once per '?'
+ROLE_QUERIES = {
+    'copywriter': [
+        (_RETURNED.format('needs_writing'), "sp.assigned_writer_id=? AND sp.workflow_status='draft'",
+         _PRIORITY, None),
+    ],
+    'designer': [
+        (_RETURNED.format('needs_design'), f"sp.assigned_designer_id=? AND sp.workflow_status='in_design' AND {_STATIC}",
+         _PRIORITY, None),
+    ],
+    'motion_designer': [
+        (_RETURNED.format('needs_design'), f"sp.assigned_motion_id=? AND sp.workflow_status='in_design' AND {_MOTION}",
+         _PRIORITY, None),
+    ],
+    'manager': [
+        ("'pending_review'", "sp.assigned_manager_id=? AND sp.workflow_status='pending_review'", _PRIORITY, None),
+    ],
+    'sm_specialist': [
+        ("'ready_to_schedule'", "(sp.assigned_sm_id=? OR sp.created_by_id=?) AND sp.workflow_status='approved'"
+                                " AND (sp.scheduled_at IS NULL OR sp.scheduled_at='')", _PRIORITY, None),
+        ("'scheduled'", "(sp.assigned_sm_id=? OR sp.created_by_id=?) AND sp.workflow_status='scheduled'",
+         "sp.scheduled_at ASC", 10),
+    ],
+    'admin': [
+        ("'unassigned'", "sp.workflow_status='draft' AND sp.assigned_designer_id IS NULL",
+         "sp.created_at DESC", 20),
+        ("'overdue'", "sp.status='pending' AND sp.scheduled_at < datetime('now') AND sp.scheduled_at != ''",
+         "sp.scheduled_at ASC", 20),
+    ],
+}
+
+ACTION_LABELS = {
+    'copywriter': {'needs_writing': 'Needs Writing', 'returned_for_edits': 'Returned for Edits'},
+    'designer': {'needs_design': 'يحتاج تصميم', 'returned_for_edits': 'مرتجع للتعديل'},
+    'motion_designer': {'needs_design': 'يحتاج موشن', 'returned_for_edits': 'مرتجع للتعديل'},
+    'manager': {'pending_review': 'Pending Review'},
+    'sm_specialist': {'ready_to_schedule': 'Ready to Schedule', 'scheduled': 'Scheduled'},
+    'admin': {'unassigned': 'غير معين', 'overdue': 'متأخر'},
+}
+
+
+def _branch(ordinal, action, where, order, limit):
+    sql = f"{_ITEM.format(action=action)} WHERE {where} ORDER BY {order}, sp.id"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    # Numbered after the LIMIT; aliased sp so the branch's ORDER BY reads the same columns
+    return (f"SELECT *, {int(ordinal)} AS branch, ROW_NUMBER() OVER (ORDER BY {order}, sp.id) AS branch_row "
+            f"FROM ({sql}) sp")
+
+
+def inbox(db, user_id, role):
+    """Posts needing this user's attention as a list of dicts with action and action_label.
+
+    Roles without an inbox get an empty list.
+    """
+    branches = ROLE_QUERIES.get(role)
+    if not branches:
+        return []
+    sql = ' UNION ALL '.join(_branch(i, *branch) for i, branch in enumerate(branches))
+    sql += " ORDER BY branch, branch_row"
+    params = [user_id] * sum(where.count('?') for _, where, _, _ in branches)
+    items = [dict(r) for r in db.execute(sql, params).fetchall()]
+    labels = ACTION_LABELS[role]
+    for item in items:
+        del item['branch'], item['branch_row']
+        item['action_label'] = labels[item['action']]
+    return items
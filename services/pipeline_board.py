@@ -0,0 +1,140 @@
+"""The pipeline board: open posts per workflow column, a page at a time.
+
+Every unposted post with a workflow status sits in one of COLUMNS; drafts,
+the old needs_caption status and anything unrecognised all land in
+'draft'. Within a column cards are ordered by priority (urgent first),
+then newest first. The board is two statements however many posts there
+are: one grouped count per column, and the first page of every column as
+one UNION ALL whose branches each walk idx_posts_pipeline_board
+(migration 50) for their LIMIT rows. "Load more" reads one column after
+its keyset cursor (priority, created_at, id) the same way.
+"""
+import base64
+import json
+
+COLUMNS = ('draft', 'pending_review', 'in_design', 'approved', 'scheduled')
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'normal': 2}
+
+# Same expressions and WHERE as idx_posts_pipeline_board (migration 50), so
+# each column is an index range already in board order
+_COLUMN = ("CASE WHEN sp.workflow_status IN ('pending_review', 'in_design', 'approved', 'scheduled') "
+           "THEN sp.workflow_status ELSE 'draft' END")
+_RANK = "CASE sp.priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'normal' THEN 2 ELSE 3 END"
+_OPEN = "sp.workflow_status IS NOT NULL AND sp.workflow_status NOT IN ('', 'posted')"
+
+# What a card shows; the full post is loaded when it is opened
+_CARD = """
+    SELECT sp.id, sp.client_id, sp.topic, sp.post_type, sp.platforms, sp.priority, sp.workflow_status,
+           sp.scheduled_at, sp.created_at,
+           sp.design_output_urls IS NOT NULL AND sp.design_output_urls != '' AS has_design,
+           c.name AS client_name,
+           u_designer.username AS assigned_designer_name,
+           u_motion.username AS assigned_motion_name,
+           u_creator.username AS created_by_name
+    FROM scheduled_posts sp
+    LEFT JOIN clients c ON sp.client_id = c.id
+    LEFT JOIN users u_designer ON sp.assigned_designer_id = u_designer.id
+    LEFT JOIN users u_motion ON sp.assigned_motion_id = u_motion.id
+    LEFT JOIN users u_creator ON sp.created_by_id = u_creator.id
+"""
+
+
+def encode_cursor(card):
+    raw = json.dumps([PRIORITY_RANK.get(card['priority'], 3), card['created_at'], card['id']],
+                     separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(rank, created_at, id) from a cursor; raises ValueError for a malformed one."""
+    try:
+        rank, created_at, post_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(rank, int) or not isinstance(post_id, int) or not isinstance(created_at, str):
+        raise ValueError('Invalid cursor')
+    return rank, created_at, post_id
+
+
+def filters(client_id=None, assigned_to=None):
+    """WHERE terms and parameters for the board filters."""
+    where, params = '', []
+    if client_id:
+        where += " AND sp.client_id=?"
+        params.append(client_id)
+    if assigned_to:
+        where += (" AND (sp.assigned_designer_id=? OR sp.assigned_sm_id=? OR sp.assigned_motion_id=?"
+                  " OR sp.assigned_writer_id=? OR sp.created_by_id=?)")
+        params.extend([assigned_to] * 5)
+    return where, params
+
+
+def _column_query(where, cursor=None):
+    """One column's page: parameters are the column, the filters, the cursor's and the limit."""
+    keyset = ''
+    if cursor:
+        keyset = f" AND {_RANK} >= ? AND ({_RANK} > ? OR sp.created_at < ? OR (sp.created_at = ? AND sp.id < ?))"
+    return (f"{_CARD} WHERE {_OPEN} AND {_COLUMN} = ?{where}{keyset}"
+            f" ORDER BY {_RANK}, sp.created_at DESC, sp.id DESC LIMIT ?")
+
+
+def _cursor_params(cursor):
+    rank, created_at, post_id = decode_cursor(cursor)
+    return [rank, rank, created_at, created_at, post_id]
+
+
+def _page(cards, limit):
+    cards = [dict(c) for c in cards]
+    for card in cards:
+        card['has_design'] = bool(card['has_design'])
+    return cards[:limit], encode_cursor(cards[limit - 1]) if len(cards) > limit else None
+
+
+def counts(db, where, params):
+    """Open posts per column, as {column: n} with every column present."""
+    totals = dict.fromkeys(COLUMNS, 0)
+    for row in db.execute(
+        f"SELECT {_COLUMN} AS board_column, COUNT(*) AS c FROM scheduled_posts sp WHERE {_OPEN}{where} "
+        f"GROUP BY board_column", params
+    ).fetchall():
+        totals[row['board_column']] = row['c']
+    return totals
+
+
+def board(db, where, params, limit=DEFAULT_PAGE_SIZE):
+    """Count, first limit cards and next cursor of every column.
+
+    Returns {column: {'count', 'cards', 'next_cursor'}}.
+    """
+    totals = counts(db, where, params)
+    branch = _column_query(where)
+    rows = db.execute(
+        ' UNION ALL '.join(f"SELECT * FROM ({branch})" for _ in COLUMNS),
+        [p for column in COLUMNS for p in (column, *params, limit + 1)]
+    ).fetchall()
+
+    by_column = {column: [] for column in COLUMNS}
+    for row in rows:
+        status = row['workflow_status']
+        by_column[status if status in by_column else 'draft'].append(row)
+    result = {}
+    for column in COLUMNS:
+        cards, next_cursor = _page(by_column[column], limit)
+        result[column] = {'count': totals[column], 'cards': cards, 'next_cursor': next_cursor}
+    return result
+
+
+def column_page(db, column, where, params, cursor, limit=DEFAULT_PAGE_SIZE):
+    """The cards of one column after cursor; returns (cards, next_cursor).
+
+    Raises ValueError for an unknown column or a malformed cursor.
+    """
+    if column not in COLUMNS:
+        raise ValueError(f'column must be one of {", ".join(COLUMNS)}')
+    key_params = _cursor_params(cursor) if cursor else []
+    rows = db.execute(_column_query(where, cursor), [column, *params, *key_params, limit + 1]).fetchall()
+    return _page(rows, limit)
@@ -0,0 +1,86 @@
+"""Shared HTTP entry point for Graph API and LinkedIn API calls.
+
+Every platform request goes through the endpoint family's circuit breaker
+and the rate limiter, so outages fail fast, usage headers are observed and
+budgets are respected across publishing and background work.
+"""
+import hashlib
+import os
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from services.circuit_breaker import get_breaker
+from services.rate_limiter import limiter, PRIORITY_PUBLISH, RateLimitExceeded
+
+# Cap on the TCP connect phase so an unreachable host fails in seconds even
+# when the caller allows a long read timeout for uploads.
+CONNECT_TIMEOUT = 5
+
+# API roots; overridable so publishing can run against tools/fake_platform.py
+GRAPH_API_BASE = os.getenv('GRAPH_API_BASE', 'https://graph.facebook.com/v18.0').rstrip('/')
+LINKEDIN_API_BASE = os.getenv('LINKEDIN_API_BASE', 'https://api.linkedin.com/v2').rstrip('/')
+
+
+def api_family(url):
+    """Map a request URL to the budget it draws from."""
+    if url.startswith(GRAPH_API_BASE + '/'):
+        return 'graph'
+    if url.startswith(LINKEDIN_API_BASE + '/'):
+        return 'linkedin'
+    host = urlparse(url).netloc.lower()
+    if 'facebook.com' in host:
+        return 'graph'
+    if 'linkedin.com' in host or 'licdn.com' in host:
+        return 'linkedin'
+    return 'web'
+
+
+def token_key(access_token):
+    """Stable, non-reversible account key for APIs addressed only by token."""
+    if not access_token:
+        return None
+    return hashlib.sha1(access_token.encode()).hexdigest()[:12]
+
+
+def request(method, url, account=None, priority=PRIORITY_PUBLISH, **kwargs):
+    api = api_family(url)
+    breaker = get_breaker(api) if api != 'web' else None
+    if breaker:
+        breaker.before_call()
+    try:
+        limiter.acquire(api, account, priority)
+    except RateLimitExceeded:
+        if breaker:
+            breaker.release()
+        raise
+
+    timeout = kwargs.get('timeout')
+    if isinstance(timeout, (int, float)):
+        kwargs['timeout'] = (min(CONNECT_TIMEOUT, timeout), timeout)
+
+    start = time.monotonic()
+    try:
+        resp = requests.request(method, url, **kwargs)
+    except requests.RequestException:
+        if breaker:
+            breaker.record(True, time.monotonic() - start)
+        raise
+    if breaker:
+        # Server errors count against the endpoint; 4xx are caller problems
+        breaker.record(resp.status_code >= 500, time.monotonic() - start)
+    limiter.observe(api, account, resp)
+    return resp
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request('PUT', url, **kwargs)
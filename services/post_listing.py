@@ -0,0 +1,131 @@
+"""Keyset-paged reads of scheduled_posts for /api/all-posts.
+
+Posts are listed newest scheduled first, by (scheduled_at, id) descending,
+with unscheduled posts (NULL scheduled_at) last. A page cursor is the
+(scheduled_at, id) of the last post returned and the next page starts
+strictly after it, so every page is one range read of
+idx_posts_scheduled_at (or idx_posts_status_scheduled when filtering by
+status, migration 49) however deep into the history it is, and the full
+list can be walked page by page without ever holding it in memory.
+"""
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Pseudo-columns a projection may ask for besides scheduled_posts' own
+EXTRA_FIELDS = {'client_name': 'c.name AS client_name'}
+
+# Always selected: the cursor is built from them
+KEY_FIELDS = ('id', 'scheduled_at')
+
+
+def encode_cursor(post):
+    raw = json.dumps([post['scheduled_at'], post['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(scheduled_at, id) from a cursor; raises ValueError for a malformed one."""
+    try:
+        scheduled_at, post_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(post_id, int) or not (scheduled_at is None or isinstance(scheduled_at, (str, int, float))):
+        raise ValueError('Invalid cursor')
+    return scheduled_at, post_id
+
+
+def select_list(db, fields=None):
+    """SELECT expressions for a comma-separated projection (None for every column).
+
+    Raises ValueError naming unknown fields.
+    """
+    if not fields:
+        return 'sp.*, c.name AS client_name'
+    columns = {row['name'] for row in db.execute("PRAGMA table_info(scheduled_posts)").fetchall()}
+    wanted = list(KEY_FIELDS)
+    for field in (f.strip() for f in fields.split(',')):
+        if field and field not in wanted:
+            wanted.append(field)
+    unknown = [f for f in wanted if f not in columns and f not in EXTRA_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return ', '.join(EXTRA_FIELDS.get(f, f'sp.{f}') for f in wanted)
+
+
+def filters(status=None, platform=None, client_id=None):
+    """WHERE terms and parameters for the list filters."""
+    where, params = '', []
+    if status:
+        where += " AND sp.status=?"
+        params.append(status)
+    if platform:
+        where += " AND sp.platforms LIKE ?"
+        params.append(f'%{platform}%')
+    if client_id:
+        where += " AND sp.client_id=?"
+        params.append(client_id)
+    return where, params
+
+
+def count(db, where, params):
+    """Number of posts matching the filters."""
+    return db.execute(f"SELECT COUNT(*) FROM scheduled_posts sp WHERE 1=1{where}", params).fetchone()[0]
+
+
+def page(db, where, params, columns, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """One page of posts after cursor (None for the first); returns (posts, next_cursor).
+
+    next_cursor is None on the last page.
+    """
+    after_at, after_id = decode_cursor(cursor) if cursor else (None, None)
+    base = f"""
+        SELECT {columns}
+        FROM scheduled_posts sp
+        LEFT JOIN clients c ON sp.client_id = c.id
+        WHERE 1=1{where}
+    """
+    rows = []
+    # Scheduled posts first, unless the cursor is already among the unscheduled ones
+    if cursor is None or after_at is not None:
+        keyset, key_params = '', []
+        if after_at is not None:
+            keyset = " AND sp.scheduled_at <= ? AND (sp.scheduled_at < ? OR sp.id < ?)"
+            key_params = [after_at, after_at, after_id]
+        rows = db.execute(
+            f"{base} AND sp.scheduled_at IS NOT NULL{keyset} ORDER BY sp.scheduled_at DESC, sp.id DESC LIMIT ?",
+            [*params, *key_params, limit + 1]
+        ).fetchall()
+    if len(rows) <= limit:
+        keyset, key_params = '', []
+        if after_at is None and after_id is not None:
+            keyset, key_params = " AND sp.id < ?", [after_id]
+        rows += db.execute(
+            f"{base} AND sp.scheduled_at IS NULL{keyset} ORDER BY sp.id DESC LIMIT ?",
+            [*params, *key_params, limit + 1 - len(rows)]
+        ).fetchall()
+
+    posts = [dict(r) for r in rows[:limit]]
+    return posts, encode_cursor(posts[-1]) if len(rows) > limit else None
+
+
+def stream_json(db, where, params, columns, batch=MAX_PAGE_SIZE):
+    """Every matching post as chunks of one JSON array, read a page at a time.
+
+    Closes db when done.
+    """
+    try:
+        yield '['
+        cursor, first = None, True
+        while True:
+            posts, cursor = page(db, where, params, columns, batch, cursor)
+            if posts:
+                yield ('' if first else ',') + ','.join(json.dumps(p) for p in posts)
+                first = False
+            if cursor is None:
+                break
+        yield ']'
+    finally:
+        db.close()
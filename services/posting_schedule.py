@@ -0,0 +1,77 @@
+"""Posting-rule day codes and their expansion into expected posts per day.
+
+A client_posting_rules row lists day codes ('fri' every Friday, 'fri_1'
+the first Friday of the month, 'fri_last' the last) and posts_per_day.
+expand_rule() turns one rule into expected post counts per week of a
+window. The result depends only on the rule's days and posts_per_day and
+the window, so it is memoized on exactly those values: a rule is expanded
+once per version and edited rules simply miss the cache.
+"""
+import calendar
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+
+DAY_MAP = {
+    'sun': 6, 'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5
+}
+
+
+def matches_day_code(day_code, weekday, day_of_month, days_in_month):
+    """Check if a day matches a posting day code.
+    Supports: 'fri' (every), 'fri_1' (1st), 'fri_2' (2nd), 'fri_3' (3rd), 'fri_4' (4th), 'fri_last' (last).
+    """
+    if '_' in day_code:
+        parts = day_code.split('_')
+        base_day = parts[0]
+        week_spec = parts[1]
+    else:
+        base_day = day_code
+        week_spec = None
+
+    if DAY_MAP.get(base_day) != weekday:
+        return False
+
+    if week_spec is None:
+        return True  # every occurrence
+
+    # Calculate which occurrence of this weekday in the month
+    week_num = (day_of_month - 1) // 7 + 1  # 1-based week number
+
+    if week_spec == 'last':
+        # Check if this is the last occurrence of this weekday
+        return day_of_month + 7 > days_in_month
+    elif week_spec.isdigit():
+        return week_num == int(week_spec)
+
+    return False
+
+
+def parse_list(value):
+    """A posting_days / posting_hours column as a list ([] when unreadable)."""
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+@lru_cache(maxsize=4096)
+def expand_rule(posting_days, posts_per_day, start, weeks):
+    """Expected posts per week for weeks 7-day windows from start (an ISO date).
+
+    posting_days is the rule's raw JSON column. A day matching several of
+    the rule's codes still counts once. Returns a tuple of length weeks.
+    """
+    codes = [c for c in parse_list(posting_days) if isinstance(c, str)]
+    per_day = posts_per_day if posts_per_day is not None else 1
+    first = date.fromisoformat(start)
+    counts = [0] * weeks
+    for offset in range(weeks * 7):
+        day = first + timedelta(days=offset)
+        dims = calendar.monthrange(day.year, day.month)[1]
+        if any(matches_day_code(code, day.weekday(), day.day, dims) for code in codes):
+            counts[offset // 7] += per_day
+    return tuple(counts)
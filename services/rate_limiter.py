@@ -0,0 +1,261 @@
+"""Adaptive token-bucket rate limiting for platform API calls.
+
+Meta reports how much of the app-level and business-use-case budget has
+been consumed through the X-App-Usage and X-Business-Use-Case-Usage response
+headers (percentages over a rolling one-hour window). LinkedIn enforces
+fixed daily quotas per application and per member token. Every platform call
+goes through one bucket for the app and one for the account, and both are
+fed by those signals.
+
+Calls carry a priority. Background work (insights sync, logo fetches) stops
+well before the budget runs out so time-critical publishes keep headroom.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+PRIORITY_PUBLISH = 'publish'
+PRIORITY_BACKGROUND = 'background'
+
+# Highest reported budget usage (percent) at which each priority may still call.
+USAGE_CEILING = {
+    PRIORITY_PUBLISH: int(os.getenv('RATE_LIMIT_PUBLISH_CEILING', 95)),
+    PRIORITY_BACKGROUND: int(os.getenv('RATE_LIMIT_BACKGROUND_CEILING', 75)),
+}
+
+# Share of each bucket's burst capacity that only publishes may draw down.
+BACKGROUND_RESERVE = 0.3
+
+# How long each priority will wait for a token before giving up.
+MAX_WAIT = {
+    PRIORITY_PUBLISH: float(os.getenv('RATE_LIMIT_PUBLISH_MAX_WAIT', 10)),
+    PRIORITY_BACKGROUND: float(os.getenv('RATE_LIMIT_BACKGROUND_MAX_WAIT', 30)),
+}
+
+# Meta usage is a rolling one-hour window, so a reading decays back to zero
+# over an hour if no newer header arrives.
+USAGE_WINDOW_SECONDS = 3600
+
+# (rate per second, burst capacity, daily quota or None) per API family and scope
+BUCKET_DEFAULTS = {
+    ('graph', 'app'): (float(os.getenv('GRAPH_APP_RATE', 5)), 20, None),
+    ('graph', 'account'): (float(os.getenv('GRAPH_ACCOUNT_RATE', 1)), 10, None),
+    ('linkedin', 'app'): (float(os.getenv('LINKEDIN_APP_RATE', 2)), 10,
+                          int(os.getenv('LINKEDIN_APP_DAILY_QUOTA', 100000))),
+    ('linkedin', 'account'): (float(os.getenv('LINKEDIN_ACCOUNT_RATE', 0.5)), 5,
+                              int(os.getenv('LINKEDIN_MEMBER_DAILY_QUOTA', 500))),
+    ('web', 'app'): (20.0, 40, None),
+    ('web', 'account'): (2.0, 4, None),
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot get a token within its priority's wait budget."""
+
+    def __init__(self, api, account, wait):
+        self.api = api
+        self.account = account
+        self.wait = wait
+        super().__init__(f'{api} rate limit reached for {account or "app"}; retry in {int(wait) + 1}s')
+
+
+class TokenBucket:
+    """A token bucket whose refill rate shrinks as the platform reports usage."""
+
+    def __init__(self, rate, capacity, daily_quota=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.daily_quota = daily_quota
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.usage = 0.0
+        self.usage_at = self.updated
+        self.blocked_until = 0.0
+        self.day = datetime.utcnow().date()
+        self.calls_today = 0
+        self.calls = 0
+        self.throttled = 0
+
+    def current_usage(self, now):
+        decayed = self.usage - (now - self.usage_at) * 100.0 / USAGE_WINDOW_SECONDS
+        usage = max(0.0, decayed)
+        if self.daily_quota:
+            usage = max(usage, self.calls_today * 100.0 / self.daily_quota)
+        return usage
+
+    def _effective_rate(self, now):
+        return self.rate * max(0.05, 1 - self.current_usage(now) / 100.0)
+
+    def _refill(self, now):
+        today = datetime.utcnow().date()
+        if today != self.day:
+            self.day = today
+            self.calls_today = 0
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self._effective_rate(now))
+            self.updated = now
+
+    def wait_time(self, priority, now):
+        """Seconds until a call of this priority may proceed (0 means now)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        usage = self.current_usage(now)
+        ceiling = USAGE_CEILING.get(priority, USAGE_CEILING[PRIORITY_BACKGROUND])
+        if usage >= ceiling:
+            if self.daily_quota and self.calls_today * 100.0 / self.daily_quota >= ceiling:
+                midnight = datetime.combine(self.day + timedelta(days=1), datetime.min.time())
+                return max(1.0, (midnight - datetime.utcnow()).total_seconds())
+            return (usage - ceiling) * USAGE_WINDOW_SECONDS / 100.0 + 1
+
+        floor = self.capacity * BACKGROUND_RESERVE if priority == PRIORITY_BACKGROUND else 0
+        needed = 1 + floor - self.tokens
+        if needed <= 0:
+            return 0
+        return needed / self._effective_rate(now)
+
+    def take(self):
+        self.tokens -= 1
+        self.calls += 1
+        self.calls_today += 1
+
+    def snapshot(self, now):
+        self._refill(now)
+        return {
+            'tokens': round(self.tokens, 2),
+            'capacity': self.capacity,
+            'rate_per_sec': round(self._effective_rate(now), 3),
+            'usage_pct': round(self.current_usage(now), 1),
+            'calls': self.calls,
+            'calls_today': self.calls_today,
+            'daily_quota': self.daily_quota,
+            'throttled': self.throttled,
+            'blocked_for': round(max(0.0, self.blocked_until - now), 1),
+        }
+
+
+class PlatformRateLimiter:
+    """Per-app and per-account buckets for each API family ('graph', 'linkedin', 'web')."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, api, account):
+        key = (api, account or '')
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            scope = 'account' if account else 'app'
+            rate, capacity, quota = BUCKET_DEFAULTS.get((api, scope), (1.0, 5, None))
+            bucket = TokenBucket(rate, capacity, quota)
+            self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, api, account=None, priority=PRIORITY_PUBLISH, max_wait=None):
+        """Block until both the app and account buckets grant a token.
+
+        Raises RateLimitExceeded instead of waiting longer than max_wait
+        (defaults to the priority's MAX_WAIT).
+        """
+        if max_wait is None:
+            max_wait = MAX_WAIT.get(priority, MAX_WAIT[PRIORITY_BACKGROUND])
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                buckets = [self._bucket(api, None)]
+                if account:
+                    buckets.append(self._bucket(api, account))
+                wait = max(b.wait_time(priority, now) for b in buckets)
+                if wait <= 0:
+                    for b in buckets:
+                        b.take()
+                    return
+                if now + wait > deadline:
+                    for b in buckets:
+                        b.throttled += 1
+                    raise RateLimitExceeded(api, account, wait)
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, api, account, resp):
+        """Feed usage headers and throttling responses back into the buckets."""
+        headers = resp.headers or {}
+        with self._lock:
+            now = time.monotonic()
+            app_bucket = self._bucket(api, None)
+            acct_bucket = self._bucket(api, account) if account else None
+
+            app_usage = _parse_usage(headers.get('X-App-Usage'))
+            if app_usage is not None:
+                app_bucket.usage = app_usage
+                app_bucket.usage_at = now
+
+            buc = _parse_json(headers.get('X-Business-Use-Case-Usage'))
+            if buc and acct_bucket:
+                entries = [e for items in buc.values() if isinstance(items, list) for e in items]
+                if entries:
+                    acct_bucket.usage = max(_usage_pct(e) for e in entries)
+                    acct_bucket.usage_at = now
+                    regain = max((e.get('estimated_time_to_regain_access') or 0) for e in entries)
+                    if regain:
+                        acct_bucket.blocked_until = max(acct_bucket.blocked_until, now + regain * 60)
+
+            if resp.status_code == 429 or _is_meta_throttle(resp):
+                target = acct_bucket or app_bucket
+                retry_after = headers.get('Retry-After')
+                backoff = float(retry_after) if retry_after and retry_after.isdigit() else 60.0
+                target.blocked_until = max(target.blocked_until, now + backoff)
+                target.throttled += 1
+
+    def snapshot(self):
+        """Current budget usage of every bucket, for the admin endpoint."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {'api': api, 'account': account or None, 'scope': 'account' if account else 'app',
+                 **bucket.snapshot(now)}
+                for (api, account), bucket in sorted(self._buckets.items())
+            ]
+
+
+def _parse_json(value):
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _usage_pct(entry):
+    return float(max(entry.get('call_count', 0) or 0,
+                     entry.get('total_cputime', 0) or 0,
+                     entry.get('total_time', 0) or 0))
+
+
+def _parse_usage(value):
+    data = _parse_json(value)
+    if not isinstance(data, dict):
+        return None
+    return _usage_pct(data)
+
+
+# Graph API error codes that mean the app, user or page is being throttled.
+_META_THROTTLE_CODES = {4, 17, 32, 613, 80001, 80002, 80005, 80006, 80008}
+
+
+def _is_meta_throttle(resp):
+    if resp.status_code < 400:
+        return False
+    try:
+        code = (resp.json().get('error') or {}).get('code')
+    except (ValueError, AttributeError):
+        return False
+    return code in _META_THROTTLE_CODES
+
+
+limiter = PlatformRateLimiter()
@@ -0,0 +1,105 @@
+"""Version-tagged cache for expensive read-only API responses.
+
+Entries are keyed by endpoint and request parameters and tagged with the
+table_versions counters (migration 39) of the tables the response was
+computed from. Triggers bump a counter on every write to its table, so an
+entry is fresh exactly while the counters still match; checking that costs
+one primary-key read of a three-row table. A stale or missing entry is
+recomputed once under a per-key lock while concurrent requests for the same
+key wait for that result instead of recomputing it (single flight).
+
+MAX_AGE_SECONDS bounds how long an entry may live even when the counters
+match, for data the counters do not track (client names, users). The cache
+lives in process memory, so each gunicorn worker keeps its own.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from models import get_db
+
+MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 512))
+MAX_AGE_SECONDS = int(os.getenv('RESPONSE_CACHE_MAX_AGE', 300))
+
+
+def table_versions(tables):
+    """Current change counters for tables, as a tuple in the given order."""
+    db = get_db()
+    rows = db.execute(
+        f"SELECT table_name, version FROM table_versions WHERE table_name IN ({','.join('?' * len(tables))})",
+        tables
+    ).fetchall()
+    db.close()
+    versions = {row['table_name']: row['version'] for row in rows}
+    return tuple(versions.get(t, 0) for t in tables)
+
+
+class ResponseCache:
+    """LRU of (versions, stored_at, value) with single-flight recomputation."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_age=MAX_AGE_SECONDS):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'waited': 0}
+
+    def _fresh(self, key, versions, now):
+        entry = self._entries.get(key)
+        if entry and entry[0] == versions and now - entry[1] < self.max_age:
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def get_or_compute(self, key, tables, compute):
+        """Return the cached value for key, recomputing it when the tables changed."""
+        versions = table_versions(tables)
+        with self._lock:
+            entry = self._fresh(key, versions, time.monotonic())
+            if entry:
+                self._stats['hits'] += 1
+                return entry[2]
+            flight = self._flights.setdefault(key, threading.Lock())
+
+        with flight:
+            # Another request may have recomputed it while this one waited
+            with self._lock:
+                entry = self._fresh(key, versions, time.monotonic())
+                if entry:
+                    self._stats['hits'] += 1
+                    self._stats['waited'] += 1
+                    return entry[2]
+                self._stats['misses'] += 1
+                if key in self._entries:
+                    self._stats['stale'] += 1
+            try:
+                value = compute()
+                with self._lock:
+                    # Tag with the versions read before computing: a write that
+                    # lands mid-computation leaves the entry stale, never wrong
+                    self._entries[key] = (versions, time.monotonic(), value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                return value
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0
+        return stats
+
+
+cache = ResponseCache()
@@ -1,7 +1,15 @@
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from models import get_db, dicts_from_rows
-from services import instagram, linkedin, facebook
+from services import instagram, linkedin, facebook, insight_refresh
+from services.circuit_breaker import CircuitOpenError
+from services.rate_limiter import RateLimitExceeded
+
+# Posts published in parallel per scheduler tick
+PUBLISH_WORKERS = int(os.getenv('SCHEDULER_PUBLISH_WORKERS', 4))
 
 
 def get_account_for_client(client_id, platform):
@@ -31,39 +39,60 @@ def publish_post(post):
     db = get_db()
     results = {}
 
-    for platform in platforms_str.split(','):
-        platform = platform.strip()
-        if not platform:
+    # Platforms already published on an earlier attempt are not published again
+    already_published = {
+        row['platform'] for row in db.execute(
+            "SELECT platform FROM post_logs WHERE post_id=? AND status='success'", (post_id,)
+        ).fetchall()
+    }
+
+    targets = [p.strip() for p in platforms_str.split(',') if p.strip()]
+    to_publish = [p for p in dict.fromkeys(targets) if p not in already_published]
+
+    # Each platform publishes on its own thread so a slow API only delays itself
+    with ThreadPoolExecutor(max_workers=max(1, len(to_publish))) as pool:
+        futures = {
+            platform: pool.submit(_publish_platform, client_id, platform, image_urls, caption, post_type)
+            for platform in to_publish
+        }
+
+    for platform in targets:
+        if platform in already_published:
+            results[platform] = {'success': True, 'already_published': True}
             continue
-
-        # Normalize platform names
-        base_platform = platform.replace('_story', '').replace('_reel', '')
-        is_story = 'story' in platform or post_type == 'story'
-
-        account = get_account_for_client(client_id, base_platform)
-        if not account:
-            # Fall back to env tokens
-            account = _get_env_account(base_platform)
-
-        if not account:
-            result = {'success': False, 'error': f'No account found for {base_platform}'}
-        else:
-            try:
-                result = _publish_to_platform(base_platform, account, image_urls, caption, is_story, post_type)
-            except Exception as e:
-                result = {'success': False, 'error': str(e)}
+        if platform in results:
+            continue
+        result = futures[platform].result()
 
         # Log the result
         external_id = result.get('post_id', '') or result.get('id', '') or ''
+        if result.get('success'):
+            log_status = 'success'
+        elif result.get('deferred'):
+            log_status = 'deferred'
+        else:
+            log_status = 'failed'
         db.execute(
-            "INSERT INTO post_logs (post_id, platform, status, response, external_post_id) VALUES (?,?,?,?,?)",
-            (post_id, platform, 'success' if result.get('success') else 'failed', str(result), str(external_id))
+            """INSERT INTO post_logs (post_id, platform, status, response, external_post_id,
+                   error_code, error_message, duration_ms)
+               VALUES (?,?,?,?,?,?,?,?)""",
+            (post_id, platform, log_status, json.dumps(result, default=str), str(external_id),
+             result.get('error_code', ''), str(result.get('error') or ''), result.get('duration_ms'))
         )
+        if log_status == 'success':
+            insight_refresh.enqueue(db, post_id, platform,
+                                   is_story='story' in platform or post_type == 'story')
         results[platform] = result
 
     # Update post status
     all_success = all(r.get('success') for r in results.values()) if results else False
-    new_status = 'posted' if all_success else 'failed'
+    any_failed = any(not r.get('success') and not r.get('deferred') for r in results.values())
+    if all_success:
+        new_status = 'posted'
+    elif results and not any_failed:
+        new_status = 'pending'
+    else:
+        new_status = 'failed'
     db.execute("UPDATE scheduled_posts SET status=? WHERE id=?", (new_status, post_id))
     db.commit()
     db.close()
@@ -71,6 +100,42 @@ def publish_post(post):
     return results
 
 
+def _publish_platform(client_id, platform, image_urls, caption, post_type):
+    """Publish to one entry of a post's platform list and return the result dict.
+
+    Failed results carry an error_code; every result carries duration_ms.
+    """
+    start = time.monotonic()
+    result = _attempt_publish(client_id, platform, image_urls, caption, post_type)
+    if not result.get('success') and not result.get('error_code'):
+        result['error_code'] = 'platform_error'
+    result['duration_ms'] = int((time.monotonic() - start) * 1000)
+    return result
+
+
+def _attempt_publish(client_id, platform, image_urls, caption, post_type):
+    # Normalize platform names
+    base_platform = platform.replace('_story', '').replace('_reel', '')
+    is_story = 'story' in platform or post_type == 'story'
+
+    account = get_account_for_client(client_id, base_platform)
+    if not account:
+        # Fall back to env tokens
+        account = _get_env_account(base_platform)
+
+    if not account:
+        return {'success': False, 'error': f'No account found for {base_platform}', 'error_code': 'no_account'}
+    try:
+        return _publish_to_platform(base_platform, account, image_urls, caption, is_story, post_type)
+    except RateLimitExceeded as e:
+        # Out of budget or API down: leave the post pending so a later tick retries it
+        return {'success': False, 'deferred': True, 'error': str(e), 'error_code': 'rate_limited'}
+    except CircuitOpenError as e:
+        return {'success': False, 'deferred': True, 'error': str(e), 'error_code': 'circuit_open'}
+    except Exception as e:
+        return {'success': False, 'error': str(e), 'error_code': 'exception'}
+
+
 def _get_env_account(platform):
     """Get account credentials from environment variables."""
     if platform == 'instagram':
@@ -203,9 +268,9 @@ def run_scheduler():
     db.close()
 
     results = []
-    for post in pending:
-        r = publish_post(post)
-        results.append({'post_id': post['id'], 'results': r})
+    with ThreadPoolExecutor(max_workers=PUBLISH_WORKERS) as pool:
+        for post, r in zip(pending, pool.map(publish_post, pending)):
+            results.append({'post_id': post['id'], 'results': r})
     return results
 
 
@@ -219,10 +284,15 @@ def force_publish_all():
 
     published = 0
     failed = 0
-    for post in pending:
-        r = publish_post(post)
+    deferred = 0
+    with ThreadPoolExecutor(max_workers=PUBLISH_WORKERS) as pool:
+        outcomes = list(pool.map(publish_post, pending))
+    for r in outcomes:
         if all(v.get('success') for v in r.values()):
             published += 1
+        elif any(v.get('deferred') for v in r.values()) and \
+                not any(not v.get('success') and not v.get('deferred') for v in r.values()):
+            deferred += 1
         else:
             failed += 1
-    return {'published': published, 'failed': failed, 'total': len(pending)}
+    return {'published': published, 'failed': failed, 'deferred': deferred, 'total': len(pending)}
@@ -354,13 +354,34 @@ function renderSuggestions(container, data) {
 
 async function syncInsights() {
     const btn = document.getElementById('sync-btn');
+    const resetBtn = () => { if (btn) { btn.disabled = false; btn.innerHTML = '<i class="fa-solid fa-rotate mr-1"></i> Sync Insights'; } };
     if (btn) { btn.disabled = true; btn.innerHTML = '<i class="fa-solid fa-spinner fa-spin mr-1"></i> Syncing...'; }
     const res = await apiFetch(`${API_URL}/insights/sync`, { method: 'POST' });
-    if (btn) { btn.disabled = false; btn.innerHTML = '<i class="fa-solid fa-rotate mr-1"></i> Sync Insights'; }
-    if (res && res.success) {
-        showToast(`Synced insights for ${res.synced} of ${res.total} posts`, 'success');
-        loadAnalytics();
-    } else {
+    if (!res || !res.success) {
+        resetBtn();
         showToast('Sync failed: ' + (res?.error || 'Unknown error'), 'error');
+        return;
+    }
+
+    // The sync runs in the background; poll the job until it finishes
+    while (true) {
+        await new Promise(r => setTimeout(r, 1500));
+        const job = await apiFetch(`${API_URL}/jobs/${res.job_id}`);
+        if (!job) { resetBtn(); return; }
+        if (job.status === 'completed') {
+            resetBtn();
+            const result = job.result || {};
+            showToast(result.total ? `Refreshed ${result.synced} of ${result.total} due insights` : 'Insights are already up to date', 'success');
+            loadAnalytics();
+            return;
+        }
+        if (job.status === 'failed') {
+            resetBtn();
+            showToast('Sync failed: ' + (job.error || 'Unknown error'), 'error');
+            return;
+        }
+        if (btn && job.total) {
+            btn.innerHTML = `<i class="fa-solid fa-spinner fa-spin mr-1"></i> Syncing ${job.completed}/${job.total}...`;
+        }
     }
 }
@@ -1,5 +1,7 @@
 // Accounts (clients) page JS
 let _websiteTimer = null;
+// Job progress polls (one a second) before bulkFetchLogos stops waiting
+const LOGO_JOB_MAX_POLLS = 600;
 
 function pageInit() {
     loadClients();
@@ -185,6 +187,7 @@ function filterClientsTable() {
 
 async function bulkFetchLogos() {
     const btn = document.getElementById('bulk-logo-btn');
+    const resetBtn = () => { btn.disabled = false; btn.innerHTML = '<i class="fa-solid fa-image mr-1"></i> Fetch All Logos'; };
     btn.disabled = true;
     btn.innerHTML = '<i class="fa-solid fa-spinner fa-spin mr-1"></i> Fetching...';
     try {
@@ -193,20 +196,43 @@ async function bulkFetchLogos() {
             headers: { 'Content-Type': 'application/json' }
         });
         const data = await res.json();
-        if (data.success) {
-            const ok = data.results.filter(r => r.status === 'ok').length;
-            const noLogo = data.results.filter(r => r.status === 'no_logo').length;
-            const errors = data.results.filter(r => r.status === 'error').length;
-            showToast(`Logos fetched: ${ok} updated, ${noLogo + errors} skipped`, ok > 0 ? 'success' : 'info');
-            loadClients();
-        } else {
+        if (!data.success) {
             showToast('Failed to fetch logos', 'error');
+            resetBtn();
+            return;
+        }
+
+        // The fetch runs in the background; poll the job until it finishes, gives an error or we give up
+        let finished = false;
+        for (let attempt = 0; attempt < LOGO_JOB_MAX_POLLS && !finished; attempt++) {
+            await new Promise(r => setTimeout(r, 1000));
+            const jobRes = await fetch(`${API_URL}/jobs/${data.job_id}`);
+            if (!jobRes.ok) {
+                showToast('Failed to fetch logos', 'error');
+                finished = true;
+                break;
+            }
+            const job = await jobRes.json();
+            if (job.status === 'completed') {
+                const result = job.result || {};
+                showToast(`Logos fetched: ${result.updated || 0} updated, ${result.unchanged || 0} unchanged, ${result.failed || 0} skipped`,
+                          result.updated > 0 ? 'success' : 'info');
+                loadClients();
+                finished = true;
+            } else if (job.status === 'failed') {
+                showToast('Failed to fetch logos', 'error');
+                finished = true;
+            } else if (job.total) {
+                btn.innerHTML = `<i class="fa-solid fa-spinner fa-spin mr-1"></i> Fetching ${job.completed}/${job.total}...`;
+            }
+        }
+        if (!finished) {
+            showToast('Logos are still being fetched in the background', 'info');
         }
     } catch (e) {
         showToast('Connection error', 'error');
     }
-    btn.disabled = false;
-    btn.innerHTML = '<i class="fa-solid fa-image mr-1"></i> Fetch All Logos';
+    resetBtn();
 }
 
 function onWebsiteInput() {
@@ -17,30 +17,62 @@ async function loadPipelineFilterDropdowns() {
     if (assigneeSelect) assigneeSelect.innerHTML = '<option value="">All Members</option>' + users.map(u => `<option value="${u.id}">${esc(u.username)}</option>`).join('');
 }
 
+const PIPELINE_STATUSES = ['draft', 'pending_review', 'in_design', 'approved', 'scheduled'];
+let pipelineQuery = '';
+let pipelineCursors = {};
+
 async function loadPipeline() {
     const clientId = document.getElementById('pipeline-filter-client')?.value || '';
     const assignee = document.getElementById('pipeline-filter-assignee')?.value || '';
-    let url = API_URL + '/pipeline?';
-    if (clientId) url += 'client_id=' + clientId + '&';
+    const params = new URLSearchParams();
+    if (clientId) params.set('client_id', clientId);
     // Non-viewAll roles only see their assigned posts unless a specific assignee filter is chosen
     const effectiveAssignee = assignee || (!canDo('viewAll') && currentUser ? String(currentUser.id) : '');
-    if (effectiveAssignee) url += 'assigned_to=' + effectiveAssignee;
-    const board = await fetch(url).then(r => r.json());
+    if (effectiveAssignee) params.set('assigned_to', effectiveAssignee);
+    pipelineQuery = params.toString();
+    const board = await fetch(API_URL + '/pipeline?' + pipelineQuery).then(r => r.json());
     renderPipelineBoard(board);
     initPipelineDragDrop();
 }
 
 function renderPipelineBoard(board) {
-    const statuses = ['draft', 'pending_review', 'in_design', 'approved', 'scheduled'];
-    statuses.forEach(status => {
+    pipelineCursors = {};
+    PIPELINE_STATUSES.forEach(status => {
         const col = document.getElementById('pcol-' + status);
         const count = document.getElementById('pcount-' + status);
-        const posts = board[status] || [];
-        if (count) count.textContent = posts.length;
-        if (col) col.innerHTML = posts.map(p => renderPipelineCard(p)).join('') || '<p class="text-gray-400 text-xs text-center py-4">No posts</p>';
+        const column = board[status] || { count: 0, cards: [], next_cursor: null };
+        if (count) count.textContent = column.count;
+        if (col) {
+            col.innerHTML = column.cards.map(p => renderPipelineCard(p)).join('') || '<p class="text-gray-400 text-xs text-center py-4">No posts</p>';
+            setPipelineCursor(status, column.next_cursor);
+        }
     });
 }
 
+// Each column shows its first cards; "Load more" fetches the next page of that column only
+function setPipelineCursor(status, cursor) {
+    const col = document.getElementById('pcol-' + status);
+    col.querySelector('.pipeline-load-more')?.remove();
+    pipelineCursors[status] = cursor;
+    if (cursor) {
+        col.insertAdjacentHTML('beforeend', `<button class="pipeline-load-more w-full text-xs text-indigo-600 py-2 hover:underline" onclick="loadMorePipeline('${status}')">Load more</button>`);
+    }
+}
+
+async function loadMorePipeline(status) {
+    const cursor = pipelineCursors[status];
+    if (!cursor) return;
+    const params = new URLSearchParams(pipelineQuery);
+    params.set('column', status);
+    params.set('cursor', cursor);
+    const page = await fetch(API_URL + '/pipeline?' + params.toString()).then(r => r.json());
+    if (!page || page.error) return;
+    const col = document.getElementById('pcol-' + status);
+    col.querySelector('.pipeline-load-more')?.remove();
+    col.insertAdjacentHTML('beforeend', page.cards.map(p => renderPipelineCard(p)).join(''));
+    setPipelineCursor(status, page.next_cursor);
+}
+
 function renderPipelineCard(post) {
     const priorityClass = 'priority-' + (post.priority || 'normal');
     const platforms = (post.platforms || '').split(',').map(p => getPlatformIcon(p.trim())).join(' ');
@@ -58,7 +90,7 @@ function renderPipelineCard(post) {
                     ${post.assigned_motion_name ? '<span><i class="fa-solid fa-film mr-1"></i>' + esc(post.assigned_motion_name) + '</span>' : ''}
                 </span>
             </div>
-            ${post.design_output_urls ? '<div class="mt-2"><i class="fa-solid fa-image text-green-500 text-xs"></i> <span class="text-xs text-green-600">Design attached</span></div>' : ''}
+            ${post.has_design ? '<div class="mt-2"><i class="fa-solid fa-image text-green-500 text-xs"></i> <span class="text-xs text-green-600">Design attached</span></div>' : ''}
         </div>
     `;
 }
@@ -68,12 +100,12 @@ function initPipelineDragDrop() {
     pipelineSortables = [];
     // Only allow drag & drop for roles that can approve or schedule (admin, manager, sm_specialist)
     if (!canDo('approve') && !canDo('schedule')) return;
-    const statuses = ['draft', 'pending_review', 'in_design', 'approved', 'scheduled'];
-    statuses.forEach(status => {
+    PIPELINE_STATUSES.forEach(status => {
         const col = document.getElementById('pcol-' + status);
         if (!col) return;
         const sortable = new Sortable(col, {
             group: 'pipeline',
+            draggable: '.kanban-card',
             animation: 200,
             ghostClass: 'sortable-ghost',
             onEnd: async function(evt) {
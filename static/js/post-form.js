@@ -451,7 +451,7 @@ async function waitForPublish(postId, platform) {
             if (res.status !== 'pending') {
                 const log = (res.logs || []).find(l => l.platform === platform);
                 const failed = res.status === 'failed' || (log && log.status === 'failed');
-                return { platform, success: !failed, error: failed ? (log?.response || 'Failed to publish') : '' };
+                return { platform, success: !failed, error: failed ? (log?.error || 'Failed to publish') : '' };
             }
         } catch (e) {}
     }
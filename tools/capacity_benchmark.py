@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+capacity_benchmark.py — Query count and latency of the /api/capacity report as the team grows.
+
+Seeds a throwaway SQLite database with clients (each with content
+requirements and assignees) and posts spread around today, then builds the
+capacity report for increasing team sizes, counting the SQL statements it
+runs. The count should stay the same on every line.
+
+    python tools/capacity_benchmark.py --users 5,25,100,400 --posts 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+ROLES = ('designer', 'motion_designer', 'sm_specialist', 'moderator', 'admin')
+STATUSES = ('draft', 'in_design', 'pending_review', 'approved', 'scheduled', 'posted', 'failed')
+REQUIREMENTS = [{'platforms': ['instagram'], 'type': 'post', 'count': 12},
+                {'platforms': ['instagram'], 'type': 'story', 'count': 8},
+                {'platforms': ['instagram', 'facebook'], 'type': 'reel', 'count': 4}]
+
+
+def seed(db, args, rng):
+    """Create the largest team, clients and posts; returns user ids by role."""
+    from services.content_requirements import replace_requirements
+    by_role = {role: [] for role in ROLES}
+    for i in range(max(args.users)):
+        role = ROLES[i % len(ROLES)]
+        by_role[role].append(db.execute(
+            "INSERT INTO users (username, email, password_hash, role, is_active) VALUES (?,?,?,?,1)",
+            (f'bench{i}', f'bench{i}@example.com', '-', role)
+        ).lastrowid)
+
+    client_ids = []
+    for c in range(args.clients):
+        client_ids.append(db.execute(
+            "INSERT INTO clients (name, assigned_designer_id, assigned_motion_id, "
+            "assigned_sm_id, assigned_writer_id) VALUES (?,?,?,?,?)",
+            (f'Bench Client {c + 1}', rng.choice(by_role['designer']),
+             rng.choice(by_role['motion_designer']), rng.choice(by_role['sm_specialist']),
+             rng.choice(by_role['sm_specialist']))
+        ).lastrowid)
+        replace_requirements(db, client_ids[-1], REQUIREMENTS)
+
+    now = datetime.now()
+    rows = []
+    for i in range(args.posts):
+        when = (now + timedelta(days=rng.uniform(-40, 20))).strftime('%Y-%m-%d %H:%M:%S')
+        rows.append((rng.choice(client_ids), f'Bench post {i}', 'post', when, when, rng.choice(STATUSES),
+                     rng.choice(by_role['designer']), rng.choice(by_role['motion_designer']),
+                     rng.choice(by_role['sm_specialist']), rng.choice(by_role['sm_specialist'])))
+    db.executemany(
+        "INSERT INTO scheduled_posts (client_id, topic, post_type, scheduled_at, created_at, workflow_status, "
+        "assigned_designer_id, assigned_motion_id, assigned_sm_id, created_by_id) VALUES (?,?,?,?,?,?,?,?,?,?)",
+        rows
+    )
+    db.commit()
+    return by_role
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the capacity report against team size.')
+    parser.add_argument('--users', default='5,25,100,400', help='comma-separated team sizes')
+    parser.add_argument('--clients', type=int, default=60)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    args.users = sorted(int(n) for n in args.users.split(',') if n.strip())
+
+    import models
+    models.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='capacity_bench_'), 'capacity_bench.db')
+    from migrations import run_migrations
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_migrations()
+
+    from services import capacity
+
+    db = models.get_db()
+    seed(db, args, random.Random(args.seed))
+    db.close()
+    print(f"Seeded {max(args.users)} users, {args.clients} clients, {args.posts} posts")
+
+    statements = []
+
+    def counting_get_db():
+        conn = models.get_db()
+        conn.set_trace_callback(lambda sql: statements.append(sql) if sql.lstrip().upper().startswith('SELECT') else None)
+        return conn
+
+    capacity.get_db = counting_get_db
+
+    print(f"\n{'users':>6} {'queries':>8} {'ms (best)':>10} {'heatmap cells':>14}")
+    for size in args.users:
+        # Deactivate everyone past this team size
+        db = models.get_db()
+        db.execute("UPDATE users SET is_active = (username LIKE 'bench%' AND "
+                   "id <= (SELECT MIN(id) FROM users WHERE username LIKE 'bench%') + ?)",
+                   (size - 1,))
+        db.commit()
+        db.close()
+
+        best = None
+        for _ in range(args.repeat):
+            statements.clear()
+            start = time.perf_counter()
+            report = capacity.capacity_report()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        cells = sum(len(row['days']) for row in report['heatmap'])
+        print(f"{len(report['capacity_bars']):>6} {len(statements):>8} {best * 1000:>10.1f} {cells:>14}")
+
+
+if __name__ == '__main__':
+    main()
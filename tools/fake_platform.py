@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+fake_platform.py — Local stand-in for the Graph API and LinkedIn API.
+
+Emulates the endpoints services/instagram.py, facebook.py, linkedin.py,
+insights.py and account_metrics.py call, with configurable latency, error rate, throttling and reel
+processing time. Point the app at it with:
+
+    GRAPH_API_BASE=http://127.0.0.1:8099/graph/v18.0
+    LINKEDIN_API_BASE=http://127.0.0.1:8099/linkedin/v2
+
+Run standalone:  python tools/fake_platform.py --port 8099 --latency-ms 200
+Or in-process:   server = start_server(FakePlatform(latency_ms=50))
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+
+
+class FakePlatform:
+    """WSGI app emulating the platform APIs the publisher and insights sync use."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0,
+                 app_usage=0, reel_processing_seconds=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.app_usage = app_usage
+        self.reel_processing_seconds = reel_processing_seconds
+        self.random = random.Random(seed)
+        self.ids = itertools.count(1000)
+        self.containers = {}  # container id -> time it finishes processing
+        self.requests = {}    # endpoint name -> count
+        self.lock = threading.Lock()
+        self.base_url = ''  # set by start_server; used for LinkedIn upload URLs
+
+    # ── WSGI entry point ──
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        parts = [p for p in path.split('/') if p]
+        query = {k: v[0] for k, v in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        form = self._read_body(environ)
+
+        if len(parts) >= 2 and parts[0] == 'graph':
+            family, route = 'graph', parts[2:]
+        elif len(parts) >= 2 and parts[0] == 'linkedin':
+            family, route = 'linkedin', parts[2:]
+        elif parts and parts[0] == 'media':
+            return self._respond(start_response, 200, b'\x89PNG fake media bytes', 'application/octet-stream')
+        else:
+            return self._json(start_response, 404, {'error': {'message': f'Unknown path {path}'}})
+
+        self._sleep()
+        endpoint = self._endpoint_name(family, method, route)
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            roll = self.random.random()
+
+        if roll < self.error_rate:
+            return self._json(start_response, 500, {'error': {'message': 'Fake server error', 'code': 2}})
+        if roll < self.error_rate + self.throttle_rate:
+            return self._throttle(start_response, family)
+
+        if family == 'graph':
+            return self._graph(start_response, method, route, {**query, **form})
+        return self._linkedin(start_response, method, route, query)
+
+    # ── Graph API ──
+
+    def _graph(self, start_response, method, route, params):
+        if method == 'POST' and len(route) == 2:
+            edge = route[1]
+            if edge == 'media':
+                container_id = self._next_id('c')
+                if params.get('media_type') == 'REELS':
+                    with self.lock:
+                        self.containers[container_id] = time.monotonic() + self.reel_processing_seconds
+                return self._json(start_response, 200, {'id': container_id})
+            if edge in ('media_publish', 'photos', 'feed', 'videos', 'photo_stories'):
+                return self._json(start_response, 200, {'id': self._next_id('m')})
+        if method == 'GET' and len(route) == 1:
+            object_id = route[0]
+            if 'status_code' in params.get('fields', ''):
+                with self.lock:
+                    ready_at = self.containers.get(object_id, 0)
+                status = 'FINISHED' if time.monotonic() >= ready_at else 'IN_PROGRESS'
+                return self._json(start_response, 200, {'id': object_id, 'status_code': status})
+            if params.get('fields') == 'id,name':
+                return self._json(start_response, 200, {'id': object_id, 'name': f'Fake {object_id}'})
+            if 'followers_count' in params.get('fields', ''):
+                return self._json(start_response, 200, {'id': object_id,
+                                                        'followers_count': self.random.randint(1000, 50000)})
+            if 'like_count' in params.get('fields', ''):
+                return self._json(start_response, 200, {
+                    'id': object_id, 'like_count': self.random.randint(0, 500),
+                    'comments_count': self.random.randint(0, 50),
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S+0000', time.gmtime()),
+                    'media_type': 'IMAGE',
+                })
+            return self._json(start_response, 200, {
+                'id': object_id,
+                'shares': {'count': self.random.randint(0, 20)},
+                'likes': {'summary': {'total_count': self.random.randint(0, 500)}},
+                'comments': {'summary': {'total_count': self.random.randint(0, 50)}},
+                'insights': {'data': [
+                    {'name': name, 'values': [{'value': self.random.randint(100, 10000)}]}
+                    for name in ('post_impressions', 'post_impressions_unique', 'post_clicks')
+                ]},
+            })
+        if method == 'GET' and len(route) == 2 and route[1] == 'insights' and params.get('period') == 'day':
+            # Account-level daily insights: one value per day, end_time at the following midnight
+            since, until = int(params.get('since', 0)), int(params.get('until', 0))
+            end_times = [time.strftime('%Y-%m-%dT08:00:00+0000', time.gmtime(t))
+                         for t in range(since + 86400, until + 1, 86400)]
+            return self._json(start_response, 200, {'data': [
+                {'name': name, 'period': 'day',
+                 'values': [{'value': self.random.randint(0, 5000), 'end_time': e} for e in end_times]}
+                for name in params.get('metric', '').split(',') if name
+            ]})
+        if method == 'GET' and len(route) == 2 and route[1] == 'insights':
+            metrics = params.get('metric', 'impressions,reach').split(',')
+            return self._json(start_response, 200, {'data': [
+                {'name': name, 'values': [{'value': self.random.randint(10, 10000)}]} for name in metrics
+            ]})
+        return self._json(start_response, 400, {'error': {'message': 'Unsupported Graph request', 'code': 100}})
+
+    # ── LinkedIn API ──
+
+    def _linkedin(self, start_response, method, route, query):
+        name = route[0] if route else ''
+        if method == 'GET' and name == 'userinfo':
+            return self._json(start_response, 200, {'sub': 'fake-member'})
+        if method == 'POST' and name == 'assets' and query.get('action') == 'registerUpload':
+            asset = self._next_id('urn:li:digitalmediaAsset:')
+            return self._json(start_response, 200, {'value': {
+                'asset': asset,
+                'uploadMechanism': {'com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest': {
+                    'uploadUrl': f'{self.base_url}/linkedin/v2/upload/{asset}',
+                }},
+            }})
+        if method == 'PUT' and name == 'upload':
+            return self._json(start_response, 201, {})
+        if method == 'POST' and name == 'ugcPosts':
+            share = self._next_id('urn:li:share:')
+            return self._json(start_response, 201, {'id': share}, headers=[('x-restli-id', share)])
+        if method == 'GET' and name == 'socialActions':
+            return self._json(start_response, 200, {
+                'likesSummary': {'totalLikes': self.random.randint(0, 300)},
+                'commentsSummary': {'totalFirstLevelComments': self.random.randint(0, 40)},
+            })
+        if method == 'GET' and name == 'organizationalEntityShareStatistics':
+            return self._json(start_response, 200, {'elements': [{'totalShareStatistics': {
+                'impressionCount': self.random.randint(100, 5000),
+                'clickCount': self.random.randint(0, 200),
+                'shareCount': self.random.randint(0, 30),
+                'engagement': round(self.random.random() / 10, 4),
+            }}]})
+        return self._json(start_response, 400, {'message': 'Unsupported LinkedIn request'})
+
+    # ── Helpers ──
+
+    def _throttle(self, start_response, family):
+        if family == 'graph':
+            usage = json.dumps({'call_count': 100, 'total_cputime': 40, 'total_time': 40})
+            return self._json(start_response, 400, {
+                'error': {'message': 'Application request limit reached', 'code': 4},
+            }, headers=[('X-App-Usage', usage)])
+        return self._json(start_response, 429, {'message': 'Resource level throttle limit reached'},
+                          headers=[('Retry-After', '60')])
+
+    def _sleep(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, self.latency_ms + jitter) / 1000.0)
+
+    def _next_id(self, prefix):
+        with self.lock:
+            return f'{prefix}{next(self.ids)}'
+
+    @staticmethod
+    def _endpoint_name(family, method, route):
+        if family == 'graph':
+            shape = route[1] if len(route) > 1 else 'object'
+        else:
+            shape = route[0] if route else ''
+        return f'{family} {method} {shape}'
+
+    @staticmethod
+    def _read_body(environ):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length) if length else b''
+        if environ.get('CONTENT_TYPE', '').startswith('application/x-www-form-urlencoded'):
+            return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        return {}
+
+    def _json(self, start_response, status, payload, headers=None):
+        extra = list(headers or [])
+        if self.app_usage:
+            extra.append(('X-App-Usage', json.dumps({'call_count': self.app_usage,
+                                                     'total_cputime': 0, 'total_time': 0})))
+        return self._respond(start_response, status, json.dumps(payload).encode(), 'application/json', extra)
+
+    @staticmethod
+    def _respond(start_response, status, body, content_type, headers=None):
+        reasons = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+                   429: 'Too Many Requests', 500: 'Internal Server Error'}
+        start_response(f'{status} {reasons.get(status, "")}', [
+            ('Content-Type', content_type), ('Content-Length', str(len(body))), *(headers or []),
+        ])
+        return [body]
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(app, host='127.0.0.1', port=0):
+    """Serve the fake platform on a background thread; returns the server.
+
+    The bound address is available as server.base_url; stop with server.shutdown().
+    """
+    server = make_server(host, port, app, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    server.base_url = f'http://{host}:{server.server_port}'
+    app.base_url = server.base_url
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the fake Graph/LinkedIn API server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--app-usage', type=int, default=0, help='X-App-Usage call_count percent to report')
+    parser.add_argument('--reel-seconds', type=float, default=0.0, help='reel container processing time')
+    args = parser.parse_args()
+
+    app = FakePlatform(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                       throttle_rate=args.throttle_rate, app_usage=args.app_usage,
+                       reel_processing_seconds=args.reel_seconds)
+    server = start_server(app, args.host, args.port)
+    print(f"Fake platform API on {server.base_url}")
+    print(f"  GRAPH_API_BASE={server.base_url}/graph/v18.0")
+    print(f"  LINKEDIN_API_BASE={server.base_url}/linkedin/v2")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
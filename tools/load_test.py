@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+load_test.py — Push N due posts through run_scheduler against the fake platform.
+
+Starts tools/fake_platform.py in-process, points GRAPH_API_BASE and
+LINKEDIN_API_BASE at it, seeds a throwaway SQLite database with clients,
+accounts and due posts, then runs scheduler ticks until nothing is left
+pending (or --ticks is reached). Reports publish throughput and per-post
+latency percentiles, followed by the same for syncing insights of the
+published posts.
+
+    python tools/load_test.py --posts 200 --latency-ms 150 --error-rate 0.02
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_platform import FakePlatform, start_server  # noqa: E402
+
+PLATFORMS = ('instagram', 'facebook', 'linkedin')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def report(title, durations, elapsed, outcomes):
+    print(f"\n{title}")
+    print(f"  items: {len(durations)}   wall time: {elapsed:.2f}s   "
+          f"throughput: {len(durations) / elapsed if elapsed else 0:.1f}/s")
+    print(f"  latency p50: {percentile(durations, 50) * 1000:.0f}ms   "
+          f"p90: {percentile(durations, 90) * 1000:.0f}ms   "
+          f"p99: {percentile(durations, 99) * 1000:.0f}ms   "
+          f"max: {max(durations, default=0) * 1000:.0f}ms")
+    print("  outcomes: " + ', '.join(f'{k}={v}' for k, v in sorted(outcomes.items())))
+
+
+def seed(db, args):
+    """Create clients, accounts and due posts; returns the post ids."""
+    media_url = f"{os.environ['FAKE_PLATFORM_URL']}/media"
+    post_ids = []
+    client_ids = []
+    for c in range(args.clients):
+        client_id = db.execute("INSERT INTO clients (name) VALUES (?)", (f'Load Test Client {c + 1}',)).lastrowid
+        client_ids.append(client_id)
+        for platform in args.platforms:
+            db.execute(
+                "INSERT INTO accounts (client_id, platform, account_name, account_id, access_token, is_active) "
+                "VALUES (?,?,?,?,?,1)",
+                (client_id, platform, f'{platform}-{client_id}', f'{platform[:2]}{client_id}',
+                 f'token-{platform}-{client_id}')
+            )
+    for i in range(args.posts):
+        client_id = client_ids[i % len(client_ids)]
+        if args.reel_share and i % int(1 / args.reel_share) == 0:
+            image_url = f'{media_url}/clip-{i}.mp4'
+        elif i % 5 == 0:
+            image_url = ','.join(f'{media_url}/img-{i}-{n}.jpg' for n in range(3))
+        else:
+            image_url = f'{media_url}/img-{i}.jpg'
+        post_ids.append(db.execute(
+            "INSERT INTO scheduled_posts (client_id, platforms, topic, caption, image_url, post_type, "
+            "scheduled_at, status, workflow_status) VALUES (?,?,?,?,?,?,?,?,?)",
+            (client_id, ','.join(args.platforms), f'Load test {i}', f'Caption {i}', image_url, 'post',
+             '2000-01-01T00:00', 'pending', 'scheduled')
+        ).lastrowid)
+    db.commit()
+    return post_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test publishing and insights sync against a fake platform.')
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--platforms', default=','.join(PLATFORMS))
+    parser.add_argument('--ticks', type=int, default=5, help='maximum scheduler ticks to run')
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--app-usage', type=int, default=0)
+    parser.add_argument('--reel-seconds', type=float, default=1.0)
+    parser.add_argument('--reel-share', type=float, default=0.1, help='fraction of posts that are reels')
+    parser.add_argument('--skip-insights', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    args.platforms = [p.strip() for p in args.platforms.split(',') if p.strip()]
+
+    fake = FakePlatform(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, app_usage=args.app_usage,
+                        reel_processing_seconds=args.reel_seconds, seed=args.seed)
+    server = start_server(fake)
+
+    # Must be set before the services modules are imported
+    os.environ['FAKE_PLATFORM_URL'] = server.base_url
+    os.environ['GRAPH_API_BASE'] = f'{server.base_url}/graph/v18.0'
+    os.environ['LINKEDIN_API_BASE'] = f'{server.base_url}/linkedin/v2'
+    os.environ.setdefault('IG_REEL_POLL_INTERVAL', '0.25')
+
+    import models
+    models.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='load_test_'), 'load_test.db')
+    from migrations import run_migrations
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_migrations()
+
+    from services import scheduler, insights
+    from services.rate_limiter import limiter
+    from services import circuit_breaker
+
+    db = models.get_db()
+    post_ids = seed(db, args)
+    db.close()
+    print(f"Seeded {len(post_ids)} due posts for {args.clients} clients on {', '.join(args.platforms)}; "
+          f"fake platform at {server.base_url}")
+
+    # ── Publish ──
+    durations = []
+    original_publish = scheduler.publish_post
+
+    def timed_publish(post):
+        start = time.monotonic()
+        try:
+            return original_publish(post)
+        finally:
+            durations.append(time.monotonic() - start)
+
+    scheduler.publish_post = timed_publish
+    start = time.monotonic()
+    ticks = 0
+    while ticks < args.ticks:
+        ticks += 1
+        if not scheduler.run_scheduler():
+            break
+    publish_elapsed = time.monotonic() - start
+    scheduler.publish_post = original_publish
+
+    db = models.get_db()
+    outcomes = {row['status']: row['n'] for row in db.execute(
+        "SELECT status, COUNT(*) AS n FROM scheduled_posts GROUP BY status").fetchall()}
+    log_outcomes = {row['status']: row['n'] for row in db.execute(
+        "SELECT status, COUNT(*) AS n FROM post_logs GROUP BY status").fetchall()}
+    posted = [row['id'] for row in db.execute("SELECT id FROM scheduled_posts WHERE status='posted'").fetchall()]
+    db.close()
+    report(f"Publish ({ticks} tick(s), {scheduler.PUBLISH_WORKERS} workers)", durations, publish_elapsed, outcomes)
+    print("  platform results: " + ', '.join(f'{k}={v}' for k, v in sorted(log_outcomes.items())))
+
+    # ── Insights ──
+    if not args.skip_insights and posted:
+        durations = []
+        outcomes = {}
+        start = time.monotonic()
+        for post_id in posted:
+            t0 = time.monotonic()
+            result = insights.sync_post_insights(post_id)
+            durations.append(time.monotonic() - t0)
+            for data in result.get('platforms', {}).values():
+                key = 'ok' if data.get('success') else 'error'
+                outcomes[key] = outcomes.get(key, 0) + 1
+        report("Insights sync", durations, time.monotonic() - start, outcomes)
+
+    print("\nFake platform requests:")
+    for endpoint, count in sorted(fake.requests.items()):
+        print(f"  {endpoint:<50} {count}")
+    throttled = sum(b['throttled'] for b in limiter.snapshot())
+    print(f"\nRate limiter throttled calls: {throttled}")
+    for b in circuit_breaker.snapshot():
+        print(f"Circuit breaker {b['family']}: {b['state']} ({len(b['transitions'])} transitions)")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
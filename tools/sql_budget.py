@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+sql_budget.py — Check that list endpoints run a fixed number of SQL statements.
+
+Seeds a throwaway SQLite database at two sizes, calls each endpoint in
+BUDGETS through a Flask test client and counts the statements it runs.
+Fails (exit status 1) when an endpoint exceeds its budget or runs more
+statements on the larger database than on the smaller one, which is how
+a per-row query creeping back in shows up.
+
+    python tools/sql_budget.py --small 10 --large 120
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Endpoint -> most statements it may run, whatever the number of clients and users
+BUDGETS = {
+    '/api/clients/overview': 4,
+    '/api/clients/overview?user_id={user_id}&role=designer': 4,
+    '/api/clients/1/coverage?weeks=26': 1,
+    '/api/capacity': 7,
+    '/api/users/stats': 4,
+    '/api/pipeline': 2,
+    '/api/pipeline?assigned_to={user_id}&limit=10': 2,
+    '/api/posts/my-work?user_id={user_id}&role=designer': 1,
+    '/api/posts/my-work?user_id={user_id}&role=admin': 1,
+}
+
+ROLES = ('designer', 'motion_designer', 'sm_specialist', 'moderator', 'admin')
+STATUSES = ('draft', 'in_design', 'pending_review', 'approved', 'scheduled', 'posted', 'failed')
+PLATFORMS = ('instagram', 'facebook', 'linkedin')
+
+
+def seed(db, clients, rng):
+    """Users, clients with accounts and requirements, and posts around today; returns a designer's id."""
+    from services.content_requirements import replace_requirements
+    users = {role: [] for role in ROLES}
+    for i in range(max(5, clients // 4)):
+        role = ROLES[i % len(ROLES)]
+        users[role].append(db.execute(
+            "INSERT INTO users (username, email, password_hash, role) VALUES (?,?,?,?)",
+            (f'budget{i}', f'budget{i}@example.com', '-', role)
+        ).lastrowid)
+
+    now = datetime.now()
+    for c in range(clients):
+        client_id = db.execute(
+            "INSERT INTO clients (name, assigned_designer_id, assigned_motion_id, assigned_sm_id, assigned_writer_id) "
+            "VALUES (?,?,?,?,?)",
+            (f'Budget Client {c + 1}', rng.choice(users['designer']), rng.choice(users['motion_designer']),
+             rng.choice(users['sm_specialist']), rng.choice(users['sm_specialist']))
+        ).lastrowid
+        replace_requirements(db, client_id, [{'platforms': ['instagram'], 'type': 'post', 'count': 8},
+                                             {'platforms': ['instagram'], 'type': 'reel', 'count': 2}])
+        for platform in PLATFORMS:
+            db.execute("INSERT INTO accounts (client_id, platform, account_name) VALUES (?,?,?)",
+                       (client_id, platform, f'{platform}-{client_id}'))
+        for i in range(20):
+            when = (now + timedelta(days=rng.uniform(-20, 20))).strftime('%Y-%m-%dT%H:%M')
+            db.execute(
+                "INSERT INTO scheduled_posts (client_id, topic, scheduled_at, workflow_status, assigned_designer_id, "
+                "assigned_sm_id, created_by_id) VALUES (?,?,?,?,?,?,?)",
+                (client_id, f'Budget post {i}', when, rng.choice(STATUSES), rng.choice(users['designer']),
+                 rng.choice(users['sm_specialist']), rng.choice(users['sm_specialist']))
+            )
+    db.commit()
+    return users['designer'][0]
+
+
+def make_app():
+    from flask import Flask
+    from routes.analytics import analytics_bp
+    from routes.capacity import capacity_bp
+    from routes.clients import clients_bp
+    from routes.posts import posts_bp
+    app = Flask(__name__)
+    app.secret_key = 'sql-budget'
+    for blueprint in (clients_bp, capacity_bp, analytics_bp, posts_bp):
+        app.register_blueprint(blueprint)
+    return app
+
+
+def count_statements(client, url):
+    """Run one GET and return the number of SQL statements it executed."""
+    statements = []
+    connect = sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(
+            lambda sql: statements.append(sql) if not sql.lstrip().upper().startswith(('PRAGMA', '--')) else None)
+        return conn
+
+    sqlite3.connect = counting_connect
+    try:
+        resp = client.get(url)
+    finally:
+        sqlite3.connect = connect
+    if resp.status_code != 200:
+        raise RuntimeError(f'GET {url} returned {resp.status_code}')
+    return len(statements)
+
+
+def measure(size, rng):
+    import models
+    models.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='sql_budget_'), 'sql_budget.db')
+    from migrations import run_migrations
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_migrations()
+    db = models.get_db()
+    designer_id = seed(db, size, rng)
+    db.close()
+    client = make_app().test_client()
+    return {url: count_statements(client, url.format(user_id=designer_id)) for url in BUDGETS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check SQL statement budgets of list endpoints.')
+    parser.add_argument('--small', type=int, default=10, help='clients in the small database')
+    parser.add_argument('--large', type=int, default=120, help='clients in the large database')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    small = measure(args.small, rng)
+    large = measure(args.large, rng)
+
+    failed = False
+    print(f"{'endpoint':<58} {'budget':>6} {args.small:>6} {args.large:>6}")
+    for url, budget in BUDGETS.items():
+        ok = large[url] <= budget and large[url] <= small[url]
+        failed = failed or not ok
+        print(f"{url:<58} {budget:>6} {small[url]:>6} {large[url]:>6}  {'ok' if ok else 'OVER'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()